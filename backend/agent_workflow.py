@@ -3,7 +3,11 @@ from typing import TypedDict, Annotated, List, Optional
 import operator
 from datetime import datetime
 from services import GeminiService, InstagramService, FacebookService, LinkedInService, mock_generate_image
+from prompt_parser import fast_parse, parse_stats, FAST_PATH_THRESHOLD
+from tracing import span, traced_node
+from events import bus
 import os
+import time
 import logging
 
 logger = logging.getLogger(__name__)
@@ -31,6 +35,7 @@ linkedin = LinkedInService()
 
 # Nodes
 
+@traced_node("parse_prompt")
 def parse_prompt_node(state: AgentState):
     # In a real app, use Gemini to extract. For now, simple logic or simulated extraction.
     # If topic is empty, we assume it's the start and we need to parse.
@@ -39,7 +44,26 @@ def parse_prompt_node(state: AgentState):
     
     prompt = state.get("topic", "")
     logger.info(f"parse_prompt_node: Received prompt: {prompt}")
-    
+    started = time.perf_counter()
+
+    # Fast path: rule-based extraction, no LLM round trip for unambiguous prompts
+    parsed = fast_parse(prompt)
+    if parsed["confidence"] >= FAST_PATH_THRESHOLD:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        parse_stats.record(fast_path=True, elapsed_ms=elapsed_ms)
+        logger.info(
+            f"parse_prompt_node: Fast path hit in {elapsed_ms:.2f} ms "
+            f"(hit rate {parse_stats.to_dict()['fast_path_hit_rate']:.0%})"
+        )
+        return {
+            "topic": parsed["topic"],
+            "platforms": parsed["platforms"],
+            "schedule_time": parsed["schedule_time"],
+            "current_step": "review_caption",
+            "feedback": ""
+        }
+    logger.info(f"parse_prompt_node: Low confidence ({parsed['confidence']}), falling back to Gemini.")
+
     # Use Gemini to parse
     # Simple prompt to extract JSON
     extraction_prompt = f"""
@@ -54,7 +78,8 @@ def parse_prompt_node(state: AgentState):
     """
     
     try:
-        response = gemini.model.generate_content(extraction_prompt)
+        with span("gemini.generate_content", kind="upstream", upstream="gemini"):
+            response = gemini.model.generate_content(extraction_prompt)
         import json
         import re
         # Clean markdown code blocks if any
@@ -62,6 +87,7 @@ def parse_prompt_node(state: AgentState):
         text = re.sub(r"```json", "", text)
         text = re.sub(r"```", "", text)
         data = json.loads(text)
+        parse_stats.record(fast_path=False, elapsed_ms=(time.perf_counter() - started) * 1000)
         
         return {
             "topic": data.get("topic", prompt),
@@ -71,13 +97,15 @@ def parse_prompt_node(state: AgentState):
             "feedback": ""
         }
     except Exception as e:
-        print(f"Error parsing prompt: {e}")
+        logger.error(f"parse_prompt_node: Error parsing prompt: {e}")
+        parse_stats.record(fast_path=False, elapsed_ms=(time.perf_counter() - started) * 1000)
         return {
             "topic": prompt, 
             "platforms": ["Instagram", "Facebook", "LinkedIn"],
             "current_step": "review_caption"
         }
 
+@traced_node("generate_caption")
 def generate_caption_node(state: AgentState):
     captions = state.get("captions", {})
     caption_options = state.get("caption_options", {})
@@ -107,11 +135,13 @@ def generate_caption_node(state: AgentState):
         "regenerate_count_caption": state.get("regenerate_count_caption", 0) + 1
     }
 
+@traced_node("review_caption")
 def review_caption_node(state: AgentState):
     # This node is a placeholder for the human interrupt.
     # It doesn't do much processing, just holds state.
     return {"current_step": "review_caption"}
 
+@traced_node("generate_image")
 def generate_image_node(state: AgentState):
     topic = state.get("topic", "")
     feedback = state.get("feedback", "")
@@ -126,15 +156,18 @@ def generate_image_node(state: AgentState):
         "regenerate_count_image": state.get("regenerate_count_image", 0) + 1
     }
 
+@traced_node("review_image")
 def review_image_node(state: AgentState):
     # Placeholder for human interrupt
     return {"current_step": "review_image"}
 
+@traced_node("schedule")
 def schedule_node(state: AgentState):
     # Placeholder for human interrupt to pick time
     # If time was parsed, it might skip, but user wants to confirm.
     return {"current_step": "schedule"}
 
+@traced_node("publish")
 def publish_node(state: AgentState):
     platforms = state.get("platforms", [])
     captions = state.get("captions", {})
@@ -159,6 +192,7 @@ def publish_node(state: AgentState):
                 res = "Unknown platform"
             status[p] = res
             logger.info(f"publish_node: {p} status: {res}")
+            bus.emit("workflow.platform_published", platform=p, status=res)
             
     return {
         "publish_status": status,
@@ -0,0 +1,164 @@
+"""
+Age-tiered background analytics refresher.
+
+Young posts change fast and old ones barely at all, so refresh frequency follows age:
+    < 24h     every 15 minutes
+    < 7 days  hourly
+    older     daily, until ANALYTICS_REFRESH_MAX_AGE_DAYS, then never
+Posts wait in a min-heap keyed by their next refresh time. Every tick pops what is
+due, as far as the shared Graph API budget allows, and pushes each post back with
+its next time. Anything the budget can't cover stays queued for the next tick.
+"""
+
+import os
+import time
+import heapq
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import select, func
+
+from database import async_session
+from db_models import Analytics, AnalyticsSnapshot, Post, PostStatus
+from analytics_service import AnalyticsService, api_budget, CALLS_PER_POST
+
+logger = logging.getLogger(__name__)
+
+MAX_AGE_DAYS = int(os.getenv("ANALYTICS_REFRESH_MAX_AGE_DAYS", "90"))
+MAX_POSTS_PER_TICK = int(os.getenv("ANALYTICS_REFRESH_MAX_PER_TICK", "500"))
+TICK_SECONDS = 60
+
+# (post age below, refresh every)
+REFRESH_TIERS = (
+    (timedelta(hours=24), timedelta(minutes=15)),
+    (timedelta(days=7), timedelta(hours=1)),
+    (timedelta(days=MAX_AGE_DAYS), timedelta(days=1)),
+)
+
+
+def refresh_interval(age: timedelta) -> Optional[timedelta]:
+    """How often a post of this age is refreshed; None once it is too old to bother."""
+    for limit, interval in REFRESH_TIERS:
+        if age < limit:
+            return interval
+    return None
+
+
+def _as_epoch(ts: Optional[datetime]) -> Optional[float]:
+    if ts is None:
+        return None
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+
+class AnalyticsRefresher:
+    def __init__(self, service: Optional[AnalyticsService] = None):
+        self.service = service or AnalyticsService()
+        self._heap: list[tuple[float, str]] = []
+        self._due: dict[str, float] = {}  # post_id -> current due time; stale heap entries are skipped
+        self._published: dict[str, float] = {}  # post_id -> published epoch
+        self._synced_version = 0  # Highest posts.version seen by _sync
+        self._loaded = False
+        self.last_tick: Optional[dict] = None
+
+    def _schedule(self, post_id: str, published: float, last_fetched: Optional[float], now: float):
+        interval = refresh_interval(timedelta(seconds=max(now - published, 0)))
+        if interval is None:
+            self._due.pop(post_id, None)
+            self._published.pop(post_id, None)
+            return
+        due = now if last_fetched is None else max(last_fetched + interval.total_seconds(), now)
+        self._due[post_id] = due
+        self._published[post_id] = published
+        heapq.heappush(self._heap, (due, post_id))
+
+    async def _sync(self, session, now: float):
+        """Queue published posts not seen yet: everything on the first tick, then new ones."""
+        # analytics.fetched_at only moves when the metrics change; every successful
+        # reading appends a snapshot, so the newest snapshot is the last refresh.
+        # Snapshots are pruned after a while, hence the fallback to fetched_at.
+        last_captured = (
+            select(AnalyticsSnapshot.post_id, func.max(AnalyticsSnapshot.captured_at).label("captured_at"))
+            .group_by(AnalyticsSnapshot.post_id)
+            .subquery()
+        )
+        stmt = (
+            select(Post.id, Post.version, Post.published_time, last_captured.c.captured_at, Analytics.fetched_at)
+            .outerjoin(last_captured, last_captured.c.post_id == Post.id)
+            .outerjoin(Analytics, Analytics.post_id == Post.id)
+            .where(
+                Post.status == PostStatus.published,
+                Post.platform_post_id.is_not(None),
+                Post.published_time.is_not(None),
+                Post.published_time >= datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=MAX_AGE_DAYS),
+            )
+        )
+        # Every write to a post stamps a new version, and the version counter is locked
+        # until the writer commits, so anything published since the last sync is above
+        # the mark, whatever its published_time says.
+        stmt = stmt.where(Post.version > self._synced_version)
+
+        for post_id, version, published_time, captured_at, fetched_at in await session.execute(stmt):
+            if post_id not in self._due:
+                readings = [t for t in (_as_epoch(captured_at), _as_epoch(fetched_at)) if t is not None]
+                self._schedule(post_id, _as_epoch(published_time), max(readings, default=None), now)
+            self._synced_version = max(self._synced_version, version)
+        self._loaded = True
+
+    def _pop_due(self, now: float, limit: int) -> list[str]:
+        batch = []
+        while self._heap and self._heap[0][0] <= now and len(batch) < limit:
+            due, post_id = heapq.heappop(self._heap)
+            if self._due.get(post_id) == due:
+                batch.append(post_id)
+        return batch
+
+    async def tick(self):
+        """APScheduler job: refresh whichever posts are due, within the API budget."""
+        if not (self.service.fb_access_token or self.service.ig_access_token):
+            return
+
+        now = time.time()
+        async with async_session() as session:
+            await self._sync(session, now)
+
+            limit = min(int(api_budget.available() // CALLS_PER_POST), MAX_POSTS_PER_TICK)
+            due = self._pop_due(now, limit)
+            if not due:
+                return
+
+            summary = await self.service.refresh_posts(session, post_ids=due)
+
+            # Posts deleted or unpublished since they were queued drop out here
+            live = set((await session.execute(
+                select(Post.id).where(Post.id.in_(due), Post.status == PostStatus.published)
+            )).scalars())
+            done = time.time()
+            for post_id in due:
+                if post_id in live:
+                    self._schedule(post_id, self._published[post_id], done, done)
+                else:
+                    self._due.pop(post_id, None)
+                    self._published.pop(post_id, None)
+
+        waiting = sum(1 for due_at in self._due.values() if due_at <= now)
+        self.last_tick = {"at": done, "refreshed": summary, "still_due": waiting}
+        logger.info(
+            f"AnalyticsRefresher: Refreshed {summary['updated']}/{len(due)} due posts; "
+            f"{waiting} still due, budget {api_budget.available():.0f} calls."
+        )
+
+    def status(self) -> dict:
+        now = time.time()
+        return {
+            "queued": len(self._due),
+            "due_now": sum(1 for due_at in self._due.values() if due_at <= now),
+            "next_due_in_seconds": round(min(self._due.values()) - now, 1) if self._due else None,
+            "api_budget_available": round(api_budget.available()),
+            "last_tick": self.last_tick,
+        }
+
+
+analytics_refresher = AnalyticsRefresher()
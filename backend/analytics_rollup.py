@@ -0,0 +1,320 @@
+"""
+Analytics time series: append-only snapshots, hourly/daily rollups and retention.
+
+Every refresh appends one AnalyticsSnapshot per post. A background job rolls new
+snapshots into per-post hourly buckets, hourly buckets into daily ones, and prunes
+raw and hourly rows past their retention. Time-series reads pick the level:
+    raw   -> analytics_snapshots   (last ANALYTICS_RAW_RETENTION_DAYS)
+    hour  -> analytics_rollups     (last ANALYTICS_HOURLY_RETENTION_DAYS)
+    day   -> analytics_rollups     (kept indefinitely)
+"""
+
+import os
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import select, delete, func, literal, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import async_session, upsert
+from fast_json import rows_to_dicts
+from db_models import AnalyticsSnapshot, AnalyticsRollup, Analytics, Post, PlatformEnum, SyncCounter
+
+logger = logging.getLogger(__name__)
+
+RAW_RETENTION_DAYS = int(os.getenv("ANALYTICS_RAW_RETENTION_DAYS", "7"))
+HOURLY_RETENTION_DAYS = int(os.getenv("ANALYTICS_HOURLY_RETENTION_DAYS", "90"))
+ROLLUP_WATERMARK = "analytics_rollup_watermark"  # SyncCounter: epoch seconds of the last rollup run
+# Snapshots stamped just before a run but committed after it are picked up by the next one
+ROLLUP_GRACE = timedelta(minutes=10)
+
+# "auto" reads hourly buckets for windows up to this long, daily beyond
+AUTO_HOURLY_MAX_SPAN = timedelta(days=14)
+
+METRICS = ("reach", "impressions", "likes", "comments", "engagement")
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _bucket_start(col, granularity: str, dialect: str):
+    """Truncate a naive UTC timestamp column to the start of its hour or day."""
+    if dialect == "postgresql":
+        return func.date_trunc(granularity, col)
+    # Same text layout SQLAlchemy stores for DateTime on SQLite, so range comparisons hold
+    fmt = "%Y-%m-%d %H:00:00.000000" if granularity == "hour" else "%Y-%m-%d 00:00:00.000000"
+    return func.strftime(fmt, col)
+
+
+def _floor(ts: datetime, granularity: str) -> datetime:
+    ts = ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0) if granularity == "day" else ts
+
+
+# ---------- Writes ----------
+
+def snapshot_row(post_id: str, platform: PlatformEnum, metrics: dict, captured_at: Optional[datetime] = None) -> dict:
+    """Row for AnalyticsSnapshot from a fetched metrics dict."""
+    likes = metrics.get("likes", 0) or 0
+    comments = metrics.get("comments", 0) or 0
+    return {
+        "post_id": post_id,
+        "platform": platform,
+        "captured_at": captured_at or _utcnow(),
+        "reach": metrics.get("reach", 0) or 0,
+        "impressions": metrics.get("impressions", 0) or 0,
+        "likes": likes,
+        "comments": comments,
+        "engagement": metrics.get("engagement", likes + comments) or 0,
+    }
+
+
+def seed_snapshots(conn):
+    """
+    On first start with the snapshots table, seed it with the current analytics rows
+    so existing history shows up in the time series. Sync; run via conn.run_sync.
+    """
+    if conn.execute(select(AnalyticsSnapshot.id).limit(1)).first() is not None:
+        return
+    stmt = (
+        select(
+            Analytics.post_id, Post.platform,
+            func.coalesce(Analytics.fetched_at, Post.published_time, Post.created_at),
+            *[func.coalesce(getattr(Analytics, m), 0) for m in METRICS],
+        )
+        .join(Post, Post.id == Analytics.post_id)
+    )
+    result = conn.execute(AnalyticsSnapshot.__table__.insert().from_select(
+        ["post_id", "platform", "captured_at", *METRICS], stmt,
+    ))
+    if result.rowcount:
+        logger.info(f"AnalyticsRollup: Seeded {result.rowcount} snapshots from existing analytics.")
+
+
+def prune_orphaned_history(conn):
+    """
+    Drop snapshots and rollups whose post is gone. Deletes used to leave them behind
+    (SQLite doesn't enforce the ON DELETE CASCADE), which kept deleted posts in the
+    time series. Sync; run via conn.run_sync.
+    """
+    live = select(Post.id)
+    removed = sum(
+        conn.execute(delete(model).where(model.post_id.not_in(live))).rowcount
+        for model in (AnalyticsSnapshot, AnalyticsRollup)
+    )
+    if removed:
+        logger.info(f"AnalyticsRollup: Pruned {removed} snapshot/rollup rows of deleted posts.")
+
+
+async def delete_post_analytics(session: AsyncSession, post_ids: list[str]):
+    """Delete the latest-value rows, snapshots and rollups of posts about to be deleted."""
+    for model in (Analytics, AnalyticsSnapshot, AnalyticsRollup):
+        await session.execute(delete(model).where(model.post_id.in_(post_ids)))
+
+
+# ---------- Rollups ----------
+
+async def _get_watermark(session: AsyncSession) -> datetime:
+    value = await session.scalar(select(SyncCounter.value).where(SyncCounter.name == ROLLUP_WATERMARK))
+    return datetime.fromtimestamp(value or 0, timezone.utc).replace(tzinfo=None)
+
+
+async def _set_watermark(session: AsyncSession, ts: datetime):
+    dialect = session.bind.dialect.name
+    value = int(ts.replace(tzinfo=timezone.utc).timestamp())
+    stmt = upsert(dialect, SyncCounter).values(name=ROLLUP_WATERMARK, value=value)
+    await session.execute(stmt.on_conflict_do_update(index_elements=["name"], set_={"value": value}))
+
+
+async def _roll(session: AsyncSession, granularity: str, source, time_col, since: datetime, where=()):
+    """Upsert per-post buckets from `source` rows at or after `since` (highest reading wins)."""
+    dialect = session.bind.dialect.name
+    bucket = _bucket_start(time_col, granularity, dialect)
+    rows = (
+        select(
+            literal(granularity), bucket, source.post_id, source.platform,
+            *[func.max(getattr(source, m)) for m in METRICS],
+        )
+        .where(time_col >= since, *where)
+        .group_by(bucket, source.post_id, source.platform)
+    )
+    stmt = upsert(dialect, AnalyticsRollup).from_select(
+        ["granularity", "bucket_start", "post_id", "platform", *METRICS], rows,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["granularity", "bucket_start", "post_id"],
+        set_={m: getattr(stmt.excluded, m) for m in METRICS},
+    )
+    await session.execute(stmt)
+
+
+async def rollup_analytics():
+    """
+    Background job: roll snapshots taken since the last run into hourly buckets, those
+    hours into days, then apply retention. Buckets the previous run had only partly
+    seen are recomputed in full, so re-running is safe.
+    """
+    started = _utcnow()
+    async with async_session() as session:
+        watermark = await _get_watermark(session)
+        hour_since = _floor(watermark, "hour")
+        day_since = _floor(watermark, "day")
+
+        await _roll(session, "hour", AnalyticsSnapshot, AnalyticsSnapshot.captured_at, hour_since)
+        await _roll(
+            session, "day", AnalyticsRollup, AnalyticsRollup.bucket_start, day_since,
+            where=(AnalyticsRollup.granularity == "hour",),
+        )
+        await _set_watermark(session, started - ROLLUP_GRACE)
+
+        # Retention. Raw rows are only pruned once they're behind the watermark (rolled up).
+        raw_cutoff = min(started - timedelta(days=RAW_RETENTION_DAYS), hour_since)
+        raw = await session.execute(delete(AnalyticsSnapshot).where(AnalyticsSnapshot.captured_at < raw_cutoff))
+        hourly = await session.execute(delete(AnalyticsRollup).where(
+            AnalyticsRollup.granularity == "hour",
+            AnalyticsRollup.bucket_start < min(started - timedelta(days=HOURLY_RETENTION_DAYS), day_since),
+        ))
+        await session.commit()
+
+    logger.info(
+        f"AnalyticsRollup: Rolled up since {hour_since.isoformat()}; "
+        f"pruned {raw.rowcount} raw and {hourly.rowcount} hourly rows."
+    )
+
+
+# ---------- Reads ----------
+
+def resolve_bucket(bucket: str, date_from: datetime, date_to: datetime) -> str:
+    """Pick the storage level for `auto`, never one whose retention misses the window."""
+    if bucket != "auto":
+        return bucket
+    hourly_horizon = _utcnow() - timedelta(days=HOURLY_RETENTION_DAYS)
+    if date_to - date_from <= AUTO_HOURLY_MAX_SPAN and date_from >= hourly_horizon:
+        return "hour"
+    return "day"
+
+
+async def _opening_state(session: AsyncSession, granularity: str, start: datetime, filters: list) -> dict:
+    """
+    Where each post stood when the window opens: post_id -> its last reading before `start`.
+    Whole days come from the daily rollups, which are never pruned, so "hour" and "day"
+    count the same posts; for "hour" the hours of start's own day are laid over them.
+    One index seek per post, not a scan of the history.
+    """
+    day_start = _floor(start, "day")
+    last_day = (
+        select(AnalyticsRollup.bucket_start)
+        .where(
+            AnalyticsRollup.post_id == Post.id, AnalyticsRollup.granularity == "day",
+            AnalyticsRollup.bucket_start < day_start,
+        )
+        .order_by(AnalyticsRollup.bucket_start.desc())
+        .limit(1)
+        .correlate(Post)
+        .scalar_subquery()
+    )
+    # Materialized, so the planner walks posts and seeks, rather than scanning every day bucket
+    last_days = (
+        select(Post.id.label("post_id"), last_day.label("bucket_start"))
+        .cte("last_days")
+        .prefix_with("MATERIALIZED")
+    )
+    stmt = (
+        select(AnalyticsRollup.post_id, *[getattr(AnalyticsRollup, m) for m in METRICS])
+        .join_from(last_days, AnalyticsRollup, and_(
+            AnalyticsRollup.granularity == "day",
+            AnalyticsRollup.bucket_start == last_days.c.bucket_start,
+            AnalyticsRollup.post_id == last_days.c.post_id,
+        ))
+        .where(*filters)
+    )
+    latest = {row[0]: tuple(row[1:]) for row in await session.execute(stmt)}
+
+    if granularity == "hour" and day_start < start:
+        rows = await session.execute(
+            select(AnalyticsRollup.post_id, *[getattr(AnalyticsRollup, m) for m in METRICS])
+            .where(
+                AnalyticsRollup.granularity == "hour", *filters,
+                AnalyticsRollup.bucket_start >= day_start, AnalyticsRollup.bucket_start < start,
+            )
+            .order_by(AnalyticsRollup.bucket_start)
+        )
+        for post_id, *values in rows:
+            latest[post_id] = tuple(values)
+    return latest
+
+
+async def _carried_totals(session: AsyncSession, granularity: str, date_from: datetime, date_to: datetime,
+                          filters: list) -> list[dict]:
+    """
+    Per-bucket totals over every post seen so far, each at its latest reading
+    (last observation carried forward). The refresher reads old posts far less often
+    than young ones, so summing only the posts sampled in a bucket would sawtooth.
+    """
+    start = _floor(date_from, granularity)
+    latest = await _opening_state(session, granularity, start, filters)
+    totals = [sum(values[i] for values in latest.values()) for i in range(len(METRICS))]
+
+    rows = await session.execute(
+        select(AnalyticsRollup.bucket_start, AnalyticsRollup.post_id, *[getattr(AnalyticsRollup, m) for m in METRICS])
+        .where(
+            AnalyticsRollup.granularity == granularity, *filters,
+            AnalyticsRollup.bucket_start >= start, AnalyticsRollup.bucket_start < date_to,
+        )
+        .order_by(AnalyticsRollup.bucket_start)
+    )
+    points = []
+    for bucket_start, post_id, *values in rows:
+        if not points or points[-1]["time"] != bucket_start:
+            points.append({"time": bucket_start, **dict.fromkeys(METRICS, 0), "posts": 0, "sampled": 0})
+        previous = latest.get(post_id)
+        for i, value in enumerate(values):
+            totals[i] += value - (previous[i] if previous else 0)
+        latest[post_id] = tuple(values)
+        point = points[-1]
+        point.update(zip(METRICS, totals))
+        point["posts"] = len(latest)
+        point["sampled"] += 1
+    return points
+
+
+async def get_timeseries(
+    session: AsyncSession,
+    bucket: str = "auto",
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    platform: Optional[PlatformEnum] = None,
+    post_id: Optional[str] = None,
+) -> tuple[str, list[dict]]:
+    """
+    Metric totals per bucket, oldest first, with posts not read in a bucket counted at
+    their last reading. `posts` is how many posts the totals cover, `sampled` how many
+    were read in the bucket. `raw` returns the individual snapshots instead.
+    Returns (bucket used, points).
+    """
+    date_to = date_to or _utcnow()
+    date_from = date_from or date_to - timedelta(days=30)
+    bucket = resolve_bucket(bucket, date_from, date_to)
+
+    source = AnalyticsSnapshot if bucket == "raw" else AnalyticsRollup
+    filters = []
+    if platform:
+        filters.append(source.platform == platform)
+    if post_id:
+        filters.append(source.post_id == post_id)
+
+    if bucket != "raw":
+        return bucket, await _carried_totals(session, bucket, date_from, date_to, filters)
+
+    stmt = (
+        select(
+            AnalyticsSnapshot.captured_at.label("time"), AnalyticsSnapshot.post_id, AnalyticsSnapshot.platform,
+            *[getattr(AnalyticsSnapshot, m) for m in METRICS],
+        )
+        .where(AnalyticsSnapshot.captured_at >= date_from, AnalyticsSnapshot.captured_at < date_to, *filters)
+        .order_by(AnalyticsSnapshot.captured_at)
+    )
+    result = await session.execute(stmt)
+    return bucket, rows_to_dicts(result)
@@ -4,18 +4,136 @@ Stores metrics in the analytics table.
 """
 
 import os
+import json
+import uuid
+import time
+import asyncio
 import logging
+from collections import OrderedDict
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Callable, Optional
 
-import requests
+import httpx
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, insert, func, or_, text
 
-from db_models import Analytics, Post, PostStatus
+from db_models import Analytics, AnalyticsSnapshot, Post, PostStatus, PlatformEnum, ANALYTICS_LIST_COLUMNS, ANALYTICS_POST_COLUMNS
+from database import upsert
+from fast_json import rows_to_dicts
+from analytics_rollup import snapshot_row
+import graph_cache
+from tracing import traced_async_request
 
 logger = logging.getLogger(__name__)
 
+# Columns compared to decide whether a refreshed post's latest-value row needs rewriting
+LATEST_METRICS = ("likes", "comments", "reach", "impressions", "engagement", "engagement_rate")
+
+# Sort keys accepted by GET /analytics/posts
+ANALYTICS_SORT_COLUMNS = {
+    "fetched_at": Analytics.fetched_at,
+    "engagement_rate": Analytics.engagement_rate,
+    "reach": Analytics.reach,
+}
+
+# Graph API batch calls in flight at once during a refresh
+REFRESH_CONCURRENCY = int(os.getenv("ANALYTICS_REFRESH_CONCURRENCY", "8"))
+# Sub-requests per batch call (the Graph API maximum is 50)
+GRAPH_BATCH_SIZE = 50
+# Sub-requests (API calls) one post's refresh costs
+CALLS_PER_POST = 2
+# Refreshed posts per intermediate commit
+REFRESH_COMMIT_EVERY = int(os.getenv("ANALYTICS_REFRESH_COMMIT_EVERY", "50"))
+
+
+class ApiBudget:
+    """
+    Token bucket for Graph API calls, shared by manual and background refreshes.
+    Each batch sub-request counts as one call, as it does for Graph API rate limits.
+    Manual refreshes are never blocked, but they drain the bucket the background
+    refresher waits on. Bulk deletes take calls only while the bucket covers them.
+    """
+
+    def __init__(self, calls_per_hour: int):
+        self.capacity = float(calls_per_hour)
+        self.rate = calls_per_hour / 3600.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def available(self) -> float:
+        self._refill()
+        return max(self._tokens, 0.0)
+
+    def charge(self, calls: int):
+        self._refill()
+        self._tokens -= calls
+
+    def try_acquire(self, calls: int) -> bool:
+        """Charge `calls` only if the bucket covers them all."""
+        self._refill()
+        if self._tokens < calls:
+            return False
+        self._tokens -= calls
+        return True
+
+
+api_budget = ApiBudget(int(os.getenv("GRAPH_API_BUDGET_PER_HOUR", "4800")))
+
+# delete_platform_posts error for posts not attempted because the budget ran out
+BUDGET_EXHAUSTED = "Graph API budget exhausted; retry later"
+
+
+class OverviewCache:
+    """
+    KPI overview results keyed by filter set, least recently used evicted past
+    max_entries (from/to are client-supplied, so the key space is unbounded).
+    Cleared on every analytics write in this process; the TTL bounds staleness from
+    writes made by other workers.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self.generation = 0
+        self._entries: OrderedDict = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key, value, generation: int):
+        # Skip results computed from data that was overwritten while the query ran
+        if generation != self.generation:
+            return
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def invalidate(self):
+        self.generation += 1
+        self._entries.clear()
+
+
+overview_cache = OverviewCache(
+    ttl_seconds=float(os.getenv("ANALYTICS_OVERVIEW_CACHE_TTL", "300")),
+    max_entries=int(os.getenv("ANALYTICS_OVERVIEW_CACHE_SIZE", "128")),
+)
+
 
 class AnalyticsService:
     """Fetches page-level and post-level insights from FB/IG APIs."""
@@ -29,12 +147,18 @@ class AnalyticsService:
 
     # ---- Facebook Page Insights ----
 
-    def fetch_facebook_page_insights(self) -> dict:
-        """GET /{page-id}/insights for page_post_engagements."""
+    async def fetch_facebook_page_insights(self, client: httpx.AsyncClient) -> dict:
+        """GET /{page-id}/insights for page_post_engagements (cached for GRAPH_CACHE_PAGE_INSIGHTS_TTL)."""
         if not self.fb_access_token or not self.fb_page_id:
             logger.warning("AnalyticsService: Missing Facebook credentials.")
             return {"error": "Missing Facebook credentials"}
 
+        return await graph_cache.cached(
+            f"page_insights:facebook:{self.fb_page_id}", graph_cache.PAGE_INSIGHTS_TTL,
+            lambda: self._fetch_facebook_page_insights(client),
+        )
+
+    async def _fetch_facebook_page_insights(self, client: httpx.AsyncClient) -> dict:
         url = f"https://graph.facebook.com/{self.api_version}/{self.fb_page_id}/insights"
         params = {
             "metric": "page_post_engagements",
@@ -43,7 +167,7 @@ class AnalyticsService:
         }
 
         try:
-            resp = requests.get(url, params=params, timeout=15)
+            resp = await traced_async_request(client, "GET", url, upstream="graph_api", platform="facebook", params=params, timeout=15)
             resp.raise_for_status()
             data = resp.json().get("data", [])
 
@@ -57,13 +181,13 @@ class AnalyticsService:
             logger.info(f"AnalyticsService: Facebook page insights fetched: {result}")
             return result
 
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"AnalyticsService: Facebook insights error: {e}")
             return {"error": str(e)}
 
     # ---- Instagram Insights ----
 
-    def _get_ig_business_id(self) -> Optional[str]:
+    async def _get_ig_business_id(self, client: httpx.AsyncClient) -> Optional[str]:
         """
         Resolve Instagram Business Account ID.
         If INSTAGRAM_PAGE_ID is already set (17841... format), use it directly.
@@ -73,33 +197,53 @@ class AnalyticsService:
         if self.ig_page_id:
             return self.ig_page_id
 
-        # Fallback: try to discover from Facebook Page
+        # Fallback: try to discover from Facebook Page (remembered for GRAPH_CACHE_ACCOUNT_TTL)
         if self.fb_page_id and self.fb_access_token:
-            url = f"https://graph.facebook.com/{self.api_version}/{self.fb_page_id}"
-            params = {
-                "fields": "instagram_business_account",
-                "access_token": self.fb_access_token,
-            }
-            try:
-                resp = requests.get(url, params=params, timeout=10)
-                resp.raise_for_status()
-                ig_acct = resp.json().get("instagram_business_account", {})
-                return ig_acct.get("id")
-            except Exception as e:
-                logger.error(f"AnalyticsService: Could not resolve IG business ID: {e}")
+            return await graph_cache.cached(
+                self._ig_business_id_key, graph_cache.ACCOUNT_TTL, lambda: self._discover_ig_business_id(client),
+            )
 
         return None
 
-    def fetch_instagram_insights(self) -> dict:
-        """GET /{ig-id}/insights for reach, accounts_engaged."""
+    @property
+    def _ig_business_id_key(self) -> str:
+        return f"ig_business_id:{self.fb_page_id}"
+
+    async def _discover_ig_business_id(self, client: httpx.AsyncClient) -> Optional[str]:
+        url = f"https://graph.facebook.com/{self.api_version}/{self.fb_page_id}"
+        params = {
+            "fields": "instagram_business_account",
+            "access_token": self.fb_access_token,
+        }
+        try:
+            resp = await traced_async_request(client, "GET", url, upstream="graph_api", platform="instagram", params=params, timeout=10)
+            resp.raise_for_status()
+            ig_acct = resp.json().get("instagram_business_account", {})
+            return ig_acct.get("id")
+        except Exception as e:
+            logger.error(f"AnalyticsService: Could not resolve IG business ID: {e}")
+            return None
+
+    async def fetch_instagram_insights(self, client: httpx.AsyncClient) -> dict:
+        """GET /{ig-id}/insights for reach, accounts_engaged (cached for GRAPH_CACHE_PAGE_INSIGHTS_TTL)."""
         if not self.ig_access_token:
             logger.warning("AnalyticsService: Missing Instagram access token.")
             return {"error": "Missing Instagram access token"}
 
-        ig_id = self._get_ig_business_id()
+        ig_id = await self._get_ig_business_id(client)
         if not ig_id:
             return {"error": "Could not resolve Instagram business account ID"}
 
+        result = await graph_cache.cached(
+            f"page_insights:instagram:{ig_id}", graph_cache.PAGE_INSIGHTS_TTL,
+            lambda: self._fetch_instagram_insights(client, ig_id),
+        )
+        if "error" in result and not self.ig_page_id:
+            # The discovered ID may be stale (account relinked); look it up again next time
+            await graph_cache.cache_delete(self._ig_business_id_key)
+        return result
+
+    async def _fetch_instagram_insights(self, client: httpx.AsyncClient, ig_id: str) -> dict:
         url = f"https://graph.facebook.com/{self.api_version}/{ig_id}/insights"
         params = {
             "metric": "reach,accounts_engaged",
@@ -109,7 +253,7 @@ class AnalyticsService:
         }
 
         try:
-            resp = requests.get(url, params=params, timeout=15)
+            resp = await traced_async_request(client, "GET", url, upstream="graph_api", platform="instagram", params=params, timeout=15)
             resp.raise_for_status()
             data = resp.json().get("data", [])
 
@@ -126,7 +270,7 @@ class AnalyticsService:
             logger.info(f"AnalyticsService: Instagram insights fetched: {result}")
             return result
 
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"AnalyticsService: Instagram insights error: {e}")
             return {"error": str(e)}
 
@@ -135,216 +279,473 @@ class AnalyticsService:
     async def store_post_analytics(
         self, session: AsyncSession, post_id: str, reach: int, impressions: int, engagement: int
     ):
-        """Persist analytics row for a specific post."""
+        """Persist analytics row for a specific post (replacing its previous values)."""
         eng_rate = (engagement / reach * 100) if reach > 0 else 0.0
-
-        analytics = Analytics(
-            post_id=post_id,
-            reach=reach,
-            impressions=impressions,
-            engagement=engagement,
-            engagement_rate=round(eng_rate, 2),
-            fetched_at=datetime.now(timezone.utc),
-        )
-        session.add(analytics)
+        row = {
+            "post_id": post_id,
+            "reach": reach,
+            "impressions": impressions,
+            "engagement": engagement,
+            "engagement_rate": round(eng_rate, 2),
+            "fetched_at": datetime.now(timezone.utc),
+        }
+        stmt = upsert(session.bind.dialect.name, Analytics)
+        await session.execute(stmt.values(id=str(uuid.uuid4()), **row).on_conflict_do_update(
+            index_elements=["post_id"], set_={k: v for k, v in row.items() if k != "post_id"},
+        ))
+        platform = await session.scalar(select(Post.platform).where(Post.id == post_id))
+        if platform is not None:
+            await session.execute(insert(AnalyticsSnapshot), [snapshot_row(
+                post_id, platform, {"reach": reach, "impressions": impressions, "engagement": engagement},
+            )])
         await session.commit()
+        overview_cache.invalidate()
         logger.info(f"AnalyticsService: Stored analytics for post {post_id}")
-        return analytics
+        return await session.scalar(select(Analytics).where(Analytics.post_id == post_id))
 
     # ---- Fetch specific Post Insights ----
 
-    def _fetch_ig_post_insights(self, media_id: str) -> dict:
-        if not self.ig_access_token:
-            return {"error": "Missing Instagram access token"}
-        
+    @staticmethod
+    def _first_value(metric: dict):
+        values = metric.get("values", [])
+        return values[0].get("value", 0) if values else 0
+
+    def _post_subrequests(self, platform: str, platform_post_id: str) -> list[str]:
+        """Relative URLs for one post: counts first, then insights."""
+        if platform == "instagram":
+            return [
+                f"{platform_post_id}?fields=like_count,comments_count",
+                f"{platform_post_id}/insights?metric=reach,saved",
+            ]
+        return [
+            f"{platform_post_id}?fields=likes.summary(true),comments.summary(true)",
+            f"{platform_post_id}?fields=insights.metric(post_impressions,post_impressions_unique)",
+        ]
+
+    def _parse_post_metrics(self, platform: str, counts: Optional[tuple], insights: Optional[tuple]) -> dict:
+        """Build a metrics dict from the (status, body) pairs of a post's two sub-requests."""
+        if counts is None:
+            return {"error": "No response"}
+        code, body = counts
+        if code != 200:
+            return {"error": body.get("error", {}).get("message", f"HTTP {code}")}
+
+        # Reach and impressions are best effort
+        reach, impressions = 0, 0
+        if platform == "instagram":
+            likes = body.get("like_count", 0)
+            comments = body.get("comments_count", 0)
+            if insights and insights[0] == 200:
+                for metric in insights[1].get("data", []):
+                    if metric.get("name") == "reach":
+                        reach = self._first_value(metric)
+                    elif metric.get("name") == "impressions":  # Should not happen now, but safe
+                        impressions = self._first_value(metric)
+        else:
+            likes = body.get("likes", {}).get("summary", {}).get("total_count", 0)
+            comments = body.get("comments", {}).get("summary", {}).get("total_count", 0)
+            if insights and insights[0] == 200:
+                for metric in insights[1].get("insights", {}).get("data", []):
+                    if metric.get("name") == "post_impressions_unique":
+                        reach = self._first_value(metric)
+                    elif metric.get("name") == "post_impressions":
+                        impressions = self._first_value(metric)
+
+        return {"likes": likes, "comments": comments, "reach": reach, "impressions": impressions}
+
+    def _token_for(self, platform: str) -> str:
+        return self.ig_access_token if platform == "instagram" else self.fb_access_token
+
+    async def _graph_batch(
+        self, client: httpx.AsyncClient, token: str, platform: str, urls: list[str], method: str = "GET"
+    ) -> list[Optional[tuple]]:
+        """
+        Send up to GRAPH_BATCH_SIZE requests (GETs by default) as one Graph API batch call.
+        Returns (status, body) per sub-request, or None where the API gave no response.
+        """
+        batch = [{"method": method, "relative_url": f"{self.api_version}/{url}"} for url in urls]
+        resp = await traced_async_request(
+            client, "POST", "https://graph.facebook.com/",
+            upstream="graph_api", platform=platform,
+            data={"access_token": token, "batch": json.dumps(batch), "include_headers": "false"},
+        )
+        resp.raise_for_status()
+        items = resp.json()
+        if not isinstance(items, list) or len(items) != len(urls):
+            raise ValueError(f"Unexpected batch response for {len(urls)} sub-requests")
+
+        out = []
+        for item in items:
+            if item is None:
+                out.append(None)  # Sub-request timed out on Facebook's side
+                continue
+            try:
+                body = json.loads(item.get("body") or "{}")
+            except ValueError:
+                body = {}
+            out.append((item.get("code"), body))
+        return out
+
+    async def _fetch_batch_metrics(self, client: httpx.AsyncClient, platform: str, posts: list) -> dict:
+        """Metrics for up to GRAPH_BATCH_SIZE // CALLS_PER_POST posts of one platform, keyed by post id."""
+        token = self._token_for(platform)
+        if not token:
+            return {p.id: {"error": f"Missing {platform} token"} for p in posts}
+
+        urls = [url for p in posts for url in self._post_subrequests(platform, p.platform_post_id)]
+        api_budget.charge(len(urls))
         try:
-            # 1. Fetch likes and comments
-            url_media = f"https://graph.facebook.com/{self.api_version}/{media_id}"
-            params_media = {"fields": "like_count,comments_count", "access_token": self.ig_access_token}
-            resp_m = requests.get(url_media, params=params_media, timeout=10)
-            resp_m.raise_for_status()
-            data_m = resp_m.json()
-            
-            likes = data_m.get("like_count", 0)
-            comments = data_m.get("comments_count", 0)
-
-            # 2. Fetch reach & engagement
-            url_ins = f"https://graph.facebook.com/{self.api_version}/{media_id}/insights"
-            params_ins = {"metric": "reach,saved", "access_token": self.ig_access_token}
-            resp_ins = requests.get(url_ins, params=params_ins, timeout=10)
-            reach, impressions = 0, 0
-            if resp_ins.status_code == 200:
-                data_ins = resp_ins.json().get("data", [])
-                for metric in data_ins:
-                    name = metric.get("name")
-                    values = metric.get("values", [])
-                    val = values[0].get("value", 0) if values else 0
-                    if name == "reach":
-                        reach = val
-                    elif name == "impressions": # Should not happen now, but safe
-                        impressions = val
-
-            return {"likes": likes, "comments": comments, "reach": reach, "impressions": impressions}
-        except Exception as e:
-            logger.error(f"AnalyticsService: IG post {media_id} insights error: {e}")
-            return {"error": str(e)}
+            responses = await self._graph_batch(client, token, platform, urls)
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error(f"AnalyticsService: {platform} batch of {len(posts)} posts failed: {e}")
+            return {p.id: {"error": str(e)} for p in posts}
+
+        metrics = {}
+        for i, p in enumerate(posts):
+            counts, insights = responses[2 * i], responses[2 * i + 1]
+            metrics[p.id] = self._parse_post_metrics(platform, counts, insights)
+            if "error" in metrics[p.id]:
+                logger.error(f"AnalyticsService: {platform} post {p.platform_post_id} insights error: {metrics[p.id]['error']}")
+        return metrics
+
+    @staticmethod
+    def _analytics_row(post_id: str, metrics: dict) -> dict:
+        """Latest-value analytics row from fetched metrics."""
+        likes = metrics.get("likes", 0) or 0
+        comments = metrics.get("comments", 0) or 0
+        reach = metrics.get("reach", 0) or 0
+        # Combine likes and comments into engagement, plus any other actions theoretically
+        engagement = likes + comments
+        eng_rate = (engagement / reach * 100) if reach > 0 else 0.0
+        return {
+            "post_id": post_id,
+            "likes": likes,
+            "comments": comments,
+            "reach": reach,
+            "impressions": metrics.get("impressions", 0) or 0,
+            "engagement": engagement,
+            "engagement_rate": round(eng_rate, 2),
+        }
 
-    def _fetch_fb_post_insights(self, post_id: str) -> dict:
-        if not self.fb_access_token:
-            return {"error": "Missing FB token"}
-        try:
-            # 1. Fetch likes and comments
-            url = f"https://graph.facebook.com/{self.api_version}/{post_id}"
-            params = {
-                "fields": "likes.summary(true),comments.summary(true)",
-                "access_token": self.fb_access_token
-            }
-            resp = requests.get(url, params=params, timeout=10)
-            resp.raise_for_status()
-            data = resp.json()
-            
-            likes = data.get("likes", {}).get("summary", {}).get("total_count", 0)
-            comments = data.get("comments", {}).get("summary", {}).get("total_count", 0)
-            
-            # 2. Try fetching reach and impressions
-            reach, impressions = 0, 0
-            params_ins = {
-                "fields": "insights.metric(post_impressions,post_impressions_unique)",
-                "access_token": self.fb_access_token
-            }
-            resp_ins = requests.get(url, params=params_ins, timeout=10)
-            if resp_ins.status_code == 200:
-                insights_data = resp_ins.json().get("insights", {}).get("data", [])
-                for metric in insights_data:
-                    name = metric.get("name")
-                    values = metric.get("values", [])
-                    val = values[0].get("value", 0) if values else 0
-                    if name == "post_impressions_unique":
-                        reach = val
-                    elif name == "post_impressions":
-                        impressions = val
-                    
-            return {"likes": likes, "comments": comments, "reach": reach, "impressions": impressions}
-        except Exception as e:
-            logger.error(f"AnalyticsService: FB post {post_id} error: {e}")
-            return {"error": str(e)}
+    async def _upsert_analytics(self, session: AsyncSession, rows: list[dict]):
+        """
+        Write many posts' latest values with one INSERT ... ON CONFLICT (post_id) DO UPDATE.
+        The update is skipped in the database too when no metric differs from the stored row,
+        so fetched_at marks the last reading that changed something.
+        """
+        now = datetime.now(timezone.utc)
+        stmt = upsert(session.bind.dialect.name, Analytics)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["post_id"],
+            set_={**{m: getattr(stmt.excluded, m) for m in LATEST_METRICS}, "fetched_at": stmt.excluded.fetched_at},
+            where=or_(*[getattr(Analytics, m).is_distinct_from(getattr(stmt.excluded, m)) for m in LATEST_METRICS]),
+        )
+        await session.execute(stmt, [{"id": str(uuid.uuid4()), "fetched_at": now, **row} for row in rows])
+
+    async def refresh_posts(
+        self,
+        session: AsyncSession,
+        post_ids: Optional[list[str]] = None,
+        progress: Optional[Callable[[dict], None]] = None,
+    ) -> dict:
+        """
+        Fetch fresh post-level insights and save them.
+        Covers every published post, or only `post_ids` when given.
+        `progress(summary)` is called once the targets are known and after every batch.
+
+        Posts are grouped by platform into Graph API batch calls (GRAPH_BATCH_SIZE
+        sub-requests, two per post), at most REFRESH_CONCURRENCY batches in flight.
+        Results are applied as batches arrive and committed every REFRESH_COMMIT_EVERY
+        posts, so a refresh that is interrupted keeps what it already fetched.
+        """
+        stmt = select(Post.id, Post.platform, Post.platform_post_id).where(
+            Post.status == PostStatus.published, Post.platform_post_id.is_not(None)
+        )
+        if post_ids is not None:
+            stmt = stmt.where(Post.id.in_(post_ids))
+        targets = (await session.execute(stmt)).all()
+        summary = {"total": len(targets), "updated": 0, "failed": 0}
+        if progress:
+            progress(summary)
+        if not targets:
+            return summary
+
+        # Current values in one query, to skip writing posts whose metrics didn't move
+        existing_stmt = select(Analytics.post_id, *[getattr(Analytics, m) for m in LATEST_METRICS]).where(
+            Analytics.post_id.in_([t.id for t in targets])
+        )
+        existing = {row[0]: tuple(row[1:]) for row in await session.execute(existing_stmt)}
+        summary["unchanged"] = 0
+
+        # Group by platform (and so by token), then chunk into Graph API batches
+        per_batch = GRAPH_BATCH_SIZE // CALLS_PER_POST
+        batches = []
+        for platform in ("instagram", "facebook"):
+            group = [t for t in targets if t.platform.value == platform]
+            batches += [(platform, group[i:i + per_batch]) for i in range(0, len(group), per_batch)]
+        summary["batches"] = len(batches)
+
+        semaphore = asyncio.Semaphore(REFRESH_CONCURRENCY)
+        limits = httpx.Limits(max_connections=REFRESH_CONCURRENCY * 2)
+
+        async with httpx.AsyncClient(timeout=30, limits=limits) as client:
+            async def fetch(platform, group):
+                async with semaphore:
+                    return await self._fetch_batch_metrics(client, platform, group)
+
+            platforms = {t.id: t.platform for t in targets}
+            changed, snapshots = [], []
+
+            async def flush():
+                if changed:
+                    await self._upsert_analytics(session, changed)
+                if snapshots:
+                    await session.execute(insert(AnalyticsSnapshot), snapshots)
+                await session.commit()
+                if changed:
+                    overview_cache.invalidate()
+                changed.clear()
+                snapshots.clear()
+
+            for next_batch in asyncio.as_completed([fetch(platform, group) for platform, group in batches]):
+                for post_id, metrics in (await next_batch).items():
+                    if "error" in metrics:
+                        summary["failed"] += 1
+                        continue
+                    summary["updated"] += 1
+
+                    row = self._analytics_row(post_id, metrics)
+                    # Every reading is appended as a snapshot; the latest-value row only when it moved
+                    snapshots.append(snapshot_row(post_id, platforms[post_id], row))
+                    if existing.get(post_id) == tuple(row[m] for m in LATEST_METRICS):
+                        summary["unchanged"] += 1
+                    else:
+                        changed.append(row)
+                if progress:
+                    progress(summary)
+
+                if len(snapshots) >= REFRESH_COMMIT_EVERY:
+                    await flush()
+
+        await flush()
+        logger.info(
+            f"AnalyticsService: Refreshed {summary['updated']}/{summary['total']} posts "
+            f"({summary['unchanged']} unchanged, {summary['failed']} failed)."
+        )
+        return summary
 
-    async def update_all_post_analytics(self, session: AsyncSession):
+    async def update_all_post_analytics(self, session: AsyncSession) -> dict:
         """Fetch fresh post-level insights for all published posts and save them."""
-        stmt = select(Post).where(Post.status == PostStatus.published, Post.platform_post_id.is_not(None))
-        result = await session.execute(stmt)
-        posts = result.scalars().all()
-
-        for post in posts:
-            if post.platform.value == "instagram":
-                metrics = self._fetch_ig_post_insights(post.platform_post_id)
-            elif post.platform.value == "facebook":
-                metrics = self._fetch_fb_post_insights(post.platform_post_id)
-            else:
-                continue
-            
-            if "error" not in metrics:
-                a_stmt = select(Analytics).where(Analytics.post_id == post.id)
-                a_result = await session.execute(a_stmt)
-                analytics = a_result.scalar_one_or_none()
-                
-                if not analytics:
-                    analytics = Analytics(post_id=post.id)
-                    session.add(analytics)
-                
-                analytics.likes = metrics.get("likes", analytics.likes)
-                analytics.comments = metrics.get("comments", analytics.comments)
-                analytics.reach = metrics.get("reach", analytics.reach)
-                analytics.impressions = metrics.get("impressions", analytics.impressions)
-                
-                # Combine likes and comments into engagement, plus any other actions theoretically
-                analytics.engagement = analytics.likes + analytics.comments
-                eng_rate = (analytics.engagement / analytics.reach * 100) if analytics.reach and analytics.reach > 0 else 0.0
-                analytics.engagement_rate = round(eng_rate, 2)
-                analytics.fetched_at = datetime.now(timezone.utc)
-        
-        await session.commit()
-        logger.info("AnalyticsService: Finished updating all post-level analytics.")
+        return await self.refresh_posts(session)
+
+    async def refresh_all(self, session: AsyncSession, progress: Optional[Callable[[dict], None]] = None) -> dict:
+        """Page-level insights for both platforms and every post's insights, concurrently."""
+        async with httpx.AsyncClient(timeout=15) as client:
+            fb_data, ig_data, posts = await asyncio.gather(
+                self.fetch_facebook_page_insights(client),
+                self.fetch_instagram_insights(client),
+                self.refresh_posts(session, progress=progress),
+            )
+        return {"facebook": fb_data, "instagram": ig_data, "posts": posts}
 
     # ---- Aggregate helpers ----
 
-    async def get_overview(self, session: AsyncSession) -> dict:
-        """Return KPI summary: total reach, impressions, avg engagement rate."""
-        stmt = select(Analytics)
-        result = await session.execute(stmt)
-        rows = result.scalars().all()
-
-        if not rows:
-            return {
-                "total_reach": 0,
-                "total_impressions": 0,
-                "avg_engagement_rate": 0.0,
-                "total_posts_tracked": 0,
+    async def get_overview(
+        self,
+        session: AsyncSession,
+        platform: Optional[PlatformEnum] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+    ) -> dict:
+        """
+        Return KPI summary: total reach, impressions, avg engagement rate, plus the same
+        per platform. Aggregated in SQL (one GROUP BY platform query) and cached until
+        analytics are next written. Date filters apply to the post's published_time.
+        """
+        key = (platform, date_from, date_to)
+        cached = overview_cache.get(key)
+        if cached is not None:
+            return cached
+        generation = overview_cache.generation
+
+        stmt = (
+            select(
+                Post.platform,
+                func.count(Analytics.id),
+                func.coalesce(func.sum(Analytics.reach), 0),
+                func.coalesce(func.sum(Analytics.impressions), 0),
+                func.coalesce(func.sum(Analytics.engagement_rate), 0.0),
+                func.coalesce(func.sum(Analytics.likes), 0),
+                func.coalesce(func.sum(Analytics.comments), 0),
+                func.coalesce(func.sum(Analytics.engagement), 0),
+            )
+            .join(Post, Post.id == Analytics.post_id)
+            .group_by(Post.platform)
+        )
+        if platform:
+            stmt = stmt.where(Post.platform == platform)
+        if date_from:
+            stmt = stmt.where(Post.published_time >= date_from)
+        if date_to:
+            stmt = stmt.where(Post.published_time < date_to)
+
+        totals = {"count": 0, "reach": 0, "impressions": 0, "rate_sum": 0.0}
+        platforms = {}
+        for plat, count, reach, impressions, rate_sum, likes, comments, engagement in await session.execute(stmt):
+            platforms[plat.value] = {
+                "total_reach": reach,
+                "total_impressions": impressions,
+                "avg_engagement_rate": round(rate_sum / count, 2) if count else 0.0,
+                "total_posts_tracked": count,
+                "total_likes": likes,
+                "total_comments": comments,
+                "total_engagement": engagement,
             }
-
-        total_reach = sum(r.reach for r in rows)
-        total_impressions = sum(r.impressions for r in rows)
-        avg_eng = sum(r.engagement_rate for r in rows) / len(rows) if rows else 0.0
-
-        return {
-            "total_reach": total_reach,
-            "total_impressions": total_impressions,
-            "avg_engagement_rate": round(avg_eng, 2),
-            "total_posts_tracked": len(rows),
+            totals["count"] += count
+            totals["reach"] += reach
+            totals["impressions"] += impressions
+            totals["rate_sum"] += rate_sum
+
+        overview = {
+            "total_reach": totals["reach"],
+            "total_impressions": totals["impressions"],
+            "avg_engagement_rate": round(totals["rate_sum"] / totals["count"], 2) if totals["count"] else 0.0,
+            "total_posts_tracked": totals["count"],
+            "platforms": platforms,
         }
+        overview_cache.put(key, overview, generation)
+        return overview
+
+    async def get_post_analytics(
+        self,
+        session: AsyncSession,
+        sort: str = "fetched_at",
+        descending: bool = True,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> list[dict]:
+        """Return per-post analytics joined with post info: one query, sorted and paged in SQL."""
+        column = ANALYTICS_SORT_COLUMNS[sort]
+        post_labels = [f"post_{c.key}" for c in ANALYTICS_POST_COLUMNS]
+        stmt = (
+            select(*ANALYTICS_LIST_COLUMNS, *[c.label(label) for c, label in zip(ANALYTICS_POST_COLUMNS, post_labels)])
+            .outerjoin(Post, Post.id == Analytics.post_id)
+            .order_by(column.desc() if descending else column.asc(), Analytics.id)
+            .offset(offset)
+        )
+        if limit is not None:
+            stmt = stmt.limit(limit)
+
+        entries = rows_to_dicts(await session.execute(stmt))
+        for entry in entries:
+            post = {c.key: entry.pop(label) for c, label in zip(ANALYTICS_POST_COLUMNS, post_labels)}
+            if post["id"] is not None:
+                entry["post"] = post
+        return entries
 
-    async def get_post_analytics(self, session: AsyncSession) -> list[dict]:
-        """Return per-post analytics joined with post info."""
-        stmt = select(Analytics).order_by(Analytics.fetched_at.desc())
-        result = await session.execute(stmt)
-        rows = result.scalars().all()
-
-        enriched = []
-        for row in rows:
-            # Eagerly load the post
-            post_stmt = select(Post).where(Post.id == row.post_id)
-            post_result = await session.execute(post_stmt)
-            post = post_result.scalar_one_or_none()
-
-            entry = row.to_dict()
-            if post:
-                entry["post"] = post.to_dict()
-            enriched.append(entry)
-
-        return enriched
-
-    async def get_insights_timeseries(self, session: AsyncSession) -> list[dict]:
-        """Return analytics rows ordered by time for charting."""
-        stmt = select(Analytics).order_by(Analytics.fetched_at.asc())
-        result = await session.execute(stmt)
-        rows = result.scalars().all()
-        return [r.to_dict() for r in rows]
+    async def count_post_analytics(self, session: AsyncSession) -> int:
+        return await session.scalar(select(func.count()).select_from(Analytics))
 
     async def delete_platform_post(self, platform: str, platform_post_id: str) -> bool:
         """Deletes a post directly from Facebook or Instagram Graph API"""
         if not platform_post_id:
             return False
-            
+
+        platform = platform.lower()
+        if platform not in ("instagram", "facebook"):
+            return False
+        token = self._token_for(platform)
+        if not token:
+            logger.warning(f"AnalyticsService: Missing token for {platform}")
+            return False
+
+        url = f"https://graph.facebook.com/{self.api_version}/{platform_post_id}"
+        api_budget.charge(1)
         try:
-            url = f"https://graph.facebook.com/{self.api_version}/{platform_post_id}"
-            
-            if platform.lower() == "instagram":
-                token = self.ig_access_token
-            elif platform.lower() == "facebook":
-                token = self.fb_access_token
-            else:
-                return False
-                
-            if not token:
-                logger.warning(f"AnalyticsService: Missing token for {platform}")
-                return False
-                
-            params = {"access_token": token}
-            resp = requests.delete(url, params=params, timeout=10)
+            async with httpx.AsyncClient(timeout=10) as client:
+                resp = await traced_async_request(client, "DELETE", url, upstream="graph_api", platform=platform, params={"access_token": token})
             resp.raise_for_status()
             logger.info(f"AnalyticsService: Successfully deleted {platform} post {platform_post_id} from Graph API.")
             return True
-        except Exception as e:
+        except httpx.HTTPError as e:
             logger.error(f"AnalyticsService: Failed to delete {platform} post {platform_post_id}. Ensure token has Delete permissions: {e}")
             # If it's a 400 error because the post was already deleted on IG directly, return True to clear our DB.
             return False
+
+    async def delete_platform_posts(self, posts: list) -> dict[str, Optional[str]]:
+        """
+        Delete many posts from the Graph API: batch calls of GRAPH_BATCH_SIZE DELETEs, up to
+        REFRESH_CONCURRENCY at once. Each batch is sent only if the shared API budget covers
+        it; posts in batches it can't cover get BUDGET_EXHAUSTED. `posts` rows need id,
+        platform and platform_post_id. Returns post id -> error, None where it was deleted.
+        """
+        results: dict[str, Optional[str]] = {}
+        by_platform: dict[str, list] = {}
+        for p in posts:
+            platform = PlatformEnum(p.platform).value
+            if not self._token_for(platform):
+                results[p.id] = f"Missing {platform} token"
+            else:
+                by_platform.setdefault(platform, []).append(p)
+        batches = [
+            (platform, group[i:i + GRAPH_BATCH_SIZE])
+            for platform, group in by_platform.items()
+            for i in range(0, len(group), GRAPH_BATCH_SIZE)
+        ]
+        if not batches:
+            return results
+
+        semaphore = asyncio.Semaphore(REFRESH_CONCURRENCY)
+        limits = httpx.Limits(max_connections=REFRESH_CONCURRENCY * 2)
+
+        async with httpx.AsyncClient(timeout=30, limits=limits) as client:
+            async def delete_batch(platform, group):
+                async with semaphore:
+                    if not api_budget.try_acquire(len(group)):
+                        return {p.id: BUDGET_EXHAUSTED for p in group}
+                    try:
+                        responses = await self._graph_batch(
+                            client, self._token_for(platform), platform,
+                            [p.platform_post_id for p in group], method="DELETE",
+                        )
+                    except (httpx.HTTPError, ValueError) as e:
+                        logger.error(f"AnalyticsService: {platform} delete batch of {len(group)} posts failed: {e}")
+                        return {p.id: str(e) for p in group}
+
+                out = {}
+                for p, response in zip(group, responses):
+                    if response is None:
+                        out[p.id] = "No response from Graph API"
+                    elif response[0] != 200:
+                        out[p.id] = response[1].get("error", {}).get("message", f"HTTP {response[0]}")
+                    else:
+                        out[p.id] = None
+                return out
+
+            for batch_results in await asyncio.gather(*[delete_batch(platform, group) for platform, group in batches]):
+                results.update(batch_results)
+
+        failed = sum(error is not None for error in results.values())
+        logger.info(f"AnalyticsService: Deleted {len(results) - failed}/{len(results)} posts from Graph API.")
+        return results
+
+
+def dedupe_analytics(conn):
+    """
+    Keep only the newest analytics row per post, so the unique index on post_id can be
+    built on databases written before it existed. Sync; run via conn.run_sync in init_db.
+    """
+    dupes = conn.execute(text(
+        "SELECT 1 FROM analytics GROUP BY post_id HAVING COUNT(*) > 1 LIMIT 1"
+    )).first()
+    if not dupes:
+        return
+    result = conn.execute(text(
+        "DELETE FROM analytics WHERE id NOT IN ("
+        " SELECT id FROM ("
+        "  SELECT id, ROW_NUMBER() OVER (PARTITION BY post_id ORDER BY fetched_at DESC, id DESC) AS rn"
+        "  FROM analytics"
+        " ) ranked WHERE rn = 1"
+        ")"
+    ))
+    logger.info(f"AnalyticsService: Removed {result.rowcount} duplicate analytics rows.")
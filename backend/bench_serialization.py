@@ -0,0 +1,91 @@
+"""
+Benchmark: GET /posts serialization, ORM + to_dict() + jsonable_encoder vs
+column projection + FastJSONResponse.
+
+Builds a throwaway SQLite database with 10k and 100k posts and times both paths
+end to end (query, row materialisation, JSON encoding, gzip).
+
+    python bench_serialization.py
+"""
+
+import os
+import gzip
+import json
+import time
+import asyncio
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from database import Base
+from db_models import Post, PostStatus, PlatformEnum, POST_LIST_COLUMNS
+from fast_json import dumps, rows_to_dicts
+
+SIZES = (10_000, 100_000)
+REPEATS = 3
+
+
+async def _seed(session_factory, n: int):
+    now = datetime.now(timezone.utc)
+    rows = [{
+        "id": f"post-{i:07d}",
+        "platform": PlatformEnum.instagram if i % 2 else PlatformEnum.facebook,
+        "caption": f"Caption number {i} with a few hashtags #autopost #bench",
+        "image_url": "https://images.unsplash.com/photo-1618005182384-a83a8bd57fbe?w=1200",
+        "status": PostStatus.published,
+        "scheduled_time": now - timedelta(minutes=i),
+        "published_time": now - timedelta(minutes=i),
+        "created_at": now - timedelta(minutes=i),
+        "updated_at": now - timedelta(minutes=i),
+        "version": i + 1,
+    } for i in range(n)]
+    async with session_factory() as session:
+        for start in range(0, n, 10_000):
+            await session.execute(insert(Post), rows[start:start + 10_000])
+        await session.commit()
+
+
+async def _orm_path(session_factory) -> bytes:
+    async with session_factory() as session:
+        posts = (await session.execute(select(Post).order_by(Post.created_at.desc()))).scalars().all()
+        body = [p.to_dict() for p in posts]
+        return json.dumps(jsonable_encoder(body)).encode()
+
+
+async def _fast_path(session_factory) -> bytes:
+    async with session_factory() as session:
+        result = await session.execute(select(*POST_LIST_COLUMNS).order_by(Post.created_at.desc()))
+        return dumps(rows_to_dicts(result))
+
+
+async def _time(fn, session_factory) -> tuple[float, int, int]:
+    best = float("inf")
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        body = await fn(session_factory)
+        best = min(best, time.perf_counter() - started)
+    return best, len(body), len(gzip.compress(body, compresslevel=6))
+
+
+async def main():
+    for n in SIZES:
+        path = os.path.join(tempfile.mkdtemp(), "bench.db")
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        await _seed(session_factory, n)
+
+        orm_s, orm_bytes, _ = await _time(_orm_path, session_factory)
+        fast_s, fast_bytes, gz_bytes = await _time(_fast_path, session_factory)
+        print(f"{n:>7} rows | ORM + to_dict + jsonable_encoder: {orm_s * 1000:8.1f} ms ({orm_bytes / 1e6:.1f} MB)")
+        print(f"{'':>7}      | projection + FastJSONResponse:    {fast_s * 1000:8.1f} ms ({fast_bytes / 1e6:.1f} MB, "
+              f"{gz_bytes / 1e6:.1f} MB gzipped) -> {orm_s / fast_s:.1f}x faster")
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,204 @@
+"""
+Best-time-to-post recommender built from historical analytics.
+
+Every published post with analytics contributes its engagement rate to one of 168
+weekday x hour slots (UTC) for its platform. The lookup table keeps per-slot counts
+and sums in NumPy arrays; expected engagement per slot is then
+    - pooled with the neighbouring hours (weights 1/4, 1/2, 1/4), and
+    - shrunk toward the platform's overall rate with a prior of PRIOR_WEIGHT posts,
+so sparse slots fall back to the baseline instead of ranking on one lucky post.
+Confidence is the pooled count's share, n / (n + PRIOR_WEIGHT). Slots below
+MIN_CONFIDENCE are never recommended, so a platform without history gets none.
+
+The table is updated incrementally: only analytics rows changed since the last sync
+(by fetched_at, which moves only when metrics change) are re-applied, each post's old
+contribution swapped for its new one. A full rebuild every REBUILD_HOURS drops posts
+deleted since.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import select
+
+from database import read_session
+from db_models import Analytics, Post, PostStatus, PlatformEnum
+
+logger = logging.getLogger(__name__)
+
+PRIOR_WEIGHT = float(os.getenv("BEST_TIME_PRIOR_WEIGHT", "5"))
+REBUILD_HOURS = float(os.getenv("BEST_TIME_REBUILD_HOURS", "6"))
+# About one post in the slot itself, or one in each neighbouring hour
+MIN_CONFIDENCE = float(os.getenv("BEST_TIME_MIN_CONFIDENCE", "0.05"))
+
+SLOTS = 7 * 24  # Monday 00:00 .. Sunday 23:00
+PLATFORMS = list(PlatformEnum)
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+
+def _epoch_seconds(values) -> np.ndarray:
+    # Post times are stored in UTC: naive on SQLite, aware on PostgreSQL
+    return np.array(
+        [(v if v.tzinfo else v.replace(tzinfo=timezone.utc)).timestamp() for v in values],
+        dtype=np.int64,
+    )
+
+
+def slot_of(epoch_seconds: np.ndarray) -> np.ndarray:
+    """Weekday x hour slot (weekday * 24 + hour, Monday = 0) of UTC epoch seconds."""
+    # 1970-01-01 was a Thursday: shift by 3 days so slot 0 is Monday 00:00
+    return (epoch_seconds // 3600 + 3 * 24) % SLOTS
+
+
+class BestTimes:
+    def __init__(self):
+        shape = (len(PLATFORMS), SLOTS)
+        self._count = np.zeros(shape)
+        self._sum = np.zeros(shape)
+        # post_id -> (platform index, slot, engagement rate) currently counted
+        self._posts: dict[str, tuple[int, int, float]] = {}
+        self._synced_until: Optional[datetime] = None
+        self._rebuilt_at = 0.0
+        self._lock = asyncio.Lock()
+        # Precomputed from the counts whenever they change
+        self.expected = np.zeros(shape)
+        self.confidence = np.zeros(shape)
+        self.baseline = np.zeros(len(PLATFORMS))
+
+    async def refresh(self):
+        """Apply analytics written since the last sync; rebuild in full when due."""
+        async with self._lock:
+            rebuild = time.time() - self._rebuilt_at > REBUILD_HOURS * 3600
+            stmt = (
+                select(Analytics.post_id, Post.platform, Post.published_time, Analytics.engagement_rate, Analytics.fetched_at)
+                .join(Post, Post.id == Analytics.post_id)
+                .where(
+                    Post.status == PostStatus.published,
+                    Post.published_time.is_not(None),
+                    Analytics.reach > 0,  # No reach yet: no signal
+                )
+            )
+            if not rebuild and self._synced_until is not None:
+                # >=: rows sharing the last timestamp are re-applied, which is idempotent
+                stmt = stmt.where(Analytics.fetched_at >= self._synced_until)
+
+            async with read_session() as session:
+                rows = (await session.execute(stmt)).all()
+
+            if rebuild:
+                self._load(rows)
+                self._rebuilt_at = time.time()
+            elif rows:
+                self._apply(rows)
+            else:
+                return
+            fetched = [r.fetched_at for r in rows if r.fetched_at is not None]
+            if fetched:
+                self._synced_until = max(fetched + ([self._synced_until] if self._synced_until else []))
+            self._recompute()
+
+    @staticmethod
+    def _columns(rows) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        platform_index = {p: i for i, p in enumerate(PLATFORMS)}
+        platforms = np.array([platform_index[r.platform] for r in rows], dtype=np.int64)
+        slots = slot_of(_epoch_seconds([r.published_time for r in rows]))
+        rates = np.array([r.engagement_rate or 0.0 for r in rows], dtype=float)
+        return platforms, slots, rates
+
+    def _load(self, rows):
+        self._count[:] = 0
+        self._sum[:] = 0
+        self._posts = {}
+        if rows:
+            platforms, slots, rates = self._columns(rows)
+            np.add.at(self._count, (platforms, slots), 1)
+            np.add.at(self._sum, (platforms, slots), rates)
+            self._posts = dict(zip((r.post_id for r in rows), zip(platforms.tolist(), slots.tolist(), rates.tolist())))
+        logger.info(f"BestTimes: Rebuilt from {len(rows)} posts.")
+
+    def _apply(self, rows):
+        # Take out what the posts counted for before, then add their current values
+        previous = [self._posts[r.post_id] for r in rows if r.post_id in self._posts]
+        if previous:
+            old_platforms, old_slots, old_rates = (np.array(c) for c in zip(*previous))
+            np.subtract.at(self._count, (old_platforms, old_slots), 1)
+            np.subtract.at(self._sum, (old_platforms, old_slots), old_rates)
+
+        platforms, slots, rates = self._columns(rows)
+        np.add.at(self._count, (platforms, slots), 1)
+        np.add.at(self._sum, (platforms, slots), rates)
+        self._posts.update(zip((r.post_id for r in rows), zip(platforms.tolist(), slots.tolist(), rates.tolist())))
+
+    def _recompute(self):
+        totals = self._count.sum(axis=1)
+        self.baseline = np.divide(self._sum.sum(axis=1), totals, out=np.zeros_like(totals), where=totals > 0)
+
+        # Pool each slot with its neighbouring hours (circular: Sunday 23:00 borders Monday 00:00)
+        def pooled(a):
+            return 0.5 * a + 0.25 * (np.roll(a, 1, axis=1) + np.roll(a, -1, axis=1))
+
+        count, total = pooled(self._count), pooled(self._sum)
+        self.expected = (total + PRIOR_WEIGHT * self.baseline[:, None]) / (count + PRIOR_WEIGHT)
+        self.confidence = count / (count + PRIOR_WEIGHT)
+
+    def recommend(self, platform: Optional[PlatformEnum] = None, tz_offset: int = 0, limit: int = 5,
+                  include_grid: bool = False) -> dict:
+        """
+        Top `limit` slots per platform in the viewer's local time (`tz_offset`, minutes east
+        of UTC, applied to the nearest hour), with their next occurrence after now.
+        """
+        shift = round(tz_offset / 60)
+        now_local = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(minutes=tz_offset)
+        now_slot = now_local.weekday() * 24 + now_local.hour
+        hour_start = now_local.replace(minute=0, second=0, microsecond=0)
+
+        out = {}
+        for i, p in enumerate(PLATFORMS):
+            if platform and p != platform:
+                continue
+            # Local slot = UTC slot + shift
+            expected = np.roll(self.expected[i], shift)
+            confidence = np.roll(self.confidence[i], shift)
+            counts = np.roll(self._count[i], shift)
+            # Best first, ties broken by confidence; slots without enough history left out
+            order = np.lexsort((-confidence, -expected))
+            order = order[confidence[order] >= MIN_CONFIDENCE][:limit]
+            slots = []
+            for s in order.tolist():
+                hours_ahead = (s - now_slot) % SLOTS or SLOTS
+                slots.append({
+                    "weekday": WEEKDAYS[s // 24],
+                    "hour": s % 24,
+                    "expected_engagement_rate": round(float(expected[s]), 2),
+                    "posts": int(counts[s]),
+                    "confidence": round(float(confidence[s]), 2),
+                    "next": (hour_start + timedelta(hours=hours_ahead)).strftime("%Y-%m-%dT%H:%M"),
+                })
+            entry = {
+                "baseline_engagement_rate": round(float(self.baseline[i]), 2),
+                "posts": int(self._count[i].sum()),
+                "slots": slots,
+            }
+            if include_grid:
+                entry["grid"] = {
+                    "expected": np.round(expected.reshape(7, 24), 2).tolist(),
+                    "confidence": np.round(confidence.reshape(7, 24), 2).tolist(),
+                }
+            out[p.value] = entry
+        return out
+
+    async def next_best_time(self, platform: PlatformEnum) -> Optional[datetime]:
+        """Next occurrence (UTC) of the platform's best slot; None without enough history."""
+        await self.refresh()
+        slots = self.recommend(platform, limit=1)[platform.value]["slots"]
+        if not slots:
+            return None
+        return datetime.fromisoformat(slots[0]["next"]).replace(tzinfo=timezone.utc)
+
+
+best_times = BestTimes()
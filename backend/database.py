@@ -4,16 +4,62 @@ Uses SQLite via aiosqlite for local dev. Swap connection string for PostgreSQL l
 """
 
 import os
+import logging
+from datetime import timezone
+from sqlalchemy import event, inspect, text, select, insert, update, bindparam
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 
-# SQLite database file lives next to this module
+logger = logging.getLogger(__name__)
+
+# SQLite database file lives next to this module unless DATABASE_URL says otherwise
 DB_PATH = os.path.join(os.path.dirname(__file__), "autopost.db")
-DATABASE_URL = f"sqlite+aiosqlite:///{DB_PATH}"
+DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite+aiosqlite:///{DB_PATH}")
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+# Applied on every SQLite connection. WAL lets readers run alongside the one writer;
+# NORMAL sync is durable in WAL except for the last commits on power loss; waits on
+# the write lock instead of failing with "database is locked".
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"),
+    "cache_size": os.getenv("SQLITE_CACHE_SIZE", "-65536"),  # Negative: KiB, so 64 MiB
+    "mmap_size": os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)),
+    "temp_store": "MEMORY",
+}
+
+
+def _make_engine(url: str, read_only: bool = False):
+    pool_size = DB_READ_POOL_SIZE if read_only else DB_POOL_SIZE
+    new_engine = create_async_engine(
+        url, echo=False, pool_size=pool_size, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT,
+    )
+    if new_engine.dialect.name == "sqlite":
+        @event.listens_for(new_engine.sync_engine, "connect")
+        def _apply_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for name, value in SQLITE_PRAGMAS.items():
+                if read_only and name == "journal_mode":
+                    continue  # Persistent in the file, and switching it needs a write
+                cursor.execute(f"PRAGMA {name}={value}")
+            if read_only:
+                cursor.execute("PRAGMA query_only=ON")
+            cursor.close()
+    return new_engine
+
 
-engine = create_async_engine(DATABASE_URL, echo=False)
+engine = _make_engine(DATABASE_URL)
+# Analytics reads go through their own pool, so they never queue behind writers' connections
+read_engine = _make_engine(DATABASE_URL, read_only=True)
 
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+read_session = async_sessionmaker(read_engine, class_=AsyncSession, expire_on_commit=False)
 
 
 class Base(DeclarativeBase):
@@ -22,12 +68,131 @@ class Base(DeclarativeBase):
 
 async def init_db():
     """Create all tables. Called once on app startup."""
-    from db_models import Post, Analytics  # noqa: F401 — ensure models are registered
+    from db_models import (  # noqa: F401 — ensure models are registered
+        Post, Analytics, AnalyticsSnapshot, AnalyticsRollup, IdempotencyKey, PostTombstone, SyncCounter,
+        GraphCacheEntry,
+    )
+    from post_search import ensure_search_index
+    from analytics_rollup import seed_snapshots, prune_orphaned_history
+    from analytics_service import dedupe_analytics
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(dedupe_analytics)  # Before the unique index on analytics.post_id is built
+        await conn.run_sync(_upgrade_schema)
+        await conn.run_sync(ensure_search_index)
+        await conn.run_sync(seed_snapshots)
+        await conn.run_sync(prune_orphaned_history)
+
+
+# Indexes earlier versions of the models created and later ones replaced
+REPLACED_INDEXES = (
+    "ix_posts_scheduled_time_platform",  # -> ix_posts_scheduled_time_platform_status
+    "ix_posts_published_time_platform",  # -> ix_posts_published_time_platform_status
+    "ix_analytics_post_id",  # -> ix_analytics_post_id_unique
+)
+
+
+def _upgrade_schema(conn):
+    """
+    Bring an existing database up to the current models.
+    create_all skips tables that already exist, so columns and indexes added to
+    existing tables later have to be created here.
+    """
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(conn.dialect)}"
+            if column.server_default is not None:
+                ddl += f" NOT NULL DEFAULT {column.server_default.arg}" if not column.nullable else f" DEFAULT {column.server_default.arg}"
+            conn.execute(text(ddl))
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+    # Drop indexes the models have since replaced; anything else is left alone
+    existing = {index["name"] for table in inspector.get_table_names() for index in inspector.get_indexes(table)}
+    for name in REPLACED_INDEXES:
+        if name in existing:
+            conn.execute(text(f"DROP INDEX {name}"))
+    _convert_post_times_to_utc(conn)
+
+
+# sync_counters flag: set once post times have been converted from server-local time to UTC
+POST_TIMES_UTC = "post_times_utc"
+
+
+def _convert_post_times_to_utc(conn):
+    """
+    Post times used to be written and read as the server's naive local time (the
+    scheduler compared them with datetime.now(), the browser showed them as local);
+    they are now UTC. Convert existing rows once, so scheduled posts still fire at the
+    same moment and history keeps its wall time. PostgreSQL's timestamptz already
+    stored the offset, so only SQLite needs it.
+    """
+    from db_models import Post, SyncCounter
+
+    if conn.dialect.name != "sqlite":
+        return
+    if conn.execute(select(SyncCounter.value).where(SyncCounter.name == POST_TIMES_UTC)).first() is not None:
+        return
+
+    def to_utc(value):
+        # Naive values are taken as local time; per value, so DST is respected
+        return value.astimezone(timezone.utc).replace(tzinfo=None) if value is not None else None
+
+    rows = conn.execute(
+        select(Post.id, Post.scheduled_time, Post.published_time)
+        .where((Post.scheduled_time.is_not(None)) | (Post.published_time.is_not(None)))
+    ).all()
+    if rows:
+        # Core statement, so the ORM version hooks don't restamp every post
+        conn.execute(
+            update(Post).where(Post.id == bindparam("post_id")).values(
+                scheduled_time=bindparam("scheduled"), published_time=bindparam("published"),
+            ),
+            [
+                {"post_id": row.id, "scheduled": to_utc(row.scheduled_time), "published": to_utc(row.published_time)}
+                for row in rows
+            ],
+        )
+        logger.info(f"Database: Converted times of {len(rows)} posts from local time to UTC.")
+    conn.execute(insert(SyncCounter).values(name=POST_TIMES_UTC, value=1))
+
+
+def upsert(dialect_name: str, table):
+    """
+    INSERT that supports .on_conflict_do_update / .on_conflict_do_nothing
+    on both SQLite and PostgreSQL.
+    """
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table)
+
+
+async def _traced_session(factory, name: str):
+    from tracing import tracer
+    # Not activated: the dependency is torn down outside the endpoint's context
+    db_span, _ = tracer.start_span(name, kind="db", activate=False)
+    try:
+        async with factory() as session:
+            yield session
+    except SQLAlchemyError:
+        db_span.set(status="error")
+        raise
+    finally:
+        tracer.end_span(db_span)
 
 
 async def get_db() -> AsyncSession:
-    """FastAPI dependency — yields an async session."""
-    async with async_session() as session:
+    """FastAPI dependency — yields an async session, traced as one `db` span per request."""
+    async for session in _traced_session(async_session, "db.session"):
+        yield session
+
+
+async def get_read_db() -> AsyncSession:
+    """Same as get_db, on the read-only engine; for endpoints that only query."""
+    async for session in _traced_session(read_session, "db.read_session"):
         yield session
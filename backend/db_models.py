@@ -5,9 +5,11 @@ SQLAlchemy ORM models for the posts and analytics tables.
 import uuid
 import enum
 from datetime import datetime, timezone
+from typing import Optional
 
 from sqlalchemy import (
-    Column, String, Text, Enum, DateTime, Float, ForeignKey, Integer
+    Boolean, Column, String, Text, Enum, DateTime, Float, ForeignKey, Integer, Index,
+    event, insert, select, update,
 )
 from sqlalchemy.orm import relationship
 from database import Base
@@ -37,6 +39,13 @@ def _utcnow() -> datetime:
     return datetime.now(timezone.utc)
 
 
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    # Stored in UTC; SQLite hands timestamps back naive
+    if value is None:
+        return None
+    return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).isoformat()
+
+
 class Post(Base):
     __tablename__ = "posts"
 
@@ -51,10 +60,25 @@ class Post(Base):
     created_at = Column(DateTime(timezone=True), default=_utcnow)
     updated_at = Column(DateTime(timezone=True), default=_utcnow, onupdate=_utcnow)
     platform_post_id = Column(String, nullable=True)  # new field
+    # Monotonic change version for GET /posts/changes; stamped on every write
+    version = Column(Integer, nullable=False, default=0, server_default="0")
 
     # Relationship
     analytics = relationship("Analytics", back_populates="post", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Keyset pagination order for GET /posts
+        Index("ix_posts_created_at_id", "created_at", "id"),
+        # Calendar range queries, optionally narrowed by platform; covering for the
+        # per-day platform/status counts in GET /posts/calendar
+        Index("ix_posts_scheduled_time_platform_status", "scheduled_time", "platform", "status"),
+        Index("ix_posts_published_time_platform_status", "published_time", "platform", "status"),
+        # Scheduler due set and status filters
+        Index("ix_posts_status_scheduled_time", "status", "scheduled_time"),
+        # Delta sync: rows changed after a given version
+        Index("ix_posts_version", "version"),
+    )
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -63,14 +87,23 @@ class Post(Base):
             "caption": self.caption,
             "image_url": self.image_url,
             "status": self.status.value if self.status else None,
-            "scheduled_time": self.scheduled_time.isoformat() if self.scheduled_time else None,
-            "published_time": self.published_time.isoformat() if self.published_time else None,
+            "scheduled_time": _isoformat(self.scheduled_time),
+            "published_time": _isoformat(self.published_time),
             "platform_post_id": self.platform_post_id,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "created_at": _isoformat(self.created_at),
+            "updated_at": _isoformat(self.updated_at),
+            "version": self.version,
         }
 
 
+# Columns returned by list endpoints; same keys as Post.to_dict() without loading ORM objects
+POST_LIST_COLUMNS = (
+    Post.id, Post.user_id, Post.platform, Post.caption, Post.image_url, Post.status,
+    Post.scheduled_time, Post.published_time, Post.platform_post_id,
+    Post.created_at, Post.updated_at, Post.version,
+)
+
+
 class Analytics(Base):
     __tablename__ = "analytics"
 
@@ -87,6 +120,15 @@ class Analytics(Base):
     # Relationship
     post = relationship("Post", back_populates="analytics")
 
+    __table_args__ = (
+        # One latest-value row per post (upsert target), and the join to posts;
+        # then the sort orders offered by GET /analytics/posts
+        Index("ix_analytics_post_id_unique", "post_id", unique=True),
+        Index("ix_analytics_fetched_at", "fetched_at"),
+        Index("ix_analytics_engagement_rate", "engagement_rate"),
+        Index("ix_analytics_reach", "reach"),
+    )
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -97,5 +139,150 @@ class Analytics(Base):
             "likes": self.likes,
             "comments": self.comments,
             "engagement_rate": self.engagement_rate,
-            "fetched_at": self.fetched_at.isoformat() if self.fetched_at else None,
+            "fetched_at": _isoformat(self.fetched_at),
         }
+
+
+class AnalyticsSnapshot(Base):
+    """
+    Append-only metric readings, one row per post per refresh.
+    `analytics` keeps only the latest values; this keeps the growth curve.
+    Raw rows are rolled up into analytics_rollups and pruned after a retention period.
+    """
+    __tablename__ = "analytics_snapshots"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    post_id = Column(String, ForeignKey("posts.id", ondelete="CASCADE"), nullable=False)
+    platform = Column(Enum(PlatformEnum), nullable=False)
+    captured_at = Column(DateTime, nullable=False)  # Naive UTC
+    reach = Column(Integer, nullable=False, default=0)
+    impressions = Column(Integer, nullable=False, default=0)
+    likes = Column(Integer, nullable=False, default=0)
+    comments = Column(Integer, nullable=False, default=0)
+    engagement = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_analytics_snapshots_captured_at_platform", "captured_at", "platform"),
+        Index("ix_analytics_snapshots_post_id_captured_at", "post_id", "captured_at"),
+    )
+
+
+class AnalyticsRollup(Base):
+    """Per-post metrics at the end of each hour or day (the bucket's highest reading)."""
+    __tablename__ = "analytics_rollups"
+
+    granularity = Column(String, primary_key=True)  # "hour" | "day"
+    bucket_start = Column(DateTime, primary_key=True)  # Naive UTC
+    post_id = Column(String, ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True)
+    platform = Column(Enum(PlatformEnum), nullable=False)
+    reach = Column(Integer, nullable=False, default=0)
+    impressions = Column(Integer, nullable=False, default=0)
+    likes = Column(Integer, nullable=False, default=0)
+    comments = Column(Integer, nullable=False, default=0)
+    engagement = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_analytics_rollups_granularity_platform_bucket", "granularity", "platform", "bucket_start"),
+        Index("ix_analytics_rollups_post_id", "post_id", "granularity", "bucket_start"),
+    )
+
+
+class IdempotencyKey(Base):
+    """Stored response for a request made with an Idempotency-Key header."""
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String, primary_key=True)
+    endpoint = Column(String, nullable=False)
+    request_hash = Column(String, nullable=False)
+    status_code = Column(Integer, nullable=False, default=200)
+    # Claimed by a request that is still running; response_body is empty until it finishes
+    pending = Column(Boolean, nullable=False, default=False, server_default="0")
+    claim_token = Column(String, nullable=True)  # Which request holds the pending claim
+    response_body = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), default=_utcnow)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+    )
+
+
+class GraphCacheEntry(Base):
+    """Cached Graph API result (account metadata, page insights), shared by all workers."""
+    __tablename__ = "graph_cache"
+
+    key = Column(String, primary_key=True)
+    value = Column(Text, nullable=False)  # JSON
+    fetched_at = Column(DateTime(timezone=True), default=_utcnow)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index("ix_graph_cache_expires_at", "expires_at"),
+    )
+
+
+class PostTombstone(Base):
+    """Marks a deleted post so delta-sync clients can drop it."""
+    __tablename__ = "post_tombstones"
+
+    post_id = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, index=True)
+    deleted_at = Column(DateTime(timezone=True), default=_utcnow, index=True)
+
+
+class SyncCounter(Base):
+    """Named monotonic counters (the posts change version lives here)."""
+    __tablename__ = "sync_counters"
+
+    name = Column(String, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+
+ANALYTICS_LIST_COLUMNS = (
+    Analytics.id, Analytics.post_id, Analytics.reach, Analytics.impressions, Analytics.engagement,
+    Analytics.likes, Analytics.comments, Analytics.engagement_rate, Analytics.fetched_at,
+)
+
+# Post fields embedded in each GET /analytics/posts entry: the whole Post.to_dict()
+ANALYTICS_POST_COLUMNS = POST_LIST_COLUMNS
+
+
+# ---------- Sync versioning ----------
+
+POSTS_VERSION = "posts"
+TOMBSTONE_HORIZON = "posts_tombstone_horizon"  # Highest version whose tombstones were pruned
+
+
+def next_versions(connection, count: int = 1) -> int:
+    """
+    Reserve `count` consecutive post versions; returns the last one.
+    The UPDATE takes the write lock, so concurrent writers never share a version.
+    """
+    new_value = connection.execute(
+        update(SyncCounter)
+        .where(SyncCounter.name == POSTS_VERSION)
+        .values(value=SyncCounter.value + count)
+        .returning(SyncCounter.value)
+    ).scalar()
+    if new_value is None:
+        connection.execute(insert(SyncCounter).values(name=POSTS_VERSION, value=count))
+        new_value = count
+    return new_value
+
+
+@event.listens_for(Post, "before_insert")
+@event.listens_for(Post, "before_update")
+def _stamp_post_version(mapper, connection, target):
+    target.version = next_versions(connection)
+
+
+@event.listens_for(Post, "after_delete")
+def _tombstone_post(mapper, connection, target):
+    connection.execute(
+        insert(PostTombstone).values(post_id=target.id, version=next_versions(connection), deleted_at=_utcnow())
+    )
+
+
+async def current_posts_version(session) -> int:
+    value = await session.scalar(select(SyncCounter.value).where(SyncCounter.name == POSTS_VERSION))
+    return value or 0
@@ -0,0 +1,84 @@
+"""
+Shape-preserving downsampling for chart series.
+
+Largest-Triangle-Three-Buckets (LTTB) picks, per bucket, the point that forms the
+largest triangle with the previously kept point and the next bucket's average, so
+peaks and dips survive. Each output point also carries the min/max of every metric
+over its bucket, so charts can draw an envelope of what was dropped.
+
+Series are held in typed array columns (timestamps as 'd', counts as 'q'), not
+per-row dicts or ORM objects.
+"""
+
+from array import array
+from datetime import datetime, timezone
+
+
+def lttb_buckets(n: int, threshold: int) -> list[tuple[int, int]]:
+    """
+    Index ranges [start, end) of the LTTB buckets: the first and last point alone,
+    the rest split evenly into threshold - 2 buckets. One point each when n <= threshold.
+    """
+    if threshold >= n or threshold < 3:
+        return [(i, i + 1) for i in range(n)]
+    every = (n - 2) / (threshold - 2)
+    middle = [(int(i * every) + 1, int((i + 1) * every) + 1) for i in range(threshold - 2)]
+    return [(0, 1), *middle, (n - 1, n)]
+
+
+def lttb_indices(xs: array, ys: array, threshold: int) -> list[int]:
+    """Indices of the points LTTB keeps, one per bucket; always includes the first and last point."""
+    n = len(xs)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+
+    buckets = lttb_buckets(n, threshold)
+    kept = [0]
+    a = 0
+    for pos in range(1, len(buckets) - 1):
+        start, end = buckets[pos]
+
+        # Average of the next bucket (the last point for the final bucket)
+        next_start, next_end = buckets[pos + 1]
+        count = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / count
+        avg_y = sum(ys[next_start:next_end]) / count
+
+        ax, ay = xs[a], ys[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        kept.append(best)
+        a = best
+    kept.append(n - 1)
+    return kept
+
+
+def downsample_points(points: list[dict], threshold: int, metrics: tuple, key: str, time_key: str = "time") -> list[dict]:
+    """
+    Downsample `points` (sorted by `time_key`) to about `threshold` points.
+    Selection follows the `key` metric; every metric gets `<metric>_min`/`<metric>_max`
+    over the bucket the kept point represents (the value itself when nothing was dropped).
+    """
+    def ts(value) -> float:
+        if isinstance(value, datetime):
+            if value.tzinfo is None:
+                value = value.replace(tzinfo=timezone.utc)
+            return value.timestamp()
+        return float(value)
+
+    xs = array("d", (ts(p[time_key]) for p in points))
+    columns = {m: array("q", (int(p[m] or 0) for p in points)) for m in metrics}
+    kept = lttb_indices(xs, columns[key], threshold)
+
+    out = []
+    for idx, (lo, hi) in zip(kept, lttb_buckets(len(points), threshold)):
+        point = dict(points[idx])
+        for m, col in columns.items():
+            window = col[lo:hi]
+            point[f"{m}_min"] = min(window)
+            point[f"{m}_max"] = max(window)
+        out.append(point)
+    return out
@@ -0,0 +1,144 @@
+"""
+In-process pub/sub bus for post and workflow status changes.
+
+Producers (scheduler, publish_node, posts router) call `bus.emit(...)`; connected
+clients receive events over SSE (/events) or WebSocket (/events/ws) instead of polling.
+
+The transport between processes is pluggable via EVENT_BUS_URL:
+    unset          -> in-process only (single replica)
+    redis://...    -> Redis pub/sub, so every replica's clients see every event
+                      (needs the optional `redis` package)
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBER_QUEUE_SIZE = 256
+
+
+class InProcessBackend:
+    """Delivers straight to this process's subscribers."""
+
+    def __init__(self):
+        self.deliver = None  # Set by EventBus
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def publish(self, event: dict):
+        self.deliver(event)
+
+
+class RedisBackend:
+    """Fans events out through a Redis channel; each replica delivers to its own clients."""
+
+    def __init__(self, url: str, channel: str = "autopost:events"):
+        import redis.asyncio as redis  # Optional dependency
+
+        self.redis = redis.from_url(url)
+        self.channel = channel
+        self.deliver = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        pubsub = self.redis.pubsub()
+        await pubsub.subscribe(self.channel)
+        self._task = asyncio.create_task(self._listen(pubsub))
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+        await self.redis.aclose()
+
+    async def publish(self, event: dict):
+        await self.redis.publish(self.channel, json.dumps(event, default=str))
+
+    async def _listen(self, pubsub):
+        async for message in pubsub.listen():
+            if message.get("type") == "message":
+                try:
+                    self.deliver(json.loads(message["data"]))
+                except Exception as e:
+                    logger.warning(f"EventBus: Bad message on {self.channel}: {e}")
+
+
+class EventBus:
+    def __init__(self, backend=None):
+        self.backend = backend or InProcessBackend()
+        self.backend.deliver = self._deliver
+        self._subscribers: set[asyncio.Queue] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self):
+        """Bind to the running loop. Called from the FastAPI lifespan."""
+        self._loop = asyncio.get_running_loop()
+        await self.backend.start()
+
+    async def stop(self):
+        await self.backend.stop()
+        self._loop = None
+
+    def subscribe(self) -> asyncio.Queue:
+        q: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q: asyncio.Queue):
+        self._subscribers.discard(q)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def _deliver(self, event: dict):
+        for q in list(self._subscribers):
+            if q.full():
+                # Slow client: drop its oldest event rather than block producers
+                q.get_nowait()
+            q.put_nowait(event)
+
+    async def publish(self, event_type: str, **data):
+        event = {"type": event_type, "data": data, "ts": time.time()}
+        try:
+            await self.backend.publish(event)
+        except Exception as e:
+            logger.warning(f"EventBus: Failed to publish {event_type}: {e}")
+
+    def emit(self, event_type: str, **data):
+        """
+        Fire-and-forget publish usable from sync code, including LangGraph nodes
+        running on worker threads. No-op before the bus is started.
+        """
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            loop.create_task(self.publish(event_type, **data))
+        else:
+            asyncio.run_coroutine_threadsafe(self.publish(event_type, **data), loop)
+
+
+def _backend_from_env():
+    url = os.getenv("EVENT_BUS_URL", "")
+    if url.startswith(("redis://", "rediss://")):
+        try:
+            return RedisBackend(url)
+        except ImportError:
+            logger.warning("EventBus: EVENT_BUS_URL is set but `redis` is not installed; using in-process bus.")
+    return InProcessBackend()
+
+
+bus = EventBus(_backend_from_env())
@@ -0,0 +1,140 @@
+"""
+Bulk export of posts joined with their latest analytics.
+
+Rows are read through a streaming cursor in EXPORT_BATCH_SIZE partitions and encoded
+per partition, so memory stays bounded however much history is exported:
+    csv      -> text/csv, one chunk per partition
+    parquet  -> one row group per partition
+    arrow    -> Arrow IPC stream, one record batch per partition
+Parquet and Arrow need the optional `pyarrow` package.
+"""
+
+import io
+import os
+import csv
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import select, String, type_coerce
+
+from database import read_session
+from db_models import Post, Analytics, PlatformEnum
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Optional; only the binary formats need it
+    pa = pq = None
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "5000"))
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+# (name, column, arrow type name); enums come back as their plain string values
+EXPORT_COLUMNS = (
+    ("post_id", Post.id, "string"),
+    ("platform", type_coerce(Post.platform, String), "string"),
+    ("status", type_coerce(Post.status, String), "string"),
+    ("caption", Post.caption, "string"),
+    ("image_url", Post.image_url, "string"),
+    ("platform_post_id", Post.platform_post_id, "string"),
+    ("scheduled_time", Post.scheduled_time, "timestamp"),
+    ("published_time", Post.published_time, "timestamp"),
+    ("created_at", Post.created_at, "timestamp"),
+    ("reach", Analytics.reach, "int64"),
+    ("impressions", Analytics.impressions, "int64"),
+    ("likes", Analytics.likes, "int64"),
+    ("comments", Analytics.comments, "int64"),
+    ("engagement", Analytics.engagement, "int64"),
+    ("engagement_rate", Analytics.engagement_rate, "float64"),
+    ("fetched_at", Analytics.fetched_at, "timestamp"),
+)
+
+
+def binary_formats_available() -> bool:
+    return pa is not None
+
+
+def _export_query(platform: Optional[PlatformEnum], date_from: Optional[datetime], date_to: Optional[datetime]):
+    stmt = (
+        select(*[col.label(name) for name, col, _ in EXPORT_COLUMNS])
+        .outerjoin(Analytics, Analytics.post_id == Post.id)
+        .order_by(Post.created_at, Post.id)
+    )
+    if platform:
+        stmt = stmt.where(Post.platform == platform)
+    if date_from:
+        stmt = stmt.where(Post.published_time >= date_from)
+    if date_to:
+        stmt = stmt.where(Post.published_time < date_to)
+    return stmt.execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+
+async def _partitions(platform, date_from, date_to) -> AsyncIterator[list]:
+    # Own session: the response body is streamed after the request's session is closed
+    async with read_session() as session:
+        result = await session.stream(_export_query(platform, date_from, date_to))
+        async for rows in result.partitions():
+            yield rows
+
+
+async def stream_csv(platform=None, date_from=None, date_to=None) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _, _ in EXPORT_COLUMNS])
+    async for rows in _partitions(platform, date_from, date_to):
+        writer.writerows(
+            [v.isoformat() if isinstance(v, datetime) else v for v in row] for row in rows
+        )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():  # Header only: nothing matched
+        yield buffer.getvalue().encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands back what was written since the last drain."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _arrow_schema():
+    types = {"string": pa.string(), "int64": pa.int64(), "float64": pa.float64(), "timestamp": pa.timestamp("us", tz="UTC")}
+    return pa.schema([(name, types[kind]) for name, _, kind in EXPORT_COLUMNS])
+
+
+async def stream_arrow(fmt: str, platform=None, date_from=None, date_to=None) -> AsyncIterator[bytes]:
+    """Parquet (fmt="parquet") or Arrow IPC stream (fmt="arrow"), one batch per partition."""
+    schema = _arrow_schema()
+    sink = _ChunkSink()
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+    try:
+        async for rows in _partitions(platform, date_from, date_to):
+            # Naive timestamps (SQLite) are stored UTC, which is how Arrow reads them
+            columns = [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)]
+            writer.write_batch(pa.record_batch(columns, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
@@ -0,0 +1,50 @@
+"""
+Fast JSON path for list endpoints.
+
+List endpoints select plain column tuples instead of ORM objects and return them
+through FastJSONResponse, which encodes with orjson (datetimes and enums natively,
+no per-field isoformat() and no second pass through FastAPI's jsonable_encoder).
+Timestamps are stored in UTC and SQLite returns them naive, so naive datetimes are
+written with a +00:00 offset. Falls back to the stdlib encoder when orjson is not installed.
+"""
+
+import json
+import enum
+from datetime import date, datetime, timezone
+from typing import Any
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # Optional speed-up
+    orjson = None
+
+
+def _default(obj: Any):
+    if isinstance(obj, enum.Enum):
+        return obj.value
+    if isinstance(obj, datetime):
+        return (obj if obj.tzinfo else obj.replace(tzinfo=timezone.utc)).isoformat()
+    if isinstance(obj, date):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_NAIVE_UTC)
+    return json.dumps(content, default=_default, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def rows_to_dicts(result) -> list[dict]:
+    """Turn a column-projection result into plain dicts keyed by column label."""
+    keys = list(result.keys())
+    return [dict(zip(keys, row)) for row in result]
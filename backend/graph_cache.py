@@ -0,0 +1,90 @@
+"""
+TTL cache for Graph API results that change slowly: account metadata (the Instagram
+business ID) and page-level insights.
+
+Entries live in the graph_cache table, so every worker shares them and an
+invalidation from any process is seen by all. Errors are never cached. Expired rows
+are ignored on read and purged by the scheduler.
+"""
+
+import os
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Optional
+
+from sqlalchemy import delete, select
+
+from database import async_session, upsert
+from db_models import GraphCacheEntry
+
+logger = logging.getLogger(__name__)
+
+ACCOUNT_TTL = float(os.getenv("GRAPH_CACHE_ACCOUNT_TTL", str(24 * 3600)))
+PAGE_INSIGHTS_TTL = float(os.getenv("GRAPH_CACHE_PAGE_INSIGHTS_TTL", str(6 * 3600)))
+
+
+async def cache_get(key: str) -> Optional[Any]:
+    async with async_session() as session:
+        row = (await session.execute(
+            select(GraphCacheEntry.value).where(
+                GraphCacheEntry.key == key, GraphCacheEntry.expires_at > datetime.now(timezone.utc),
+            )
+        )).first()
+    return json.loads(row.value) if row else None
+
+
+async def cache_put(key: str, value: Any, ttl: float):
+    now = datetime.now(timezone.utc)
+    async with async_session() as session:
+        stmt = upsert(session.bind.dialect.name, GraphCacheEntry).values(
+            key=key, value=json.dumps(value, default=str), fetched_at=now, expires_at=now + timedelta(seconds=ttl),
+        )
+        await session.execute(stmt.on_conflict_do_update(
+            index_elements=["key"],
+            set_={"value": stmt.excluded.value, "fetched_at": stmt.excluded.fetched_at, "expires_at": stmt.excluded.expires_at},
+        ))
+        await session.commit()
+
+
+async def cached(key: str, ttl: float, fetch: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    The cached value for `key`, or `await fetch()` stored for `ttl` seconds.
+    Results that are None or carry an "error" key are returned but not stored.
+    """
+    value = await cache_get(key)
+    if value is not None:
+        return value
+    value = await fetch()
+    if value is not None and not (isinstance(value, dict) and "error" in value):
+        await cache_put(key, value, ttl)
+    return value
+
+
+async def cache_delete(key: str):
+    async with async_session() as session:
+        await session.execute(delete(GraphCacheEntry).where(GraphCacheEntry.key == key))
+        await session.commit()
+
+
+async def invalidate(prefix: str = "") -> int:
+    """Drop entries whose key starts with `prefix` (all of them by default)."""
+    async with async_session() as session:
+        stmt = delete(GraphCacheEntry)
+        if prefix:
+            stmt = stmt.where(GraphCacheEntry.key.startswith(prefix, autoescape=True))
+        result = await session.execute(stmt)
+        await session.commit()
+    logger.info(f"GraphCache: Invalidated {result.rowcount} entries (prefix {prefix!r}).")
+    return result.rowcount
+
+
+async def purge_expired():
+    """Delete expired entries. Runs from the scheduler."""
+    async with async_session() as session:
+        result = await session.execute(
+            delete(GraphCacheEntry).where(GraphCacheEntry.expires_at <= datetime.now(timezone.utc))
+        )
+        await session.commit()
+    if result.rowcount:
+        logger.info(f"GraphCache: Purged {result.rowcount} expired entries.")
@@ -0,0 +1,192 @@
+"""
+Idempotency-Key support for endpoints that publish or create posts.
+
+The first request with a given key runs normally and its JSON response is stored.
+Repeats within IDEMPOTENCY_TTL_HOURS get the stored response back without touching
+any upstream API or inserting rows again. The first request claims the key by
+inserting a pending row, so the primary key is the lock across processes: a repeat
+that arrives while the first is still running gets 409. While the request runs its
+claim is renewed every third of IDEMPOTENCY_PENDING_SECONDS; it lapses only when its
+process died, and is released if the request fails, so the client can retry.
+"""
+
+import os
+import json
+import uuid
+import asyncio
+import hashlib
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+
+from database import async_session
+from db_models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+IDEMPOTENCY_PENDING_SECONDS = int(os.getenv("IDEMPOTENCY_PENDING_SECONDS", "300"))
+
+
+def _hash_request(payload: Any) -> str:
+    raw = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _as_utc(dt: datetime) -> datetime:
+    # SQLite hands back naive datetimes even for timezone=True columns
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def _own_claim(key: str, token: str):
+    """WHERE clause matching the pending row of this claim, and no later one."""
+    return (
+        IdempotencyKey.key == key,
+        IdempotencyKey.pending.is_(True),
+        IdempotencyKey.claim_token == token,
+    )
+
+
+class IdempotencyGuard:
+    def __init__(self, key: Optional[str], endpoint: str, request_hash: str):
+        self.key = key
+        self.endpoint = endpoint
+        self.request_hash = request_hash
+        self.token = uuid.uuid4().hex  # Identifies this request's claim on the key
+        self.cached: Optional[Any] = None
+        self.stored = False
+
+    async def store(self, body: Any) -> Any:
+        """Persist the response on this request's pending row and return it unchanged."""
+        if not self.key:
+            return body
+        now = datetime.now(timezone.utc)
+        async with async_session() as session:
+            result = await session.execute(
+                update(IdempotencyKey)
+                .where(*_own_claim(self.key, self.token))
+                .values(
+                    pending=False,
+                    response_body=json.dumps(body, default=str),
+                    expires_at=now + timedelta(hours=IDEMPOTENCY_TTL_HOURS),
+                )
+            )
+            await session.commit()
+        if result.rowcount != 1:
+            # Only when the claim lapsed (the loop stalled past IDEMPOTENCY_PENDING_SECONDS)
+            # and another request took the key: its row is left alone
+            logger.error(f"Idempotency: Lost the claim on key {self.key} ({self.endpoint}); response not stored.")
+        self.stored = True
+        return body
+
+    async def keep_claim(self):
+        """Renew this request's pending claim until cancelled, so it never lapses mid-request."""
+        while True:
+            await asyncio.sleep(IDEMPOTENCY_PENDING_SECONDS / 3)
+            async with async_session() as session:
+                result = await session.execute(
+                    update(IdempotencyKey)
+                    .where(*_own_claim(self.key, self.token))
+                    .values(expires_at=datetime.now(timezone.utc) + timedelta(seconds=IDEMPOTENCY_PENDING_SECONDS))
+                )
+                await session.commit()
+            if result.rowcount != 1:
+                logger.error(f"Idempotency: Lost the claim on key {self.key} ({self.endpoint}).")
+                return
+
+
+async def _claim(guard: IdempotencyGuard) -> Optional[IdempotencyKey]:
+    """Insert the pending row for the guard's key; returns the existing row instead if there is one."""
+    key = guard.key
+    now = datetime.now(timezone.utc)
+    async with async_session() as session:
+        row = await session.get(IdempotencyKey, key)
+        if row and _as_utc(row.expires_at) <= now:
+            # Conditional, so a claim another request just made in its place survives
+            session.expunge(row)
+            await session.execute(
+                delete(IdempotencyKey).where(IdempotencyKey.key == key, IdempotencyKey.expires_at <= now)
+            )
+            await session.commit()
+            row = None
+        if row:
+            return row
+
+        session.add(IdempotencyKey(
+            key=key,
+            endpoint=guard.endpoint,
+            request_hash=guard.request_hash,
+            pending=True,
+            claim_token=guard.token,
+            response_body="",
+            created_at=now,
+            expires_at=now + timedelta(seconds=IDEMPOTENCY_PENDING_SECONDS),
+        ))
+        try:
+            await session.commit()
+            return None
+        except IntegrityError:
+            # Another request claimed the key between the lookup and the insert
+            await session.rollback()
+            return await session.get(IdempotencyKey, key)
+
+
+@asynccontextmanager
+async def idempotent(key: Optional[str], endpoint: str, payload: Any):
+    """
+    Usage:
+        async with idempotent(key, "POST /posts", payload) as guard:
+            if guard.cached is not None:
+                return guard.cached
+            ...
+            return await guard.store(result)
+    `payload` is what identifies the request (its body); without a key the guard does nothing.
+    """
+    guard = IdempotencyGuard(key, endpoint, _hash_request(payload))
+    if not key:
+        yield guard
+        return
+
+    row = await _claim(guard)
+    if row is not None:
+        if row.endpoint != endpoint or row.request_hash != guard.request_hash:
+            raise HTTPException(
+                status_code=422,
+                detail="Idempotency-Key was already used for a different request.",
+            )
+        if row.pending:
+            raise HTTPException(
+                status_code=409,
+                detail="A request with this Idempotency-Key is still in progress.",
+            )
+        logger.info(f"Idempotency: Replaying stored response for key {key} ({endpoint})")
+        guard.cached = json.loads(row.response_body)
+        yield guard
+        return
+
+    renewer = asyncio.create_task(guard.keep_claim())
+    try:
+        yield guard
+    finally:
+        renewer.cancel()
+        if not guard.stored:
+            # Failed (or returned without storing): release the claim so a retry can run
+            async with async_session() as session:
+                await session.execute(delete(IdempotencyKey).where(*_own_claim(key, guard.token)))
+                await session.commit()
+
+
+async def purge_expired_keys():
+    """Delete expired keys. Runs from the scheduler."""
+    async with async_session() as session:
+        result = await session.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.now(timezone.utc))
+        )
+        await session.commit()
+    if result.rowcount:
+        logger.info(f"Idempotency: Purged {result.rowcount} expired keys.")
@@ -1,11 +1,13 @@
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from pydantic import BaseModel
 from typing import Optional
 from dotenv import load_dotenv
 import uvicorn
 import os
+import asyncio
 
 load_dotenv()
 
@@ -23,7 +25,13 @@ from models import StartWorkflowRequest, ReviewCaptionRequest, ReviewImageReques
 from agent_workflow import app as workflow_app, AgentState
 from database import init_db
 from scheduler_service import start_scheduler, stop_scheduler
-from routers import posts as posts_router, analytics as analytics_router
+from routers import (
+    posts as posts_router, analytics as analytics_router, tracing as tracing_router,
+    metrics as metrics_router, events as events_router,
+)
+from tracing import tracer
+from idempotency import idempotent
+from events import bus
 
 
 @asynccontextmanager
@@ -31,10 +39,12 @@ async def lifespan(app: FastAPI):
     """Startup / shutdown lifecycle."""
     logger.info("Starting up — initializing DB and scheduler...")
     await init_db()
+    await bus.start()
     start_scheduler()
     yield
     logger.info("Shutting down — stopping scheduler...")
     stop_scheduler()
+    await bus.stop()
 
 
 app = FastAPI(title="Content Workflow Automation Agent", lifespan=lifespan)
@@ -45,11 +55,34 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Sync-Version", "ETag", "X-Total-Count", "X-Bucket", "X-Total-Points"],
 )
+# Large list responses compress well; SSE streams are excluded by the middleware
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Root span per request; child spans (nodes, upstream calls, db) attach to it."""
+    root, token = tracer.start_span("http.request", kind="http", method=request.method)
+    try:
+        response = await call_next(request)
+        root.set(status=response.status_code)
+        return response
+    except Exception:
+        root.set(status="error")
+        raise
+    finally:
+        route = request.scope.get("route")
+        root.set(endpoint=f"{request.method} {getattr(route, 'path', 'unmatched')}")
+        tracer.end_span(root, token)
 
 # Mount new routers
 app.include_router(posts_router.router)
 app.include_router(analytics_router.router)
+app.include_router(tracing_router.router)
+app.include_router(metrics_router.router)
+app.include_router(events_router.router)
 
 # In-memory storage for state (Single user = single state for simplicity)
 # In a real multi-user app, use a database or session-dict.
@@ -98,6 +131,12 @@ async def start_workflow(request: StartWorkflowRequest):
 async def get_state():
     return current_state
 
+@app.get("/workflow/parse-stats")
+async def get_parse_stats():
+    """Parse-step latency and how often the rule-based fast path skipped Gemini."""
+    from prompt_parser import parse_stats
+    return parse_stats.to_dict()
+
 @app.post("/workflow/reset")
 async def reset_workflow():
     global current_state
@@ -196,17 +235,23 @@ async def review_image(request: ReviewImageRequest):
     return current_state
 
 @app.post("/workflow/schedule")
-async def schedule(request: ScheduleRequest):
+async def schedule(request: ScheduleRequest, idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")):
+    async with idempotent(idempotency_key, "POST /workflow/schedule", request.model_dump()) as guard:
+        if guard.cached is not None:
+            return guard.cached
+        return await guard.store(await _run_schedule(request))
+
+async def _run_schedule(request: ScheduleRequest):
     global current_state
-    from datetime import datetime
+    from datetime import datetime, timezone
     from database import async_session
     from db_models import Post, PostStatus, PlatformEnum
 
     current_state["schedule_time"] = request.schedule_time.isoformat()
-    # Use naive local time — browser sends local time without tz info,
-    # and the server clock is also local, so they match.
-    schedule_dt = request.schedule_time.replace(tzinfo=None)
-    now = datetime.now()
+    # The browser sends local time without tz info, which is taken as the server's
+    # local time (astimezone does that for naive values); posts are stored in UTC.
+    schedule_dt = request.schedule_time.astimezone(timezone.utc)
+    now = datetime.now(timezone.utc)
 
     if schedule_dt > now:
         # Future time — save to DB as 'scheduled', the scheduler will publish later
@@ -225,7 +270,8 @@ async def schedule(request: ScheduleRequest):
 
         current_state["publish_status"] = {p: "Scheduled" for p in current_state.get("platforms", [])}
         current_state["current_step"] = "completed"
-        logger.info(f"Posts scheduled for {schedule_dt.isoformat()} (local time) and saved to DB.")
+        logger.info(f"Posts scheduled for {schedule_dt.isoformat()} and saved to DB.")
+        await bus.publish("posts.changed", source="workflow.schedule")
     else:
         # Past or now — publish immediately
         current_state["current_step"] = "publish"
@@ -234,14 +280,21 @@ async def schedule(request: ScheduleRequest):
 
 
 @app.post("/workflow/publish")
-async def publish():
+async def publish(idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")):
+    async with idempotent(idempotency_key, "POST /workflow/publish", {}) as guard:
+        if guard.cached is not None:
+            return guard.cached
+        return await guard.store(await _run_publish())
+
+async def _run_publish():
     global current_state
     from datetime import datetime, timezone
     from database import async_session
     from db_models import Post, PostStatus, PlatformEnum
 
     from agent_workflow import publish_node
-    res_pub = publish_node(current_state)
+    # Upstream calls are blocking; off the loop, the idempotency claim keeps being renewed
+    res_pub = await asyncio.to_thread(publish_node, current_state)
     current_state.update(res_pub)
     current_state["current_step"] = "completed"
 
@@ -268,12 +321,14 @@ async def publish():
                     image_url=current_state.get("image_path"),
                     status=PostStatus.published if is_published else PostStatus.failed,
                     published_time=datetime.now(timezone.utc) if is_published else None,
-                    scheduled_time=datetime.fromisoformat(current_state["schedule_time"]) if current_state.get("schedule_time") else datetime.now(timezone.utc),
+                    scheduled_time=datetime.fromisoformat(current_state["schedule_time"]).astimezone(timezone.utc) if current_state.get("schedule_time") else datetime.now(timezone.utc),
                     platform_post_id=platform_post_id
                 )
                 session.add(post)
         await session.commit()
     logger.info("Published posts saved to DB.")
+    await bus.publish("posts.changed", source="workflow.publish")
+    await bus.publish("workflow.state", state=current_state)
 
     return current_state
 
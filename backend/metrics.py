@@ -0,0 +1,72 @@
+"""
+Prometheus metrics for the publishing pipeline and upstream APIs.
+
+Upstream latency and errors are fed from finished tracing spans, so every call already
+going through `traced_request` or an upstream span is counted without extra code.
+Gauges that need the database are refreshed at scrape time by the /metrics endpoint.
+"""
+
+from datetime import datetime
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from tracing import tracer, Span
+
+PUBLISH_LAG = Histogram(
+    "autopost_publish_lag_seconds",
+    "Delay between a post's scheduled_time and when the scheduler actually published it.",
+    ["platform"],
+    buckets=(1, 5, 15, 30, 60, 90, 120, 300, 600, 1800, 3600),
+)
+
+UPSTREAM_LATENCY = Histogram(
+    "autopost_upstream_request_seconds",
+    "Latency of outbound calls to Gemini, the Graph API, Pixazo and freeimage.host.",
+    ["upstream", "platform"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+UPSTREAM_ERRORS = Counter(
+    "autopost_upstream_errors_total",
+    "Outbound calls that raised or returned an HTTP error status.",
+    ["upstream", "platform"],
+)
+
+SCHEDULER_PUBLISHED = Counter(
+    "autopost_scheduler_posts_total",
+    "Posts processed by the scheduler, by outcome.",
+    ["platform", "outcome"],
+)
+
+POSTS_DUE = Gauge(
+    "autopost_posts_due_unpublished",
+    "Scheduled posts whose scheduled_time has passed but are not published yet.",
+)
+
+DB_POOL_CHECKED_OUT = Gauge(
+    "autopost_db_pool_checked_out",
+    "Database connections currently checked out of the pool.",
+)
+
+DB_POOL_SIZE = Gauge(
+    "autopost_db_pool_size",
+    "Configured size of the database connection pool.",
+)
+
+
+def observe_publish_lag(platform: str, scheduled_time: datetime, published_time: datetime):
+    # Both UTC; SQLite hands back naive values, so drop tzinfo before comparing
+    lag = (published_time.replace(tzinfo=None) - scheduled_time.replace(tzinfo=None)).total_seconds()
+    PUBLISH_LAG.labels(platform=platform).observe(max(lag, 0.0))
+
+
+def _on_span(s: Span):
+    if s.kind != "upstream":
+        return
+    labels = {"upstream": s.attributes.get("upstream", s.name), "platform": s.attributes.get("platform", "")}
+    UPSTREAM_LATENCY.labels(**labels).observe(s.duration_ms / 1000)
+    if s.failed:
+        UPSTREAM_ERRORS.labels(**labels).inc()
+
+
+tracer.add_listener(_on_span)
@@ -0,0 +1,166 @@
+"""
+Full-text caption search.
+
+SQLite: an FTS5 table (posts_fts) holding a copy of each caption, kept in sync by
+triggers, so ORM writes, bulk statements and raw SQL all stay indexed. Ranked with
+bm25(), snippets from snippet(). FTS rows are keyed through posts_fts_ids, whose
+INTEGER PRIMARY KEY maps to posts.id: the implicit rowid of posts (a String primary
+key) may be renumbered by VACUUM, an INTEGER PRIMARY KEY never is.
+PostgreSQL: a GIN index on to_tsvector('english', caption), ranked with ts_rank()
+and highlighted with ts_headline().
+"""
+
+import re
+import logging
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import select, func, literal_column, text, desc, table, column
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db_models import Post, PlatformEnum, PostStatus
+
+logger = logging.getLogger(__name__)
+
+SNIPPET_OPEN, SNIPPET_CLOSE = "<mark>", "</mark>"
+SNIPPET_TOKENS = 12
+
+_FTS_KEY = "(SELECT rowid FROM posts_fts_ids WHERE post_id = {}.id)"
+
+_SQLITE_DDL = [
+    "CREATE TABLE posts_fts_ids (rowid INTEGER PRIMARY KEY, post_id TEXT NOT NULL UNIQUE)",
+    "CREATE VIRTUAL TABLE posts_fts USING fts5(caption, tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER posts_fts_ai AFTER INSERT ON posts BEGIN "
+    "INSERT INTO posts_fts_ids(post_id) VALUES (new.id); "
+    f"INSERT INTO posts_fts(rowid, caption) VALUES ({_FTS_KEY.format('new')}, new.caption); END",
+    "CREATE TRIGGER posts_fts_ad AFTER DELETE ON posts BEGIN "
+    f"DELETE FROM posts_fts WHERE rowid = {_FTS_KEY.format('old')}; "
+    "DELETE FROM posts_fts_ids WHERE post_id = old.id; END",
+    "CREATE TRIGGER posts_fts_au AFTER UPDATE OF caption ON posts BEGIN "
+    f"UPDATE posts_fts SET caption = new.caption WHERE rowid = {_FTS_KEY.format('new')}; END",
+]
+
+# Earlier layout: external content keyed on the posts rowid
+_SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS posts_fts_ai",
+    "DROP TRIGGER IF EXISTS posts_fts_ad",
+    "DROP TRIGGER IF EXISTS posts_fts_au",
+    "DROP TABLE IF EXISTS posts_fts",
+    "DROP TABLE IF EXISTS posts_fts_ids",
+]
+
+_SQLITE_POPULATE = [
+    "DELETE FROM posts_fts",
+    "DELETE FROM posts_fts_ids",
+    "INSERT INTO posts_fts_ids(post_id) SELECT id FROM posts",
+    "INSERT INTO posts_fts(rowid, caption) "
+    "SELECT k.rowid, p.caption FROM posts_fts_ids k JOIN posts p ON p.id = k.post_id",
+]
+
+_POSTGRES_DDL = [
+    "CREATE INDEX IF NOT EXISTS ix_posts_caption_fts ON posts USING GIN (to_tsvector('english', caption))",
+]
+
+
+def ensure_search_index(conn):
+    """Create the FTS structures if missing (sync; run via conn.run_sync in init_db)."""
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        exists = conn.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'posts_fts_ids'")).first()
+        if exists:
+            return
+        for ddl in _SQLITE_DROP + _SQLITE_DDL:
+            conn.execute(text(ddl))
+        # Index captions that were written before the FTS table existed
+        rebuild_search_index(conn)
+        logger.info("PostSearch: Created and populated posts_fts.")
+    elif dialect == "postgresql":
+        for ddl in _POSTGRES_DDL:
+            conn.execute(text(ddl))
+
+
+def rebuild_search_index(conn):
+    """Re-index every caption from scratch (sync)."""
+    if conn.dialect.name == "sqlite":
+        for stmt in _SQLITE_POPULATE:
+            conn.execute(text(stmt))
+
+
+def _fts5_query(q: str) -> Optional[str]:
+    """Turn free text into a safe FTS5 query: every word must match, the last one as a prefix."""
+    terms = re.findall(r"\w+", q, flags=re.UNICODE)
+    if not terms:
+        return None
+    quoted = [f'"{t}"' for t in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+posts_fts = table("posts_fts", column("rowid"))
+posts_fts_ids = table("posts_fts_ids", column("rowid"), column("post_id"))
+
+_RESULT_COLUMNS = (
+    Post.id, Post.platform, Post.status, Post.caption, Post.image_url,
+    Post.scheduled_time, Post.published_time, Post.created_at,
+)
+
+
+async def search_posts(
+    session: AsyncSession,
+    q: str,
+    platform: Optional[PlatformEnum] = None,
+    status: Optional[PostStatus] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    limit: int = 50,
+    offset: int = 0,
+):
+    """Ranked caption matches with a highlighted snippet. Returns a Result of column tuples."""
+    dialect = session.bind.dialect.name
+
+    if dialect == "sqlite":
+        match = _fts5_query(q)
+        if match is None:
+            return None
+        fts = literal_column("posts_fts")
+        rank = func.bm25(fts).label("rank")  # Lower is better
+        stmt = (
+            select(*_RESULT_COLUMNS,
+                   func.snippet(fts, 0, SNIPPET_OPEN, SNIPPET_CLOSE, "…", SNIPPET_TOKENS).label("snippet"),
+                   rank)
+            .select_from(
+                posts_fts
+                .join(posts_fts_ids, posts_fts_ids.c.rowid == posts_fts.c.rowid)
+                .join(Post, Post.id == posts_fts_ids.c.post_id)
+            )
+            .where(fts.op("MATCH")(match))
+            .order_by(rank)
+        )
+    elif dialect == "postgresql":
+        tsv = func.to_tsvector("english", Post.caption)
+        tsq = func.websearch_to_tsquery("english", q)
+        rank = func.ts_rank(tsv, tsq).label("rank")
+        options = f"StartSel={SNIPPET_OPEN}, StopSel={SNIPPET_CLOSE}, MaxWords=25, MinWords=8"
+        stmt = (
+            select(*_RESULT_COLUMNS, func.ts_headline("english", Post.caption, tsq, options).label("snippet"), rank)
+            .where(tsv.op("@@")(tsq))
+            .order_by(desc(rank))
+        )
+    else:
+        # No full-text engine: substring match, newest first
+        stmt = (
+            select(*_RESULT_COLUMNS, Post.caption.label("snippet"), literal_column("0").label("rank"))
+            .where(Post.caption.ilike(f"%{q}%"))
+            .order_by(Post.created_at.desc())
+        )
+
+    if platform:
+        stmt = stmt.where(Post.platform == platform)
+    if status:
+        stmt = stmt.where(Post.status == status)
+    if date_from:
+        stmt = stmt.where(func.coalesce(Post.published_time, Post.scheduled_time, Post.created_at) >= date_from)
+    if date_to:
+        stmt = stmt.where(func.coalesce(Post.published_time, Post.scheduled_time, Post.created_at) < date_to)
+
+    return await session.execute(stmt.limit(limit).offset(offset))
@@ -0,0 +1,252 @@
+"""
+Rule-based prompt pre-parser.
+Pulls platforms, topic and schedule time out of prompts like
+"post about our sale on Instagram and Facebook tomorrow 9am" without an LLM call.
+parse_prompt_node only falls back to Gemini when the confidence here is low.
+"""
+
+import re
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+
+# Confidence needed before the LLM extraction is skipped
+FAST_PATH_THRESHOLD = 0.8
+
+PLATFORM_PATTERNS = {
+    "Instagram": re.compile(r"\b(instagram|insta|ig)\b", re.IGNORECASE),
+    "Facebook": re.compile(r"\b(facebook|fb)\b", re.IGNORECASE),
+    "LinkedIn": re.compile(r"\b(linked\s?in)\b", re.IGNORECASE),
+}
+# A platform counts only where it is the target: "on Instagram", "to FB", "for LinkedIn".
+# Further platforms chained after one ("on Instagram, Facebook and LinkedIn") count too;
+# anywhere else ("tips about IG growth") the name is part of the topic.
+PLATFORM_TARGET_PREFIX = re.compile(r"\b(?:on|to|for|via|across|onto)\s+(?:both\s+)?$", re.IGNORECASE)
+PLATFORM_CHAIN = re.compile(r"^\s*(?:,\s*(?:and\s+|or\s+)?|&\s*|and\s+|or\s+)(?:on\s+)?$", re.IGNORECASE)
+ALL_PLATFORMS_PATTERN = re.compile(r"\b(all|every|each)\s+(platforms?|channels?|networks?)\b", re.IGNORECASE)
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+# "tomorrow", "today", "tonight", "on friday", "next monday", "this sunday"
+DAY_PATTERN = re.compile(
+    r"\b(?:(?:on|this|next)\s+)?(today|tonight|tomorrow|" + "|".join(WEEKDAYS) + r")\b",
+    re.IGNORECASE,
+)
+# "2025-03-01" / "on 2025-03-01"
+ISO_DATE_PATTERN = re.compile(r"\b(?:on\s+)?(\d{4})-(\d{2})-(\d{2})\b", re.IGNORECASE)
+# "at 9am", "9:30 pm", "at 18:00", "noon", "midnight"
+TIME_PATTERN = re.compile(
+    r"\b(?:at\s+)?(?:(\d{1,2})(?::(\d{2}))?\s*(am|pm)|(\d{1,2}):(\d{2})|(noon|midnight))\b",
+    re.IGNORECASE,
+)
+# "at 7": an hour with no am/pm, which the rules won't guess
+BARE_HOUR_PATTERN = re.compile(r"\bat\s+\d{1,2}\b(?!\s*(?::\d|am\b|pm\b|a\.m|p\.m))", re.IGNORECASE)
+# What may follow a day word used as a date; anything else ("sunday brunch",
+# "monday motivation") means the day is part of the topic
+DAY_FOLLOWER = re.compile(
+    r"\s*(?:$|[,.;:!?]|(?:at|on|to|for|and|in|via|by|about|around|morning|afternoon|evening|night)\b)",
+    re.IGNORECASE,
+)
+# "in 2 hours", "in 30 minutes"
+RELATIVE_PATTERN = re.compile(r"\bin\s+(\d+)\s*(minutes?|mins?|hours?|hrs?)\b", re.IGNORECASE)
+
+# Time words the rules cannot pin down to a timestamp — hand these to the LLM
+VAGUE_TIME_PATTERN = re.compile(
+    r"\b(later|soon|sometime|someday|morning|afternoon|evening|weekend|next\s+week|next\s+month|asap)\b",
+    re.IGNORECASE,
+)
+
+LEADING_FILLER = re.compile(
+    r"^\s*(?:please\s+)?(?:(?:create|make|write|schedule|publish|share|draft|post)\s+"
+    r"(?:an?\s+|some\s+)?(?:posts?|captions?|updates?)?\s*)?(?:about|on|for|regarding)?\s+",
+    re.IGNORECASE,
+)
+CONNECTOR_CLEANUP = re.compile(r"\b(on|to|for|and|at|via|across)(\s+(on|to|for|and|at|via|across))*\s*$", re.IGNORECASE)
+
+
+def _resolve_day(word: str, now: datetime) -> datetime:
+    word = word.lower()
+    if word in ("today", "tonight"):
+        return now
+    if word == "tomorrow":
+        return now + timedelta(days=1)
+    # Weekday: next occurrence, never today
+    days_ahead = (WEEKDAYS.index(word) - now.weekday()) % 7 or 7
+    return now + timedelta(days=days_ahead)
+
+
+def _resolve_time(match: re.Match) -> Optional[tuple[int, int]]:
+    hour_12, minute_12, meridiem, hour_24, minute_24, named = match.groups()
+    if named:
+        return (12, 0) if named.lower() == "noon" else (0, 0)
+    if meridiem:
+        hour, minute = int(hour_12), int(minute_12 or 0)
+        if not 1 <= hour <= 12 or minute > 59:
+            return None
+        hour = hour % 12 + (12 if meridiem.lower() == "pm" else 0)
+        return hour, minute
+    hour, minute = int(hour_24), int(minute_24)
+    if hour > 23 or minute > 59:
+        return None
+    return hour, minute
+
+
+def _target_platforms(text: str) -> tuple[list[str], list[tuple[int, int]]]:
+    """Platforms named as the posting target, and the spans naming them."""
+    mentions = sorted(
+        (m.start(), m.end(), name) for name, pattern in PLATFORM_PATTERNS.items() for m in pattern.finditer(text)
+    )
+    platforms, spans = [], []
+    last_end = None
+    for start, end, name in mentions:
+        if PLATFORM_TARGET_PREFIX.search(text[:start]) or (
+            last_end is not None and PLATFORM_CHAIN.match(text[last_end:start])
+        ):
+            if name not in platforms:
+                platforms.append(name)
+            spans.append((start, end))
+            last_end = end
+    return platforms, spans
+
+
+def _day_in_topic(match: re.Match, text: str) -> bool:
+    """True for a bare day word used as part of the subject, like "sunday brunch"."""
+    prefixed = match.group(0).lower() != match.group(1).lower()  # "on/this/next friday"
+    if prefixed:
+        return False
+    rest = text[match.end():]
+    return not (DAY_FOLLOWER.match(rest) or TIME_PATTERN.match(rest.lstrip()))
+
+
+def fast_parse(prompt: str, now: Optional[datetime] = None) -> dict:
+    """
+    Extract topic, platforms and schedule time with regex rules.
+    Returns the same keys as the LLM extraction plus a `confidence` in [0, 1].
+    """
+    now = now or datetime.now()
+    text = prompt or ""
+    confidence = 1.0
+
+    # ---- Platforms ----
+    platforms, platform_spans = _target_platforms(text)
+    if ALL_PLATFORMS_PATTERN.search(text):
+        platforms = list(PLATFORM_PATTERNS.keys())
+    if not platforms:
+        confidence -= 0.5
+
+    # ---- Schedule time ----
+    schedule_time = None
+    day_match = DAY_PATTERN.search(text)
+    iso_match = ISO_DATE_PATTERN.search(text)
+    time_match = TIME_PATTERN.search(text)
+    rel_match = RELATIVE_PATTERN.search(text)
+
+    if rel_match:
+        amount = int(rel_match.group(1))
+        unit = rel_match.group(2).lower()
+        delta = timedelta(hours=amount) if unit.startswith("h") else timedelta(minutes=amount)
+        schedule_time = (now + delta).replace(second=0, microsecond=0)
+    elif day_match or iso_match or time_match:
+        if iso_match:
+            try:
+                day = datetime(int(iso_match.group(1)), int(iso_match.group(2)), int(iso_match.group(3)))
+            except ValueError:
+                day, confidence = now, confidence - 0.5
+        elif day_match:
+            day = _resolve_day(day_match.group(1), now)
+        else:
+            day = now
+
+        hour_minute = _resolve_time(time_match) if time_match else None
+        if time_match and hour_minute is None:
+            confidence -= 0.5
+        if hour_minute is None:
+            # A day without a time is ambiguous ("tomorrow" — but when?)
+            hour_minute = (20, 0) if day_match and day_match.group(1).lower() == "tonight" else (9, 0)
+            if not (day_match and day_match.group(1).lower() == "tonight"):
+                confidence -= 0.3
+
+        schedule_time = day.replace(hour=hour_minute[0], minute=hour_minute[1], second=0, microsecond=0)
+        if not day_match and not iso_match and schedule_time <= now:
+            # Bare "at 9am" that already passed today means tomorrow
+            schedule_time += timedelta(days=1)
+
+    if VAGUE_TIME_PATTERN.search(text):
+        confidence -= 0.5
+
+    # Conflicting or topic-bound dates ("monday motivation, publish friday"): which is meant?
+    day_matches = list(DAY_PATTERN.finditer(text))
+    if len(day_matches) + len(ISO_DATE_PATTERN.findall(text)) > 1:
+        confidence -= 0.5
+    elif any(_day_in_topic(m, text) for m in day_matches):
+        confidence -= 0.5
+
+    # Two clock times ("the 5pm webinar ... at 9am"): only one of them is the schedule
+    if len(TIME_PATTERN.findall(text)) > 1:
+        confidence -= 0.5
+
+    # A time already gone ("today at 6am" at 8am) would publish at once; let the LLM judge
+    if schedule_time is not None and schedule_time < now:
+        confidence -= 0.5
+
+    # "at 7": the hour was not understood, so the schedule above is a guess
+    if BARE_HOUR_PATTERN.search(text):
+        confidence -= 0.5
+
+    # ---- Topic: whatever is left after removing the structured parts ----
+    topic = text
+    for start, end in reversed(platform_spans):
+        topic = topic[:start] + " " + topic[end:]
+    for pattern in (ALL_PLATFORMS_PATTERN, RELATIVE_PATTERN,
+                    ISO_DATE_PATTERN, DAY_PATTERN, TIME_PATTERN):
+        topic = pattern.sub(" ", topic)
+    topic = re.sub(r"\s+", " ", topic).strip(" ,.;:!-")
+    topic = LEADING_FILLER.sub("", " " + topic).strip()
+    topic = CONNECTOR_CLEANUP.sub("", topic).strip(" ,.;:!-")
+    topic = re.sub(r"\b(on|and)\s*(,|$)", "", topic).strip(" ,.;:!-")
+
+    if len(topic.split()) < 2:
+        # "post on instagram" — nothing meaningful to write about
+        confidence -= 0.5
+
+    return {
+        "topic": topic or prompt,
+        "platforms": platforms,
+        "schedule_time": schedule_time.isoformat() if schedule_time else None,
+        "confidence": round(max(confidence, 0.0), 2),
+    }
+
+
+class ParseStats:
+    """Thread-safe counters for the parse step (LangGraph may run nodes off the event loop)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.fast_path_hits = 0
+        self.llm_calls = 0
+        self.fast_path_ms = 0.0
+        self.llm_ms = 0.0
+
+    def record(self, fast_path: bool, elapsed_ms: float):
+        with self._lock:
+            if fast_path:
+                self.fast_path_hits += 1
+                self.fast_path_ms += elapsed_ms
+            else:
+                self.llm_calls += 1
+                self.llm_ms += elapsed_ms
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            total = self.fast_path_hits + self.llm_calls
+            return {
+                "total": total,
+                "fast_path_hits": self.fast_path_hits,
+                "llm_calls": self.llm_calls,
+                "fast_path_hit_rate": round(self.fast_path_hits / total, 3) if total else 0.0,
+                "avg_fast_path_ms": round(self.fast_path_ms / self.fast_path_hits, 3) if self.fast_path_hits else 0.0,
+                "avg_llm_ms": round(self.llm_ms / self.llm_calls, 1) if self.llm_calls else 0.0,
+            }
+
+
+parse_stats = ParseStats()
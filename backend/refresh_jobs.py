@@ -0,0 +1,112 @@
+"""
+Manual analytics refresh as a single-flight background job.
+
+POST /analytics/refresh submits (or joins) the one running refresh and returns its ID
+at once; progress is read from GET /analytics/refresh/{job_id} and also pushed on the
+event bus as `analytics.refresh`. Single-flight is per process.
+"""
+
+import time
+import uuid
+import asyncio
+import logging
+import contextvars
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+
+from database import async_session
+from analytics_service import AnalyticsService
+from analytics_rollup import rollup_analytics
+from events import bus
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+KEEP_FINISHED_JOBS = 20
+
+
+@dataclass
+class RefreshJob:
+    id: str
+    status: str = "running"  # "running" | "succeeded" | "failed"
+    started_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    total: Optional[int] = None  # Unknown until the published posts are counted
+    updated: int = 0
+    failed: int = 0
+    result: Optional[dict] = None  # Page-level insights once finished
+    error: Optional[str] = None
+
+    @property
+    def remaining(self) -> Optional[int]:
+        return None if self.total is None else max(self.total - self.updated - self.failed, 0)
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "total": self.total,
+            "done": self.updated,
+            "failed": self.failed,
+            "remaining": self.remaining,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class RefreshJobs:
+    def __init__(self, service: Optional[AnalyticsService] = None):
+        self.service = service or AnalyticsService()
+        self._jobs: OrderedDict[str, RefreshJob] = OrderedDict()
+        self._running: Optional[RefreshJob] = None
+        self._tasks: set[asyncio.Task] = set()
+
+    def submit(self) -> tuple[RefreshJob, bool]:
+        """Start a refresh, or return the running one. Returns (job, created)."""
+        if self._running is not None:
+            return self._running, False
+
+        job = RefreshJob(id=str(uuid.uuid4()))
+        self._running = job
+        self._jobs[job.id] = job
+        while len(self._jobs) > KEEP_FINISHED_JOBS:
+            oldest = next(iter(self._jobs))
+            if oldest == job.id:
+                break
+            self._jobs.pop(oldest)
+
+        # Fresh context: the job outlives the request, so it gets its own trace
+        task = asyncio.create_task(self._run(job), context=contextvars.Context())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job, True
+
+    def get(self, job_id: str) -> Optional[RefreshJob]:
+        return self._jobs.get(job_id)
+
+    async def _run(self, job: RefreshJob):
+        def progress(summary: dict):
+            job.total, job.updated, job.failed = summary["total"], summary["updated"], summary["failed"]
+            bus.emit("analytics.refresh", **job.to_dict())
+
+        try:
+            with span("job.analytics_refresh", kind="job"):
+                async with async_session() as session:
+                    result = await self.service.refresh_all(session, progress=progress)
+                await rollup_analytics()  # Make the new readings visible in hourly/daily series now
+            job.result = {"facebook": result["facebook"], "instagram": result["instagram"]}
+            job.status = "succeeded"
+        except Exception as e:
+            logger.error(f"RefreshJobs: Refresh {job.id} failed: {e}")
+            job.status, job.error = "failed", str(e)
+        finally:
+            job.finished_at = time.time()
+            self._running = None
+            await bus.publish("analytics.refresh", **job.to_dict())
+            logger.info(f"RefreshJobs: Refresh {job.id} {job.status} ({job.updated} updated, {job.failed} failed).")
+
+
+refresh_jobs = RefreshJobs()
@@ -1,58 +1,229 @@
 """
 Analytics router — serves KPI overview, time-series, per-post analytics,
-and a manual refresh trigger.
+best posting times, bulk exports, and a manual refresh trigger.
 """
 
 import logging
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime, timezone
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
+from sqlalchemy import select, insert, delete
 
-from database import get_db
-from db_models import Post, Analytics
-from analytics_service import AnalyticsService
+from database import get_db, get_read_db
+from db_models import Post, PlatformEnum, PostTombstone, next_versions
+from analytics_service import AnalyticsService, overview_cache, BUDGET_EXHAUSTED
+from analytics_rollup import get_timeseries, delete_post_analytics, METRICS
+from downsample import downsample_points
+from analytics_refresher import analytics_refresher
+from refresh_jobs import refresh_jobs
+from best_time_service import best_times
+import graph_cache
+from export_service import EXPORT_FORMATS, stream_csv, stream_arrow, binary_formats_available
+from scheduler_service import schedule_wakeup
+from events import bus
+from fast_json import FastJSONResponse
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
 analytics_service = AnalyticsService()
 
+MAX_PAGE_SIZE = 1000
+MAX_CHART_POINTS = 5000
+MAX_BULK_DELETE = 1000
+
+
+class BulkDeleteRequest(BaseModel):
+    ids: List[str] = Field(..., min_length=1, max_length=MAX_BULK_DELETE)
+    # Keep the local row when the platform delete fails, so it can be retried
+    keep_on_platform_failure: bool = False
+
+
+def _parse_date(value: Optional[str], name: str) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid '{name}' format. Use ISO 8601.")
+    # Stored timestamps are naive UTC
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _parse_platform(value: Optional[str]) -> Optional[PlatformEnum]:
+    if not value:
+        return None
+    try:
+        return PlatformEnum(value.lower())
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid platform: {value}")
+
 
 @router.get("/overview")
-async def get_overview(db: AsyncSession = Depends(get_db)):
-    """KPI summary: total reach, impressions, avg engagement rate."""
-    overview = await analytics_service.get_overview(db)
+async def get_overview(
+    platform: Optional[str] = None,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    KPI summary: total reach, impressions, avg engagement rate, overall and per platform.
+    Optional platform and from/to (ISO 8601, on the post's published time) filters.
+    """
+    overview = await analytics_service.get_overview(
+        db,
+        platform=_parse_platform(platform),
+        date_from=_parse_date(date_from, "from"),
+        date_to=_parse_date(date_to, "to"),
+    )
     return overview
 
 
 @router.get("/insights")
-async def get_insights(db: AsyncSession = Depends(get_db)):
-    """Time-series analytics data for charting."""
-    data = await analytics_service.get_insights_timeseries(db)
-    return data
+async def get_insights(
+    bucket: Literal["auto", "raw", "hour", "day"] = "auto",
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    platform: Optional[str] = None,
+    post_id: Optional[str] = None,
+    points: Optional[int] = Query(None, ge=3, le=MAX_CHART_POINTS),
+    metric: Literal[METRICS] = "reach",
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Time-series analytics data for charting, oldest first (default window: last 30 days).
+    bucket=hour|day reads the rollups, raw the individual snapshots, auto picks by window
+    length. The level used is returned in X-Bucket.
+
+    With `points`, longer series are downsampled with LTTB (shape follows `metric`), and
+    every point gains <metric>_min/<metric>_max envelopes for the stretch it stands for
+    (equal to the value when the series was short enough to keep whole).
+    X-Total-Points is the length before downsampling.
+    """
+    used, series = await get_timeseries(
+        db,
+        bucket=bucket,
+        date_from=_parse_date(date_from, "from"),
+        date_to=_parse_date(date_to, "to"),
+        platform=_parse_platform(platform),
+        post_id=post_id,
+    )
+    headers = {"X-Bucket": used, "X-Total-Points": str(len(series))}
+    if points:
+        series = downsample_points(series, points, METRICS, key=metric)
+    return FastJSONResponse(series, headers=headers)
 
 
 @router.get("/posts")
-async def get_post_analytics(db: AsyncSession = Depends(get_db)):
-    """Per-post analytics with post metadata."""
-    data = await analytics_service.get_post_analytics(db)
-    return data
+async def get_post_analytics(
+    sort: Literal["fetched_at", "engagement_rate", "reach"] = "fetched_at",
+    order: Literal["asc", "desc"] = "desc",
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Per-post analytics with post metadata, sorted by fetched_at, engagement_rate or reach.
+    Page with limit/offset; the total row count is in X-Total-Count.
+    """
+    data = await analytics_service.get_post_analytics(
+        db, sort=sort, descending=order == "desc", limit=limit, offset=offset
+    )
+    headers = {}
+    if limit is not None:
+        headers["X-Total-Count"] = str(await analytics_service.count_post_analytics(db))
+    return FastJSONResponse(data, headers=headers)
+
+
+@router.get("/best-times")
+async def get_best_times(
+    platform: Optional[str] = None,
+    tz_offset: int = Query(0, ge=-14 * 60, le=14 * 60),
+    limit: int = Query(5, ge=1, le=24),
+    grid: bool = False,
+):
+    """
+    Best weekday/hour slots to post per platform, from historical engagement rates.
+    `tz_offset` is minutes east of UTC; each slot carries its next local occurrence
+    (`next`, ready for a datetime-local input). grid=true adds the full 7x24 table.
+    """
+    await best_times.refresh()
+    return best_times.recommend(
+        platform=_parse_platform(platform), tz_offset=tz_offset, limit=limit, include_grid=grid
+    )
+
 
+@router.get("/export")
+async def export_analytics(
+    format: Literal["csv", "parquet", "arrow"] = "csv",
+    platform: Optional[str] = None,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+):
+    """
+    Stream every post with its latest analytics as CSV, Parquet or an Arrow IPC stream.
+    Optional platform and from/to (ISO 8601, on the post's published time) filters.
+    """
+    filters = dict(
+        platform=_parse_platform(platform),
+        date_from=_parse_date(date_from, "from"),
+        date_to=_parse_date(date_to, "to"),
+    )
+    if format == "csv":
+        body = stream_csv(**filters)
+    elif binary_formats_available():
+        body = stream_arrow(format, **filters)
+    else:
+        raise HTTPException(status_code=501, detail=f"{format} export needs the optional `pyarrow` package")
 
-@router.post("/refresh")
-async def refresh_analytics(db: AsyncSession = Depends(get_db)):
-    """Fetch fresh data from Facebook & Instagram APIs."""
-    fb_data = analytics_service.fetch_facebook_page_insights()
-    ig_data = analytics_service.fetch_instagram_insights()
+    filename = f"analytics-{datetime.now(timezone.utc):%Y%m%d}.{format}"
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
-    # Wait for post-level analytics to update
-    await analytics_service.update_all_post_analytics(db)
 
-    return {
-        "facebook": fb_data,
-        "instagram": ig_data,
-        "message": "Fresh data fetched from platform APIs. Post-level analytics updated successfully."
-    }
+@router.post("/refresh", status_code=202)
+async def refresh_analytics():
+    """
+    Fetch fresh data from Facebook & Instagram APIs in the background.
+    Returns the job at once; while a refresh is running, every submit joins it
+    (`attached: true`) instead of starting another. Poll GET /analytics/refresh/{job_id}.
+    """
+    job, created = refresh_jobs.submit()
+    return {**job.to_dict(), "attached": not created}
+
+
+@router.get("/refresh/{job_id}")
+async def refresh_progress(job_id: str):
+    """Progress of a refresh job: posts done, failed and remaining, and the final result."""
+    job = refresh_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Refresh job not found")
+    return job.to_dict()
+
+
+@router.delete("/cache")
+async def invalidate_graph_cache(prefix: str = ""):
+    """
+    Drop cached Graph API account metadata and page insights (all workers), so the next
+    refresh refetches them. `prefix` narrows it, e.g. `page_insights:` or `ig_business_id:`.
+    """
+    return {"invalidated": await graph_cache.invalidate(prefix)}
+
+
+@router.get("/refresher")
+async def refresher_status():
+    """Background refresher queue: posts queued and due, API budget left, last run."""
+    return analytics_refresher.status()
+
 
 @router.delete("/posts/{post_id}")
 async def delete_post(post_id: str, db: AsyncSession = Depends(get_db)):
@@ -69,8 +240,68 @@ async def delete_post(post_id: str, db: AsyncSession = Depends(get_db)):
         if not success:
             logger.warning(f"Failed to delete {post.platform_post_id} from {post.platform}, but proceeding with local delete.")
             
-    # Delete locally (delete analytics to be safe then post)
-    await db.execute(delete(Analytics).where(Analytics.post_id == post_id))
+    # Delete locally: analytics and their history, then the post
+    await delete_post_analytics(db, [post_id])
     await db.delete(post)
     await db.commit()
+    overview_cache.invalidate()
+    await bus.publish("post.deleted", id=post_id)
     return {"message": "Post deleted successfully"}
+
+
+@router.post("/posts/bulk-delete")
+async def bulk_delete_posts(req: BulkDeleteRequest, db: AsyncSession = Depends(get_db)):
+    """
+    Delete many posts from Facebook/Instagram and locally.
+    Platform deletes go out as concurrent Graph API batch calls under the shared API
+    budget; local rows, their analytics and tombstones are then written with one
+    statement per table. Posts the budget could not cover are kept (429, retry later).
+    Returns a result per id, in order; `failed` excludes ids that were not found.
+    """
+    ids = list(dict.fromkeys(req.ids))
+    rows = (await db.execute(
+        select(Post.id, Post.platform, Post.platform_post_id).where(Post.id.in_(ids))
+    )).all()
+    found = {row.id: row for row in rows}
+    platform_errors = await analytics_service.delete_platform_posts([row for row in rows if row.platform_post_id])
+
+    results = []
+    deletes = []
+    for post_id in ids:
+        row = found.get(post_id)
+        if row is None:
+            results.append({"id": post_id, "ok": False, "status_code": 404, "error": "Post not found"})
+            continue
+        res = {"id": post_id, "ok": True, "platform": "skipped"}  # Never published: nothing to delete upstream
+        if row.platform_post_id:
+            error = platform_errors.get(post_id)
+            res["platform"] = "failed" if error else "deleted"
+            if error == BUDGET_EXHAUSTED:
+                res.update(platform="skipped", ok=False, status_code=429, error=error)
+            elif error:
+                res["platform_error"] = error
+                if req.keep_on_platform_failure:
+                    res.update(ok=False, status_code=502, error="Platform delete failed; post kept.")
+        if res["ok"]:
+            deletes.append(post_id)
+        results.append(res)
+
+    if deletes:
+        # Bulk statements skip the ORM version hooks, so reserve the tombstone versions here
+        last = await db.run_sync(lambda s: next_versions(s.connection(), len(deletes)))
+        now = datetime.now(timezone.utc)
+        await delete_post_analytics(db, deletes)
+        await db.execute(delete(Post).where(Post.id.in_(deletes)))
+        await db.execute(insert(PostTombstone), [
+            {"post_id": post_id, "version": version, "deleted_at": now}
+            for post_id, version in zip(deletes, range(last - len(deletes) + 1, last + 1))
+        ])
+        await db.commit()
+        overview_cache.invalidate()
+        await schedule_wakeup()
+        await bus.publish("posts.changed", source="bulk_delete", created=[], updated=[], deleted=deletes)
+
+    not_found = len(ids) - len(found)
+    failed = len(results) - len(deletes) - not_found
+    logger.info(f"Analytics: Bulk deleted {len(deletes)} posts ({failed} failed, {not_found} not found).")
+    return {"deleted": len(deletes), "failed": failed, "not_found": not_found, "results": results}
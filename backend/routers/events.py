@@ -0,0 +1,76 @@
+"""
+Events router — pushes post and workflow status changes to clients.
+SSE at /events for browsers (EventSource), WebSocket at /events/ws.
+"""
+
+import json
+import asyncio
+import logging
+
+from fastapi import APIRouter, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+from events import bus
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/events", tags=["events"])
+
+HEARTBEAT_SECONDS = 15
+
+
+@router.get("")
+async def stream_events(request: Request):
+    """Server-Sent Events stream. Each event is `event: <type>` with the JSON event as data."""
+    queue = bus.subscribe()
+
+    async def event_stream():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"  # Keeps proxies from closing an idle stream
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+        finally:
+            bus.unsubscribe(queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/ws")
+async def websocket_events(websocket: WebSocket):
+    """
+    Same events as /events, one JSON message per event. Incoming messages are read
+    and ignored, which is how a disconnect is noticed even when no events flow.
+    """
+    await websocket.accept()
+    queue = bus.subscribe()
+
+    async def send():
+        while True:
+            event = await queue.get()
+            await websocket.send_text(json.dumps(event, default=str))
+
+    async def receive():
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+
+    tasks = [asyncio.create_task(send()), asyncio.create_task(receive())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()  # Re-raise whatever ended it
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
+        bus.unsubscribe(queue)
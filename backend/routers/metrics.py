@@ -0,0 +1,36 @@
+"""
+Metrics router — Prometheus scrape endpoint.
+"""
+
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, Depends, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import database
+from database import get_db
+from db_models import Post, PostStatus
+from metrics import POSTS_DUE, DB_POOL_CHECKED_OUT, DB_POOL_SIZE
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics")
+async def metrics(db: AsyncSession = Depends(get_db)):
+    """Prometheus text exposition. DB-backed gauges are refreshed on each scrape."""
+    due = await db.scalar(
+        select(func.count(Post.id)).where(
+            Post.status == PostStatus.scheduled,
+            Post.scheduled_time <= datetime.now(timezone.utc),
+        )
+    )
+    POSTS_DUE.set(due or 0)
+
+    pool = database.engine.pool
+    DB_POOL_CHECKED_OUT.set(pool.checkedout())
+    if hasattr(pool, "size"):
+        DB_POOL_SIZE.set(pool.size())
+
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -3,21 +3,40 @@ Posts CRUD router.
 Manages draft / scheduled / published posts in the database.
 """
 
+import json
+import base64
+import hashlib
 import logging
 from datetime import datetime, timezone
-from typing import Optional
+import uuid
+from typing import List, Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Request, Response
+from pydantic import BaseModel, Field
+from sqlalchemy import select, insert, update, delete, and_, or_, tuple_, func, cast, literal_column, Date
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from database import get_db
-from db_models import Post, PostStatus, PlatformEnum
+from db_models import (
+    Post, PostStatus, PlatformEnum, PostTombstone, SyncCounter,
+    POST_LIST_COLUMNS, TOMBSTONE_HORIZON, current_posts_version, next_versions,
+)
+from fast_json import FastJSONResponse, rows_to_dicts
+from post_search import search_posts
+from idempotency import idempotent
+from scheduler_service import schedule_wakeup
+from events import bus
+from analytics_service import overview_cache
+from analytics_rollup import delete_post_analytics
+from best_time_service import best_times
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/posts", tags=["posts"])
 
+MAX_PAGE_SIZE = 1000
+MAX_CHANGES = 1000
+MAX_BULK_OPERATIONS = 1000
+
 
 # ---- Request / Response Schemas ----
 
@@ -36,29 +55,79 @@ class UpdatePostRequest(BaseModel):
     scheduled_time: Optional[str] = None
 
 
+class BulkOperation(BaseModel):
+    op: Literal["create", "update", "delete"]
+    id: Optional[str] = None  # required for update / delete
+    platform: Optional[str] = None  # required for create
+    caption: Optional[str] = None
+    image_url: Optional[str] = None
+    status: Optional[str] = None
+    scheduled_time: Optional[str] = None
+
+
+class BulkRequest(BaseModel):
+    operations: List[BulkOperation] = Field(..., max_length=MAX_BULK_OPERATIONS)
+    atomic: bool = False  # If any item is invalid, apply nothing
+
+
 # ---- Endpoints ----
 
 @router.post("")
-async def create_post(req: CreatePostRequest, db: AsyncSession = Depends(get_db)):
-    """Create a new draft or scheduled post."""
+async def create_post(
+    req: CreatePostRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Create a new draft or scheduled post. A scheduled post without scheduled_time goes
+    out at the platform's next best slot (see GET /analytics/best-times); without enough
+    history to pick one it is rejected with 422. Repeats with the same Idempotency-Key
+    return the first result.
+    """
+    async with idempotent(idempotency_key, "POST /posts", req.model_dump()) as guard:
+        if guard.cached is not None:
+            return guard.cached
+        return await guard.store(await _create_post(req, db))
+
+
+def _parse_platform(value: str) -> PlatformEnum:
     try:
-        platform = PlatformEnum(req.platform.lower())
+        return PlatformEnum(value.lower())
     except ValueError:
-        raise HTTPException(status_code=400, detail=f"Invalid platform: {req.platform}. Use 'instagram' or 'facebook'.")
+        raise HTTPException(status_code=400, detail=f"Invalid platform: {value}. Use 'instagram' or 'facebook'.")
 
+
+def _parse_status(value: str) -> PostStatus:
     try:
-        status = PostStatus(req.status.lower())
+        return PostStatus(value.lower())
     except ValueError:
-        raise HTTPException(status_code=400, detail=f"Invalid status: {req.status}. Use 'draft' or 'scheduled'.")
+        raise HTTPException(status_code=400, detail=f"Invalid status: {value}. Use 'draft' or 'scheduled'.")
 
-    sched_time = None
-    if req.scheduled_time:
-        try:
-            sched_time = datetime.fromisoformat(req.scheduled_time)
-            if sched_time.tzinfo is None:
-                sched_time = sched_time.replace(tzinfo=timezone.utc)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid scheduled_time format. Use ISO 8601.")
+
+def _parse_scheduled_time(value: str) -> datetime:
+    try:
+        sched_time = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid scheduled_time format. Use ISO 8601.")
+    if sched_time.tzinfo is None:
+        sched_time = sched_time.replace(tzinfo=timezone.utc)
+    # SQLite keeps the wall time and drops the offset, so store everything in UTC
+    return sched_time.astimezone(timezone.utc)
+
+
+async def _create_post(req: CreatePostRequest, db: AsyncSession) -> dict:
+    platform = _parse_platform(req.platform)
+    status = _parse_status(req.status)
+    sched_time = _parse_scheduled_time(req.scheduled_time) if req.scheduled_time else None
+    if status == PostStatus.scheduled and sched_time is None:
+        # No time given: take the platform's next best slot from posting history
+        sched_time = await best_times.next_best_time(platform)
+        if sched_time is None:
+            # Stored without a time, the scheduler would never pick it up
+            raise HTTPException(
+                status_code=422,
+                detail=f"Not enough {platform.value} history to pick a time; set scheduled_time.",
+            )
 
     post = Post(
         platform=platform,
@@ -71,14 +140,103 @@ async def create_post(req: CreatePostRequest, db: AsyncSession = Depends(get_db)
     await db.commit()
     await db.refresh(post)
 
+    if post.status == PostStatus.scheduled:
+        await schedule_wakeup()
+
     logger.info(f"Posts: Created post {post.id} ({platform.value}, {status.value})")
+    await bus.publish("post.created", post=post.to_dict())
     return post.to_dict()
 
 
+def _parse_bound(value: Optional[str], name: str) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        bound = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid '{name}' format. Use ISO 8601.")
+    # Post times are stored in UTC (naive on SQLite): naive bounds are taken as UTC,
+    # aware ones converted
+    if bound.tzinfo is not None:
+        bound = bound.astimezone(timezone.utc).replace(tzinfo=None)
+    return bound
+
+
+def _encode_cursor(created_at: Optional[datetime], post_id: str) -> str:
+    raw = json.dumps([created_at.isoformat() if created_at else None, post_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[Optional[datetime], str]:
+    try:
+        created_at, post_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return (datetime.fromisoformat(created_at) if created_at is not None else None), post_id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+
+def _after_cursor(created_at: Optional[datetime], post_id: str):
+    """Rows after the cursor in (created_at DESC NULLS LAST, id DESC) order."""
+    if created_at is None:
+        return and_(Post.created_at.is_(None), Post.id < post_id)
+    return or_(tuple_(Post.created_at, Post.id) < tuple_(created_at, post_id), Post.created_at.is_(None))
+
+
+def _sync_headers(request: Request, version: int) -> dict:
+    """Weak ETag from the global posts version plus the query string."""
+    query_key = hashlib.sha1(str(sorted(request.query_params.multi_items())).encode()).hexdigest()[:12]
+    return {"ETag": f'W/"{version}-{query_key}"', "Cache-Control": "no-cache", "X-Sync-Version": str(version)}
+
+
+def _time_range(col, start: Optional[datetime], end: Optional[datetime]):
+    conds = [col.is_not(None)]
+    if start:
+        conds.append(col >= start)
+    if end:
+        conds.append(col < end)
+    return and_(*conds)
+
+
+def _calendar_range(start: Optional[datetime], end: Optional[datetime]):
+    """
+    Posts whose calendar time (scheduled_time, else published_time) is in range.
+    Written as two plain range conditions so each side can use its own index.
+    """
+    return or_(
+        _time_range(Post.scheduled_time, start, end),
+        and_(Post.scheduled_time.is_(None), _time_range(Post.published_time, start, end)),
+    )
+
+
 @router.get("")
-async def list_posts(status: Optional[str] = None, db: AsyncSession = Depends(get_db)):
-    """Return all posts. Optionally filter by status."""
-    stmt = select(Post).order_by(Post.created_at.desc())
+async def list_posts(
+    request: Request,
+    status: Optional[str] = None,
+    platform: Optional[str] = None,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    date_field: str = "any",
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Return posts, newest first. Optional filters:
+      status, platform (comma-separated), from/to (ISO 8601, half-open range)
+      on scheduled_time, published_time, either ("any", default) or the day the
+      post is shown on in the calendar ("calendar").
+    With `limit`, results are paged by keyset; the next page's cursor is in X-Next-Cursor.
+
+    Responses carry a weak ETag derived from the global posts version, so an unchanged
+    list revalidates with 304 and no body. X-Sync-Version is the `since` value to pass
+    to /posts/changes afterwards.
+    """
+    headers = _sync_headers(request, await current_posts_version(db))
+    if headers["ETag"] in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    # Rows written without created_at (raw SQL) sort last on every backend
+    stmt = select(*POST_LIST_COLUMNS).order_by(Post.created_at.desc().nulls_last(), Post.id.desc())
 
     if status:
         try:
@@ -87,9 +245,181 @@ async def list_posts(status: Optional[str] = None, db: AsyncSession = Depends(ge
         except ValueError:
             pass  # Ignore invalid filter
 
-    result = await db.execute(stmt)
-    posts = result.scalars().all()
-    return [p.to_dict() for p in posts]
+    if platform:
+        try:
+            platforms = [PlatformEnum(p.strip().lower()) for p in platform.split(",") if p.strip()]
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid platform: {platform}")
+        stmt = stmt.where(Post.platform.in_(platforms))
+
+    start = _parse_bound(date_from, "from")
+    end = _parse_bound(date_to, "to")
+    if start or end:
+        if date_field == "calendar":
+            stmt = stmt.where(_calendar_range(start, end))
+        else:
+            columns = {
+                "scheduled_time": [Post.scheduled_time],
+                "published_time": [Post.published_time],
+                "any": [Post.scheduled_time, Post.published_time],
+            }.get(date_field)
+            if columns is None:
+                raise HTTPException(
+                    status_code=400,
+                    detail="date_field must be scheduled_time, published_time, any or calendar.",
+                )
+            stmt = stmt.where(or_(*[_time_range(col, start, end) for col in columns]))
+
+    if cursor:
+        stmt = stmt.where(_after_cursor(*_decode_cursor(cursor)))
+
+    if limit:
+        # Fetch one extra row to know whether another page exists
+        stmt = stmt.limit(limit + 1)
+
+    posts = rows_to_dicts(await db.execute(stmt))
+
+    if limit and len(posts) > limit:
+        posts = posts[:limit]
+        headers["X-Next-Cursor"] = _encode_cursor(posts[-1]["created_at"], posts[-1]["id"])
+
+    return FastJSONResponse(posts, headers=headers)
+
+
+@router.get("/changes")
+async def list_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(MAX_CHANGES, ge=1, le=MAX_CHANGES),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Delta feed: posts created/updated and ids deleted after version `since`.
+    Pass the returned `version` as the next `since`. `reset: true` means the
+    tombstones for that range were pruned and the client must reload GET /posts.
+    """
+    # Read the ceiling first: writes committed mid-request land in the next poll
+    current = await current_posts_version(db)
+    horizon = await db.scalar(select(SyncCounter.value).where(SyncCounter.name == TOMBSTONE_HORIZON)) or 0
+    if since < horizon:
+        return {"reset": True, "version": current, "changes": [], "deleted": [], "has_more": False}
+
+    posts = (await db.execute(
+        select(Post).where(Post.version > since, Post.version <= current).order_by(Post.version).limit(limit)
+    )).scalars().all()
+    tombstones = (await db.execute(
+        select(PostTombstone.post_id, PostTombstone.version)
+        .where(PostTombstone.version > since, PostTombstone.version <= current)
+        .order_by(PostTombstone.version)
+        .limit(limit)
+    )).all()
+
+    # Merge both streams by version and cut at `limit` so paging never skips a change
+    merged = sorted([(p.version, p) for p in posts] + [(t.version, t.post_id) for t in tombstones], key=lambda x: x[0])
+    has_more = len(merged) > limit or len(posts) == limit or len(tombstones) == limit
+    merged = merged[:limit]
+    version = merged[-1][0] if has_more and merged else current
+
+    return {
+        "reset": False,
+        "version": version,
+        "changes": [item.to_dict() for _, item in merged if isinstance(item, Post)],
+        "deleted": [item for _, item in merged if isinstance(item, str)],
+        "has_more": has_more,
+    }
+
+
+@router.get("/calendar")
+async def calendar_summary(
+    request: Request,
+    date_from: str = Query(..., alias="from"),
+    date_to: str = Query(..., alias="to"),
+    platform: Optional[str] = None,
+    tz_offset: int = Query(0, ge=-14 * 60, le=14 * 60),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Per-day post counts for a calendar window, by platform and by status.
+    A post falls on the day of its scheduled_time, else its published_time.
+    `tz_offset` is minutes east of UTC, so days match the viewer's local calendar
+    (`from`/`to` are the window's local midnights as ISO 8601 with their offset).
+    Counting is a GROUP BY over the covering time/platform/status indexes; the posts
+    of one day are loaded with GET /posts?from=..&to=..&date_field=calendar when it's opened.
+    """
+    start = _parse_bound(date_from, "from")
+    end = _parse_bound(date_to, "to")
+
+    headers = _sync_headers(request, await current_posts_version(db))
+    if headers["ETag"] in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    platform_filter = []
+    if platform:
+        platform_filter = [Post.platform.in_([_parse_platform(p.strip()) for p in platform.split(",") if p.strip()])]
+
+    dialect = db.bind.dialect.name
+    rows = []
+    # One grouped query per calendar time column, each a range scan on its own index
+    for col, where in (
+        (Post.scheduled_time, [_time_range(Post.scheduled_time, start, end)]),
+        (Post.published_time, [Post.scheduled_time.is_(None), _time_range(Post.published_time, start, end)]),
+    ):
+        day = _local_day(col, tz_offset, dialect).label("day")
+        stmt = (
+            select(day, Post.platform, Post.status, func.count().label("count"))
+            .where(*where, *platform_filter)
+            .group_by(day, Post.platform, Post.status)
+        )
+        rows.extend((await db.execute(stmt)).all())
+
+    days: dict[str, dict] = {}
+    totals = {"total": 0, "platforms": {}, "statuses": {}}
+    for day, plat, status, count in rows:
+        key = str(day)
+        entry = days.setdefault(key, {"date": key, "total": 0, "platforms": {}, "statuses": {}})
+        for bucket in (entry, totals):
+            bucket["total"] += count
+            bucket["platforms"][plat.value] = bucket["platforms"].get(plat.value, 0) + count
+            bucket["statuses"][status.value] = bucket["statuses"].get(status.value, 0) + count
+
+    return FastJSONResponse(
+        {"days": [days[k] for k in sorted(days)], "totals": totals},
+        headers=headers,
+    )
+
+
+def _local_day(col, tz_offset: int, dialect: str):
+    """Calendar date of a naive UTC timestamp column, shifted by tz_offset minutes."""
+    if dialect == "postgresql":
+        return cast(col + literal_column(f"interval '{int(tz_offset)} minutes'"), Date)
+    return func.date(col, f"{int(tz_offset):+d} minutes")
+
+
+@router.get("/search")
+async def search(
+    q: str = Query(..., min_length=1),
+    platform: Optional[str] = None,
+    status: Optional[str] = None,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Full-text search over captions, best match first, each with a highlighted `snippet`.
+    Filters: platform, status, from/to on the post's published, scheduled or created time.
+    """
+    result = await search_posts(
+        db,
+        q,
+        platform=_parse_platform(platform) if platform else None,
+        status=_parse_status(status) if status else None,
+        date_from=_parse_bound(date_from, "from"),
+        date_to=_parse_bound(date_to, "to"),
+        limit=limit,
+        offset=offset,
+    )
+    return FastJSONResponse(rows_to_dicts(result) if result is not None else [])
 
 
 @router.get("/{post_id}")
@@ -115,24 +445,19 @@ async def update_post(post_id: str, req: UpdatePostRequest, db: AsyncSession = D
     if req.image_url is not None:
         post.image_url = req.image_url
     if req.status is not None:
-        try:
-            post.status = PostStatus(req.status.lower())
-        except ValueError:
-            raise HTTPException(status_code=400, detail=f"Invalid status: {req.status}")
+        post.status = _parse_status(req.status)
     if req.scheduled_time is not None:
-        try:
-            sched = datetime.fromisoformat(req.scheduled_time)
-            if sched.tzinfo is None:
-                sched = sched.replace(tzinfo=timezone.utc)
-            post.scheduled_time = sched
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid scheduled_time format.")
+        post.scheduled_time = _parse_scheduled_time(req.scheduled_time)
 
     post.updated_at = datetime.now(timezone.utc)
     await db.commit()
     await db.refresh(post)
 
+    if req.status is not None or req.scheduled_time is not None:
+        await schedule_wakeup()
+
     logger.info(f"Posts: Updated post {post_id}")
+    await bus.publish("post.updated", post=post.to_dict())
     return post.to_dict()
 
 
@@ -144,8 +469,131 @@ async def delete_post(post_id: str, db: AsyncSession = Depends(get_db)):
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
 
+    await delete_post_analytics(db, [post_id])
     await db.delete(post)
     await db.commit()
+    overview_cache.invalidate()
 
     logger.info(f"Posts: Deleted post {post_id}")
+    await bus.publish("post.deleted", id=post_id)
     return {"detail": "Post deleted", "id": post_id}
+
+
+@router.post("/bulk")
+async def bulk_posts(req: BulkRequest, db: AsyncSession = Depends(get_db)):
+    """
+    Apply many create / update / delete operations in one transaction.
+    Items are validated first; valid ones are written with one INSERT, one
+    executemany UPDATE and one DELETE per table. Returns a result per item, in order.
+    """
+    results: list[dict] = [{"index": i, "op": op.op, "id": op.id, "ok": True} for i, op in enumerate(req.operations)]
+    now = datetime.now(timezone.utc)
+
+    # ---- Validate ----
+    target_ids = {op.id for op in req.operations if op.op != "create" and op.id}
+    existing = set()
+    if target_ids:
+        existing = set((await db.execute(select(Post.id).where(Post.id.in_(target_ids)))).scalars())
+
+    creates, updates, deletes = [], [], []
+    seen_ids = set()
+    for op, res in zip(req.operations, results):
+        try:
+            if op.op == "create":
+                if not op.platform:
+                    raise HTTPException(status_code=400, detail="platform is required for create.")
+                row = {
+                    "id": str(uuid.uuid4()),
+                    "platform": _parse_platform(op.platform),
+                    "caption": op.caption or "",
+                    "image_url": op.image_url,
+                    "status": _parse_status(op.status or "draft"),
+                    "scheduled_time": _parse_scheduled_time(op.scheduled_time) if op.scheduled_time else None,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                res["id"] = row["id"]
+                creates.append(row)
+                continue
+
+            if not op.id:
+                raise HTTPException(status_code=400, detail=f"id is required for {op.op}.")
+            if op.id not in existing:
+                raise HTTPException(status_code=404, detail="Post not found")
+            if op.id in seen_ids:
+                raise HTTPException(status_code=400, detail="Post appears more than once in this batch.")
+            seen_ids.add(op.id)
+
+            if op.op == "delete":
+                deletes.append(op.id)
+                continue
+
+            row = {"id": op.id, "updated_at": now}
+            if op.caption is not None:
+                row["caption"] = op.caption
+            if op.image_url is not None:
+                row["image_url"] = op.image_url
+            if op.status is not None:
+                row["status"] = _parse_status(op.status)
+            if op.scheduled_time is not None:
+                row["scheduled_time"] = _parse_scheduled_time(op.scheduled_time)
+            updates.append(row)
+        except HTTPException as e:
+            res.update(ok=False, status_code=e.status_code, error=e.detail)
+
+    failed = sum(not r["ok"] for r in results)
+    if failed and req.atomic:
+        for r in results:
+            if r["ok"]:
+                r.update(ok=False, status_code=409, error="Not applied: batch is atomic and another item failed.")
+        return {"applied": 0, "failed": len(results), "results": results}
+
+    # ---- Apply in one transaction ----
+    writes = len(creates) + len(updates) + len(deletes)
+    if writes:
+        # Bulk statements skip the ORM version hooks, so reserve the versions here
+        last = await db.run_sync(lambda s: next_versions(s.connection(), writes))
+        versions = iter(range(last - writes + 1, last + 1))
+
+        if creates:
+            for row in creates:
+                row["version"] = next(versions)
+            await db.execute(insert(Post), creates)
+        if updates:
+            for row in updates:
+                row["version"] = next(versions)
+            await db.execute(update(Post), updates)
+        if deletes:
+            await delete_post_analytics(db, deletes)
+            await db.execute(delete(Post).where(Post.id.in_(deletes)))
+            await db.execute(insert(PostTombstone), [
+                {"post_id": post_id, "version": next(versions), "deleted_at": now} for post_id in deletes
+            ])
+        await db.commit()
+        if deletes:
+            overview_cache.invalidate()
+
+    # ---- Per-item results with the stored rows ----
+    written_ids = [r["id"] for r in creates + updates]
+    if written_ids:
+        rows = (await db.execute(select(Post).where(Post.id.in_(written_ids)))).scalars().all()
+        by_id = {p.id: p.to_dict() for p in rows}
+        for r in results:
+            if r["ok"] and r["id"] in by_id:
+                r["post"] = by_id[r["id"]]
+
+    # One wake-up recomputation and one event for the whole batch
+    if writes:
+        await schedule_wakeup()
+        await bus.publish(
+            "posts.changed",
+            source="bulk",
+            created=[r["id"] for r in creates],
+            updated=[r["id"] for r in updates],
+            deleted=deletes,
+        )
+
+    logger.info(
+        f"Posts: Bulk applied {len(creates)} creates, {len(updates)} updates, {len(deletes)} deletes ({failed} failed)"
+    )
+    return {"applied": writes, "failed": failed, "results": results}
@@ -0,0 +1,28 @@
+"""
+Tracing router — per-endpoint latency summaries built from request spans.
+"""
+
+from fastapi import APIRouter
+
+from tracing import tracer
+
+router = APIRouter(prefix="/tracing", tags=["tracing"])
+
+
+@router.get("/summary")
+async def get_summary():
+    """Average / max latency per endpoint, broken down by node, upstream and db spans."""
+    return tracer.summary()
+
+
+@router.get("/recent")
+async def get_recent(limit: int = 20):
+    """The most recent finished traces, newest last."""
+    return tracer.recent(limit)
+
+
+@router.post("/reset")
+async def reset_summary():
+    """Clear the in-memory summary (exported spans are unaffected)."""
+    tracer.reset()
+    return {"message": "Tracing summary cleared"}
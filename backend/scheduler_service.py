@@ -3,25 +3,36 @@ APScheduler-based scheduling engine.
 Runs a background job every 60 seconds to publish posts whose scheduled_time has passed.
 """
 
+import os
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.date import DateTrigger
 from apscheduler.triggers.interval import IntervalTrigger
-from sqlalchemy import select
+from sqlalchemy import select, delete, func
 
 from database import async_session
-from db_models import Post, PostStatus
+from db_models import Post, PostStatus, PostTombstone, SyncCounter, TOMBSTONE_HORIZON
+from metrics import POSTS_DUE, SCHEDULER_PUBLISHED, observe_publish_lag
+from idempotency import purge_expired_keys
+from graph_cache import purge_expired as purge_graph_cache
+from analytics_rollup import rollup_analytics
+from analytics_refresher import analytics_refresher, TICK_SECONDS as REFRESHER_TICK_SECONDS
+from events import bus
 
 logger = logging.getLogger(__name__)
 
 # Module-level scheduler instance
 scheduler = AsyncIOScheduler()
 
+TOMBSTONE_RETENTION_DAYS = int(os.getenv("TOMBSTONE_RETENTION_DAYS", "30"))
+WAKEUP_JOB_ID = "publish_next_due"
+
 
 async def _process_scheduled_posts():
     """Fetch due posts and publish them via existing platform services."""
-    now = datetime.now()  # Use local server time (matches how schedule_time is stored)
+    now = datetime.now(timezone.utc)  # scheduled_time is stored in UTC
     logger.info(f"Scheduler tick — checking for posts due before {now.isoformat()}")
 
     async with async_session() as session:
@@ -31,6 +42,7 @@ async def _process_scheduled_posts():
         )
         result = await session.execute(stmt)
         due_posts = result.scalars().all()
+        POSTS_DUE.set(len(due_posts))
 
         if not due_posts:
             logger.info("Scheduler: No posts due.")
@@ -60,17 +72,77 @@ async def _process_scheduled_posts():
 
                 if "Published" in result_msg:
                     post.status = PostStatus.published
-                    post.published_time = datetime.now()
+                    post.published_time = datetime.now(timezone.utc)
+                    observe_publish_lag(platform_name, post.scheduled_time, post.published_time)
+                    SCHEDULER_PUBLISHED.labels(platform=platform_name, outcome="published").inc()
                     logger.info(f"Scheduler: Post {post.id} published successfully.")
                 else:
                     post.status = PostStatus.failed
+                    SCHEDULER_PUBLISHED.labels(platform=platform_name, outcome="failed").inc()
                     logger.warning(f"Scheduler: Post {post.id} failed — {result_msg}")
 
             except Exception as e:
                 post.status = PostStatus.failed
+                SCHEDULER_PUBLISHED.labels(platform=platform_name, outcome="error").inc()
                 logger.error(f"Scheduler: Error publishing post {post.id}: {e}")
 
         await session.commit()
+        POSTS_DUE.set(0)
+
+        for post in due_posts:
+            await bus.publish(f"post.{post.status.value}", post=post.to_dict())
+
+    await schedule_wakeup()
+
+
+async def schedule_wakeup():
+    """
+    Arm a one-shot run at the earliest pending scheduled_time so posts go out on time
+    instead of waiting for the next 60 s poll. Writers call this once per change (or
+    once per bulk batch); the interval job remains the safety net.
+    """
+    if not scheduler.running:
+        return
+
+    async with async_session() as session:
+        next_due = await session.scalar(
+            select(func.min(Post.scheduled_time)).where(Post.status == PostStatus.scheduled)
+        )
+
+    if next_due is None:
+        if scheduler.get_job(WAKEUP_JOB_ID):
+            scheduler.remove_job(WAKEUP_JOB_ID)
+        return
+
+    if next_due.tzinfo is None:  # SQLite hands back naive UTC
+        next_due = next_due.replace(tzinfo=timezone.utc)
+    run_at = max(next_due, datetime.now(timezone.utc))
+    scheduler.add_job(
+        _process_scheduled_posts,
+        trigger=DateTrigger(run_date=run_at),
+        id=WAKEUP_JOB_ID,
+        replace_existing=True,
+    )
+    logger.info(f"Scheduler: Next wake-up at {run_at.isoformat()}")
+
+
+async def _prune_post_tombstones():
+    """Drop old delete markers; clients syncing from before the horizon get reset=true."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=TOMBSTONE_RETENTION_DAYS)
+    async with async_session() as session:
+        horizon = await session.scalar(
+            select(func.max(PostTombstone.version)).where(PostTombstone.deleted_at < cutoff)
+        )
+        if horizon is None:
+            return
+        await session.execute(delete(PostTombstone).where(PostTombstone.version <= horizon))
+        counter = await session.get(SyncCounter, TOMBSTONE_HORIZON)
+        if counter:
+            counter.value = max(counter.value, horizon)
+        else:
+            session.add(SyncCounter(name=TOMBSTONE_HORIZON, value=horizon))
+        await session.commit()
+        logger.info(f"Scheduler: Pruned post tombstones up to version {horizon}.")
 
 
 def start_scheduler():
@@ -81,6 +153,38 @@ def start_scheduler():
         id="publish_scheduled_posts",
         replace_existing=True,
     )
+    scheduler.add_job(
+        purge_expired_keys,
+        trigger=IntervalTrigger(hours=1),
+        id="purge_idempotency_keys",
+        replace_existing=True,
+    )
+    scheduler.add_job(
+        purge_graph_cache,
+        trigger=IntervalTrigger(hours=6),
+        id="purge_graph_cache",
+        replace_existing=True,
+    )
+    scheduler.add_job(
+        _prune_post_tombstones,
+        trigger=IntervalTrigger(hours=6),
+        id="prune_post_tombstones",
+        replace_existing=True,
+    )
+    scheduler.add_job(
+        analytics_refresher.tick,
+        trigger=IntervalTrigger(seconds=REFRESHER_TICK_SECONDS),
+        id="refresh_analytics_by_age",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+    )
+    scheduler.add_job(
+        rollup_analytics,
+        trigger=IntervalTrigger(minutes=15),
+        id="rollup_analytics",
+        replace_existing=True,
+    )
     scheduler.start()
     logger.info("Scheduler started — polling every 60 seconds.")
 
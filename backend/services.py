@@ -5,6 +5,8 @@ import time
 import requests
 import logging
 
+from tracing import span, traced_request
+
 logger = logging.getLogger(__name__)
 
 # Load environment variables (ensure main.py calls load_dotenv)
@@ -36,7 +38,8 @@ class GeminiService:
             prompt += f" Incorporate this feedback: {feedback}"
         
         try:
-            response = self.model.generate_content(prompt)
+            with span("gemini.generate_content", kind="upstream", upstream="gemini", platform=platform):
+                response = self.model.generate_content(prompt)
             logger.info(f"GeminiService: Captions generated for {platform}.")
             
             # Clean up response
@@ -80,7 +83,8 @@ class GeminiService:
             prompt += f" Feedback: {feedback}"
             
         try:
-            response = self.model.generate_content(prompt)
+            with span("gemini.generate_content", kind="upstream", upstream="gemini"):
+                response = self.model.generate_content(prompt)
             return response.text
         except Exception as e:
             return f"Error: {e}"
@@ -100,7 +104,8 @@ class GeminiService:
         """
         
         try:
-            prompt_response = self.model.generate_content(refinement_prompt)
+            with span("gemini.generate_content", kind="upstream", upstream="gemini"):
+                prompt_response = self.model.generate_content(refinement_prompt)
             refined_prompt = prompt_response.text.strip()
             logger.info(f"GeminiService: Refined prompt for Pixazo: {refined_prompt[:50]}...")
             
@@ -146,7 +151,7 @@ class PixazoService:
         
         try:
             logger.info(f"PixazoService: Sending request for prompt: {prompt[:50]}...")
-            response = requests.post(self.request_url, json=payload, headers=headers, timeout=30)
+            response = traced_request("POST", self.request_url, upstream="pixazo", json=payload, headers=headers, timeout=30)
             response.raise_for_status()
             data = response.json()
             # Check if output is immediate
@@ -175,7 +180,7 @@ class PixazoService:
                 
                 res_payload = {"requestId": request_id}
                 try:
-                    res_response = requests.post(self.result_url, json=res_payload, headers=poll_headers, timeout=30)
+                    res_response = traced_request("POST", self.result_url, upstream="pixazo", json=res_payload, headers=poll_headers, timeout=30)
                     res_response.raise_for_status()
                     res_data = res_response.json()
                 except Exception as poll_e:
@@ -243,7 +248,7 @@ class InstagramService:
         
         try:
             # Create container
-            response = requests.post(url, data=payload)
+            response = traced_request("POST", url, upstream="graph_api", platform="instagram", data=payload)
             response.raise_for_status()
             result = response.json()
             creation_id = result.get("id")
@@ -265,7 +270,7 @@ class InstagramService:
             # We can add a simple retry or wait logic if needed, but for now specific sleep might be safer.
             time.sleep(3) 
 
-            pub_response = requests.post(publish_url, data=publish_payload)
+            pub_response = traced_request("POST", publish_url, upstream="graph_api", platform="instagram", data=publish_payload)
             pub_response.raise_for_status()
             pub_result = pub_response.json()
             
@@ -314,7 +319,7 @@ class FreeImageHostService:
             }
             
             logger.info("FreeImageHostService: Uploading image...")
-            response = requests.post(self.upload_url, data=payload)
+            response = traced_request("POST", self.upload_url, upstream="freeimage", data=payload)
             response.raise_for_status()
             
             data = response.json()
@@ -361,7 +366,7 @@ class FacebookService:
         }
         
         try:
-            response = requests.post(url, data=payload)
+            response = traced_request("POST", url, upstream="graph_api", platform="facebook", data=payload)
             response.raise_for_status()
             result = response.json()
             
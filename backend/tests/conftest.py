@@ -0,0 +1,40 @@
+"""
+Shared fixtures. Tests that touch the database run the app against a throwaway
+SQLite file: DATABASE_URL is set before any app module creates its engine, and
+every table is emptied after each test.
+"""
+
+import os
+import tempfile
+
+import pytest
+
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+os.environ.setdefault("GEMINI_API_KEY", "test")
+
+
+@pytest.fixture(scope="session")
+def client():
+    """TestClient over the app; its portal runs coroutines on the app's event loop."""
+    from fastapi.testclient import TestClient
+    import main
+
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def run(client):
+    """Run an async function on the app's event loop: run(fn, *args)."""
+    yield client.portal.call
+
+    from sqlalchemy import delete
+    from database import Base, async_session
+
+    async def wipe():
+        async with async_session() as session:
+            for table in reversed(Base.metadata.sorted_tables):
+                await session.execute(delete(table))
+            await session.commit()
+
+    client.portal.call(wipe)
@@ -0,0 +1,96 @@
+"""Snapshot rollups, carried-forward bucket totals and history cleanup on delete."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import delete, insert, select
+
+from analytics_rollup import rollup_analytics, snapshot_row
+from database import async_session
+from db_models import AnalyticsRollup, AnalyticsSnapshot, Post, PlatformEnum
+
+
+def _now():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+async def _seed(readings):
+    """readings: (post_id, hours ago, reach). Posts are created as needed, then rolled up."""
+    async with async_session() as session:
+        post_ids = sorted({post_id for post_id, _, _ in readings})
+        await session.execute(insert(Post), [
+            {"id": post_id, "platform": PlatformEnum.facebook, "caption": "c", "version": 1} for post_id in post_ids
+        ])
+        await session.execute(insert(AnalyticsSnapshot), [
+            snapshot_row(post_id, PlatformEnum.facebook, {"reach": reach}, _now() - timedelta(hours=hours))
+            for post_id, hours, reach in readings
+        ])
+        await session.commit()
+    await rollup_analytics()
+
+
+async def _history(post_id):
+    async with async_session() as session:
+        snapshots = (await session.execute(select(AnalyticsSnapshot.id).where(AnalyticsSnapshot.post_id == post_id))).all()
+        rollups = (await session.execute(select(AnalyticsRollup.post_id).where(AnalyticsRollup.post_id == post_id))).all()
+        return len(snapshots), len(rollups)
+
+
+def _insights(client, **params):
+    response = client.get("/analytics/insights", params=params)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_totals_carry_unsampled_posts_forward(client, run):
+    # "a" is read every hour, "b" only once at the start
+    run(_seed, [("a", h, 100 - h) for h in range(5, 0, -1)] + [("b", 5, 50)])
+
+    points = _insights(client, bucket="hour", **{"from": (_now() - timedelta(hours=6)).isoformat()})
+    assert [p["reach"] for p in points] == [145, 146, 147, 148, 149]
+    assert [p["posts"] for p in points] == [2] * 5
+    assert [p["sampled"] for p in points] == [2, 1, 1, 1, 1]
+
+
+def test_window_opens_with_readings_from_before_it(client, run):
+    run(_seed, [("a", 30, 10), ("a", 2, 20), ("b", 30, 5)])
+
+    for bucket in ("hour", "day"):
+        points = _insights(client, bucket=bucket, **{"from": (_now() - timedelta(hours=3)).isoformat()})
+        assert points[-1]["reach"] == 25, bucket
+        assert points[-1]["posts"] == 2, bucket
+
+
+def test_hour_and_day_count_posts_whose_hours_were_pruned(client, run):
+    run(_seed, [("old", 24 * 100, 7), ("new", 0, 3)])
+
+    async def prune_hours():
+        async with async_session() as session:
+            await session.execute(delete(AnalyticsRollup).where(
+                AnalyticsRollup.granularity == "hour", AnalyticsRollup.post_id == "old",
+            ))
+            await session.commit()
+
+    run(prune_hours)
+    since = {"from": (_now() - timedelta(hours=1)).isoformat()}
+    for bucket in ("hour", "day"):
+        last = _insights(client, bucket=bucket, **since)[-1]
+        assert (last["reach"], last["posts"]) == (10, 2), bucket
+
+
+@pytest.mark.parametrize("delete_post", [
+    lambda client, post_id: client.delete(f"/analytics/posts/{post_id}"),
+    lambda client, post_id: client.delete(f"/posts/{post_id}"),
+    lambda client, post_id: client.post("/analytics/posts/bulk-delete", json={"ids": [post_id]}),
+    lambda client, post_id: client.post("/posts/bulk", json={"operations": [{"op": "delete", "id": post_id}]}),
+])
+def test_deleted_posts_leave_the_time_series(client, run, delete_post):
+    run(_seed, [("kept", 2, 10), ("gone", 2, 100)])
+    assert _insights(client, bucket="day")[-1]["reach"] == 110
+
+    assert delete_post(client, "gone").status_code == 200
+    assert run(_history, "gone") == (0, 0)
+    assert [p["post_id"] for p in _insights(client, bucket="raw")] == ["kept"]
+    for bucket in ("hour", "day"):
+        last = _insights(client, bucket=bucket)[-1]
+        assert (last["reach"], last["posts"]) == (10, 1), bucket
@@ -0,0 +1,92 @@
+"""Latest-value analytics upsert on the unique post_id index."""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert, select, text
+from sqlalchemy.exc import IntegrityError
+
+from analytics_service import AnalyticsService, dedupe_analytics
+from database import _upgrade_schema, async_session, engine
+from db_models import Analytics, Post, PlatformEnum
+
+
+async def _seed_posts(*post_ids):
+    async with async_session() as session:
+        await session.execute(insert(Post), [
+            {"id": post_id, "platform": PlatformEnum.instagram, "caption": "c", "version": 1} for post_id in post_ids
+        ])
+        await session.commit()
+
+
+async def _upsert(*readings):
+    service = AnalyticsService()
+    async with async_session() as session:
+        await service._upsert_analytics(session, [service._analytics_row(post_id, m) for post_id, m in readings])
+        await session.commit()
+
+
+async def _rows():
+    async with async_session() as session:
+        rows = (await session.execute(select(Analytics))).scalars().all()
+        return {row.post_id: row for row in rows}
+
+
+def test_upsert_inserts_then_updates_one_row_per_post(client, run):
+    run(_seed_posts, "a", "b")
+    run(_upsert, ("a", {"reach": 10, "likes": 1}), ("b", {"reach": 20}))
+    run(_upsert, ("a", {"reach": 40, "likes": 2, "comments": 2}))
+
+    rows = run(_rows)
+    assert sorted(rows) == ["a", "b"]
+    assert (rows["a"].reach, rows["a"].engagement, rows["a"].engagement_rate) == (40, 4, 10.0)
+    assert rows["b"].reach == 20
+
+
+def test_unchanged_reading_leaves_the_row_alone(client, run):
+    run(_seed_posts, "a", "b")
+    run(_upsert, ("a", {"reach": 10}), ("b", {"reach": 10}))
+    before = run(_rows)
+
+    run(asyncio.sleep, 0.01)
+    run(_upsert, ("a", {"reach": 10}), ("b", {"reach": 11}))
+    after = run(_rows)
+
+    # fetched_at only moves when a metric changed
+    assert after["a"].fetched_at == before["a"].fetched_at
+    assert after["a"].id == before["a"].id
+    assert after["b"].fetched_at > before["b"].fetched_at
+    assert after["b"].reach == 11
+
+
+def test_post_id_is_unique(client, run):
+    run(_seed_posts, "a")
+
+    async def duplicate():
+        async with async_session() as session:
+            session.add_all([Analytics(post_id="a"), Analytics(post_id="a")])
+            await session.commit()
+
+    with pytest.raises(IntegrityError):
+        run(duplicate)
+
+
+def test_dedupe_keeps_the_newest_row_before_the_index_is_built(client, run):
+    run(_seed_posts, "a")
+    now = datetime(2026, 10, 1)
+
+    async def legacy_duplicates():
+        async with engine.begin() as conn:
+            await conn.execute(text("DROP INDEX ix_analytics_post_id_unique"))
+            await conn.execute(insert(Analytics), [
+                {"id": f"row-{i}", "post_id": "a", "reach": i, "fetched_at": now + timedelta(hours=i)}
+                for i in range(3)
+            ])
+            # Same order as init_db
+            await conn.run_sync(dedupe_analytics)
+            await conn.run_sync(_upgrade_schema)
+
+    run(legacy_duplicates)
+    rows = run(_rows)
+    assert rows["a"].id == "row-2" and rows["a"].reach == 2
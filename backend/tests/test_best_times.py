@@ -0,0 +1,69 @@
+"""Best-time recommendations and scheduling posts into the best slot."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import insert
+
+from best_time_service import best_times
+from database import async_session
+from db_models import Analytics, Post, PostStatus, PlatformEnum
+
+
+@pytest.fixture(autouse=True)
+def rebuild(monkeypatch):
+    # The table is process-wide; start each test from a full rebuild of what it seeded
+    monkeypatch.setattr(best_times, "_rebuilt_at", 0.0)
+
+
+async def _seed_history(posts):
+    """posts: (published_time, engagement_rate) of published Facebook posts."""
+    async with async_session() as session:
+        await session.execute(insert(Post), [
+            {"id": f"p{i}", "platform": PlatformEnum.facebook, "caption": "c", "version": 1,
+             "status": PostStatus.published, "published_time": published}
+            for i, (published, _) in enumerate(posts)
+        ])
+        await session.execute(insert(Analytics), [
+            {"post_id": f"p{i}", "reach": 100, "engagement_rate": rate}
+            for i, (_, rate) in enumerate(posts)
+        ])
+        await session.commit()
+
+
+def _schedule_without_time(client):
+    return client.post("/posts", json={"platform": "facebook", "caption": "c", "status": "scheduled"})
+
+
+def test_no_history_recommends_nothing_and_asks_for_a_time(client, run):
+    slots = client.get("/analytics/best-times", params={"platform": "facebook"}).json()["facebook"]["slots"]
+    assert slots == []
+
+    response = _schedule_without_time(client)
+    assert response.status_code == 422
+    assert "scheduled_time" in response.json()["detail"]
+    assert client.get("/posts").json() == []
+
+
+def test_scheduled_post_without_time_takes_the_best_slot(client, run):
+    # Tuesdays 14:00 UTC do far better than Mondays 09:00
+    run(_seed_history, [
+        (datetime(2026, 9, 29, 14), 12.0), (datetime(2026, 10, 6, 14), 10.0), (datetime(2026, 10, 13, 14), 11.0),
+        (datetime(2026, 10, 5, 9), 1.0), (datetime(2026, 10, 12, 9), 2.0),
+    ])
+
+    best = client.get("/analytics/best-times", params={"platform": "facebook"}).json()["facebook"]["slots"][0]
+    assert (best["weekday"], best["hour"], best["posts"]) == ("tuesday", 14, 3)
+
+    response = _schedule_without_time(client)
+    assert response.status_code == 200, response.text
+    scheduled = datetime.fromisoformat(response.json()["scheduled_time"])
+    assert (scheduled.weekday(), scheduled.hour, scheduled.utcoffset()) == (1, 14, timedelta(0))
+    assert scheduled > datetime.now(timezone.utc)
+
+
+def test_slots_follow_the_viewer_offset(client, run):
+    run(_seed_history, [(datetime(2026, 10, 6, 14), 10.0), (datetime(2026, 10, 13, 14), 10.0)])
+    response = client.get("/analytics/best-times", params={"platform": "facebook", "tz_offset": -300})
+    best = response.json()["facebook"]["slots"][0]
+    assert (best["weekday"], best["hour"]) == ("tuesday", 9)
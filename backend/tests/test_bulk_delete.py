@@ -0,0 +1,60 @@
+"""POST /analytics/posts/bulk-delete: per-id results, tombstones and the API budget."""
+
+from sqlalchemy import insert, select
+
+import routers.analytics
+from analytics_service import BUDGET_EXHAUSTED, api_budget
+from database import async_session
+from db_models import Post, PostTombstone, PlatformEnum, current_posts_version
+
+
+async def _seed(*posts):
+    """posts: (id, platform_post_id)."""
+    async with async_session() as session:
+        await session.execute(insert(Post), [
+            {"id": post_id, "platform": PlatformEnum.facebook, "caption": "c", "version": 1,
+             "platform_post_id": platform_post_id}
+            for post_id, platform_post_id in posts
+        ])
+        await session.commit()
+
+
+async def _state():
+    async with async_session() as session:
+        posts = set((await session.execute(select(Post.id))).scalars())
+        tombstones = dict((await session.execute(select(PostTombstone.post_id, PostTombstone.version))).all())
+        return posts, tombstones, await current_posts_version(session)
+
+
+def _bulk_delete(client, ids):
+    response = client.post("/analytics/posts/bulk-delete", json={"ids": ids})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_missing_ids_are_not_found_not_failed(client, run):
+    run(_seed, ("a", None), ("b", None))
+    deleted = _bulk_delete(client, ["a", "missing", "b", "a"])
+    assert (deleted["deleted"], deleted["failed"], deleted["not_found"]) == (2, 0, 1)
+    assert [r["id"] for r in deleted["results"]] == ["a", "missing", "b"]
+    assert deleted["results"][1]["status_code"] == 404
+
+    posts, tombstones, current = run(_state)
+    assert posts == set()
+    # Core deletes skip the ORM hooks; the endpoint reserves the tombstone versions
+    assert len(set(tombstones.values())) == 2 and current == max(tombstones.values())
+
+
+def test_posts_the_budget_cannot_cover_are_kept(client, run, monkeypatch):
+    monkeypatch.setattr(routers.analytics.analytics_service, "fb_access_token", "token")
+    monkeypatch.setattr(api_budget, "try_acquire", lambda calls: False)
+    run(_seed, ("published", "123_456"), ("draft", None))
+
+    deleted = _bulk_delete(client, ["published", "draft"])
+    assert (deleted["deleted"], deleted["failed"], deleted["not_found"]) == (1, 1, 0)
+    published = deleted["results"][0]
+    assert (published["ok"], published["status_code"], published["error"]) == (False, 429, BUDGET_EXHAUSTED)
+    assert published["platform"] == "skipped"
+
+    posts, tombstones, _ = run(_state)
+    assert posts == {"published"} and set(tombstones) == {"draft"}
@@ -0,0 +1,55 @@
+"""POST /posts/bulk: batched writes keep the change feed's versions intact."""
+
+from sqlalchemy import select
+
+from database import async_session
+from db_models import Post, PostTombstone, current_posts_version
+
+
+def _create(client, caption):
+    response = client.post("/posts", json={"platform": "instagram", "caption": caption})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def _versions():
+    async with async_session() as session:
+        posts = dict((await session.execute(select(Post.id, Post.version))).all())
+        tombstones = dict((await session.execute(select(PostTombstone.post_id, PostTombstone.version))).all())
+        return posts, tombstones, await current_posts_version(session)
+
+
+def test_bulk_operations_reserve_versions(client, run):
+    kept = _create(client, "kept")
+    gone = _create(client, "gone")
+    response = client.post("/posts/bulk", json={"operations": [
+        {"op": "create", "platform": "facebook", "caption": "new"},
+        {"op": "update", "id": kept["id"], "caption": "kept, edited"},
+        {"op": "delete", "id": gone["id"]},
+    ]}).json()
+    assert response["applied"] == 3
+    created = response["results"][0]["id"]
+
+    # Core statements skip the ORM hooks; the endpoint stamps each write itself
+    posts, tombstones, current = run(_versions)
+    stamped = [posts[created], posts[kept["id"]], tombstones[gone["id"]]]
+    assert len(set(stamped)) == 3
+    assert min(stamped) > gone["version"]
+    assert current == max(stamped)
+
+
+def test_invalid_operations_fail_alone_unless_atomic(client, run):
+    kept = _create(client, "kept")
+    operations = [
+        {"op": "update", "id": kept["id"], "caption": "edited"},
+        {"op": "update", "id": "missing", "caption": "x"},
+    ]
+
+    atomic = client.post("/posts/bulk", json={"operations": operations, "atomic": True}).json()
+    assert atomic["applied"] == 0
+    assert client.get(f"/posts/{kept['id']}").json()["caption"] == "kept"
+
+    partial = client.post("/posts/bulk", json={"operations": operations}).json()
+    assert (partial["applied"], partial["failed"]) == (1, 1)
+    assert [r["ok"] for r in partial["results"]] == [True, False]
+    assert client.get(f"/posts/{kept['id']}").json()["caption"] == "edited"
@@ -0,0 +1,47 @@
+"""LTTB downsampling and its min/max envelopes."""
+
+from array import array
+
+from downsample import downsample_points, lttb_buckets, lttb_indices
+
+METRICS = ("reach", "likes")
+
+
+def _series(values):
+    return [{"time": i * 60.0, "reach": v, "likes": v // 2} for i, v in enumerate(values)]
+
+
+def test_buckets_cover_every_index_once():
+    for n, threshold in [(10, 4), (101, 7), (1000, 50), (5, 5), (3, 10)]:
+        buckets = lttb_buckets(n, threshold)
+        assert [i for lo, hi in buckets for i in range(lo, hi)] == list(range(n))
+        assert len(buckets) == min(n, threshold)
+
+
+def test_keeps_first_last_and_peaks():
+    values = [10] * 100
+    values[37], values[71] = 500, -400
+    kept = lttb_indices(array("d", range(100)), array("q", values), 10)
+    assert kept[0] == 0 and kept[-1] == 99
+    assert {37, 71} <= set(kept)
+
+
+def test_envelope_spans_the_bucket_the_point_stands_for():
+    values = list(range(100))
+    out = downsample_points(_series(values), 10, METRICS, key="reach")
+    buckets = lttb_buckets(100, 10)
+    assert len(out) == len(buckets)
+    for point, (lo, hi) in zip(out, buckets):
+        assert lo <= point["reach"] < hi  # The kept point sits inside its own bucket
+        assert (point["reach_min"], point["reach_max"]) == (min(values[lo:hi]), max(values[lo:hi]))
+        assert (point["likes_min"], point["likes_max"]) == (values[lo] // 2, (hi - 1) // 2)
+
+
+def test_short_series_keep_every_point_with_envelope_keys():
+    points = _series([3, 1, 4])
+    out = downsample_points(points, 10, METRICS, key="reach")
+    assert [p["reach"] for p in out] == [3, 1, 4]
+    for point in out:
+        assert point["reach_min"] == point["reach_max"] == point["reach"]
+        assert point["likes_min"] == point["likes_max"] == point["likes"]
+    assert "reach_min" not in points[0]  # Input left alone
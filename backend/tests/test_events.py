@@ -0,0 +1,52 @@
+"""WebSocket event stream: delivery and cleanup when the client goes away."""
+
+import time
+import asyncio
+
+from events import bus
+from routers.events import websocket_events
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_websocket_delivers_events(client, run):
+    before = bus.subscriber_count
+    with client.websocket_connect("/events/ws") as ws:
+        _wait_for(lambda: bus.subscriber_count == before + 1)
+        run(lambda: bus.publish("post.deleted", id="p1"))
+        event = ws.receive_json()
+        assert (event["type"], event["data"]) == ("post.deleted", {"id": "p1"})
+
+
+class _ClosingSocket:
+    """A client that says one thing and hangs up without waiting for any event."""
+
+    def __init__(self):
+        self.incoming = [{"type": "websocket.receive", "text": "hello"}, {"type": "websocket.disconnect", "code": 1001}]
+
+    async def accept(self):
+        pass
+
+    async def receive(self):
+        if not self.incoming:
+            await asyncio.Event().wait()
+        return self.incoming.pop(0)
+
+    async def send_text(self, data):
+        raise AssertionError("nothing was published")
+
+
+def test_disconnect_unsubscribes_on_a_quiet_bus(client, run):
+    before = bus.subscriber_count
+
+    async def serve():
+        # No event is ever published, so only reading the socket can notice the close
+        await asyncio.wait_for(websocket_events(_ClosingSocket()), timeout=2)
+
+    run(serve)
+    assert bus.subscriber_count == before
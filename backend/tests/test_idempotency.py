@@ -0,0 +1,110 @@
+"""Idempotency-Key: replay, in-progress conflicts, key reuse and claim ownership."""
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, select, update
+
+import idempotency
+from database import async_session
+from db_models import IdempotencyKey, Post
+from idempotency import IdempotencyGuard, _claim, _hash_request, idempotent
+from routers.posts import CreatePostRequest
+
+BODY = {"platform": "instagram", "caption": "launch day"}
+
+
+def _post(client, key, body=BODY):
+    return client.post("/posts", json=body, headers={"Idempotency-Key": key})
+
+
+async def _post_count():
+    async with async_session() as session:
+        return await session.scalar(select(func.count()).select_from(Post))
+
+
+async def _key_row(key):
+    async with async_session() as session:
+        return await session.get(IdempotencyKey, key)
+
+
+def test_repeat_replays_the_stored_response(client, run):
+    first = _post(client, "k1")
+    assert first.status_code == 200, first.text
+    again = _post(client, "k1")
+    assert again.status_code == 200
+    assert again.json() == first.json()
+    assert run(_post_count) == 1
+
+    other = _post(client, "k2")
+    assert other.json()["id"] != first.json()["id"]
+    assert run(_post_count) == 2
+
+
+def test_key_reused_for_a_different_request_is_rejected(client, run):
+    assert _post(client, "k1").status_code == 200
+    assert _post(client, "k1", {**BODY, "caption": "something else"}).status_code == 422
+    assert run(_post_count) == 1
+
+
+def test_repeat_while_the_first_is_running_conflicts(client, run):
+    request_hash = _hash_request(CreatePostRequest(**BODY).model_dump())
+    running = IdempotencyGuard("k1", "POST /posts", request_hash)
+    assert run(_claim, running) is None  # First request holds the claim
+
+    assert _post(client, "k1").status_code == 409
+    assert run(_post_count) == 0
+
+
+def test_failed_request_releases_its_claim(client, run):
+    async def failing():
+        async with idempotent("k1", "POST /test", {"n": 1}):
+            raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        run(failing)
+    assert run(_key_row, "k1") is None
+
+    async def retry():
+        async with idempotent("k1", "POST /test", {"n": 1}) as guard:
+            return await guard.store({"ok": True})
+
+    assert run(retry) == {"ok": True}
+    assert run(_key_row, "k1").pending is False
+
+
+def test_claim_is_renewed_while_the_request_runs(client, run, monkeypatch):
+    monkeypatch.setattr(idempotency, "IDEMPOTENCY_PENDING_SECONDS", 0.3)
+
+    async def slow_and_a_retry():
+        async with idempotent("k1", "POST /test", {"n": 1}) as guard:
+            await asyncio.sleep(0.6)  # Twice the lapse
+            with pytest.raises(HTTPException) as retry:
+                async with idempotent("k1", "POST /test", {"n": 1}):
+                    pass
+            await guard.store({"ok": True})
+        return retry.value.status_code
+
+    assert run(slow_and_a_retry) == 409
+    assert run(_key_row, "k1").response_body == '{"ok": true}'
+
+
+def test_lapsed_claim_never_overwrites_the_new_owner(client, run):
+    first = IdempotencyGuard("k1", "POST /test", "h")
+    second = IdempotencyGuard("k1", "POST /test", "h")
+
+    async def take_over():
+        assert await _claim(first) is None
+        async with async_session() as session:  # first's process stalled past the lapse
+            await session.execute(update(IdempotencyKey).values(expires_at=func.datetime("now", "-1 minute")))
+            await session.commit()
+        assert await _claim(second) is None
+        await first.store({"from": "first"})
+
+    run(take_over)
+    row = run(_key_row, "k1")
+    assert row.pending and row.claim_token == second.token
+
+    run(second.store, {"from": "second"})
+    assert run(_key_row, "k1").response_body == '{"from": "second"}'
@@ -0,0 +1,34 @@
+"""The KPI overview cache stays bounded whatever filters clients send."""
+
+import analytics_service
+from analytics_service import OverviewCache
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = OverviewCache(ttl_seconds=60, max_entries=3)
+    for key in "abc":
+        cache.put(key, key.upper(), cache.generation)
+    assert cache.get("a") == "A"  # Now the most recently used
+
+    for i in range(100):
+        cache.put(("from", i), i, cache.generation)
+    assert len(cache) == 3
+    assert cache.get("a") is None and cache.get(("from", 99)) == 99
+
+
+def test_expired_entries_are_dropped(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(analytics_service.time, "monotonic", lambda: now[0])
+    cache = OverviewCache(ttl_seconds=60, max_entries=10)
+    cache.put("a", 1, cache.generation)
+    now[0] += 61
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_results_from_before_an_invalidation_are_not_stored():
+    cache = OverviewCache(ttl_seconds=60, max_entries=10)
+    generation = cache.generation
+    cache.invalidate()
+    cache.put("a", 1, generation)
+    assert cache.get("a") is None
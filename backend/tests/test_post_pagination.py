@@ -0,0 +1,47 @@
+"""Keyset pagination of GET /posts."""
+
+import base64
+import json
+
+from sqlalchemy import text
+
+from database import async_session
+
+
+def _create(client, caption):
+    response = client.post("/posts", json={"platform": "instagram", "caption": caption})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_keyset_cursor_pages_through_every_post(client, run):
+    ids = {_create(client, f"post {i}")["id"] for i in range(5)}
+
+    async def without_created_at():
+        # Rows written by raw SQL can lack created_at; they sort last and must still page
+        async with async_session() as session:
+            for i in range(3):
+                await session.execute(text(
+                    f"INSERT INTO posts (id, platform, caption, status, version) "
+                    f"VALUES ('raw-{i}', 'facebook', 'raw', 'draft', 0)"
+                ))
+            await session.commit()
+
+    run(without_created_at)
+    ids |= {f"raw-{i}" for i in range(3)}
+
+    seen, cursor = [], None
+    while True:
+        response = client.get("/posts", params={"limit": 3, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200, response.text
+        seen += [p["id"] for p in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert len(seen) == len(ids) and set(seen) == ids
+    assert seen[-3:] == ["raw-2", "raw-1", "raw-0"]
+
+
+def test_invalid_cursor_is_rejected(client, run):
+    bad = base64.urlsafe_b64encode(json.dumps(["not a date", "x"]).encode()).decode()
+    assert client.get("/posts", params={"cursor": bad}).status_code == 400
@@ -0,0 +1,57 @@
+"""Caption search on the FTS5 index, kept in sync by triggers."""
+
+from sqlalchemy import text
+
+from database import engine
+
+
+def _create(client, caption, platform="instagram"):
+    response = client.post("/posts", json={"platform": platform, "caption": caption})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _search(client, q, **params):
+    response = client.get("/posts/search", params={"q": q, **params})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_matches_are_ranked_and_highlighted(client, run):
+    once = _create(client, "Autumn menu is out, with a new soup")
+    twice = _create(client, "Soup season: our soup of the day is pumpkin")
+    _create(client, "Weekend opening hours")
+
+    results = _search(client, "soup")
+    assert [r["id"] for r in results] == [twice["id"], once["id"]]
+    assert "<mark>soup</mark>" in results[0]["snippet"].lower()
+
+    assert [r["id"] for r in _search(client, "soup", platform="facebook")] == []
+    assert _search(client, '"unbalanced (quote') == []  # User input never reaches FTS5 syntax
+
+
+def test_edits_and_deletes_are_reindexed(client, run):
+    post = _create(client, "Pumpkin soup")
+    gone = _create(client, "Pumpkin pie")
+
+    client.put(f"/posts/{post['id']}", json={"caption": "Tomato soup"})
+    client.delete(f"/posts/{gone['id']}")
+    client.post("/posts/bulk", json={"operations": [{"op": "create", "platform": "facebook", "caption": "Pumpkin bread"}]})
+
+    assert [r["caption"] for r in _search(client, "pumpkin")] == ["Pumpkin bread"]
+    assert [r["id"] for r in _search(client, "tomato")] == [post["id"]]
+
+
+def test_results_survive_vacuum(client, run):
+    posts = [_create(client, f"caption number {i}") for i in range(5)]
+    for post in posts[:3]:
+        client.delete(f"/posts/{post['id']}")
+
+    async def vacuum():
+        # posts has a String primary key, so VACUUM may renumber its rowids
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.execute(text("VACUUM"))
+
+    run(vacuum)
+    assert sorted(r["id"] for r in _search(client, "caption")) == sorted(p["id"] for p in posts[3:])
@@ -0,0 +1,86 @@
+"""Post versions, the /posts/changes feed and ETags."""
+
+from sqlalchemy import delete, insert, select
+
+from database import async_session
+from db_models import Post, PostTombstone, PlatformEnum, current_posts_version
+
+
+def _create(client, caption, **fields):
+    response = client.post("/posts", json={"platform": "instagram", "caption": caption, **fields})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def _versions():
+    async with async_session() as session:
+        posts = dict((await session.execute(select(Post.id, Post.version))).all())
+        tombstones = dict((await session.execute(select(PostTombstone.post_id, PostTombstone.version))).all())
+        return posts, tombstones, await current_posts_version(session)
+
+
+def test_orm_writes_stamp_versions_and_tombstones(client, run):
+    first = _create(client, "one")
+    second = _create(client, "two")
+    assert second["version"] > first["version"]
+
+    updated = client.put(f"/posts/{first['id']}", json={"caption": "one, edited"}).json()
+    assert updated["version"] > second["version"]
+
+    assert client.delete(f"/posts/{second['id']}").status_code == 200
+    posts, tombstones, current = run(_versions)
+    assert tombstones[second["id"]] > updated["version"]
+    assert current == tombstones[second["id"]]
+
+
+def test_core_statements_bypass_the_version_hooks(client, run):
+    async def write():
+        async with async_session() as session:
+            await session.execute(insert(Post), [{"id": "core", "platform": PlatformEnum.facebook, "caption": "x"}])
+            await session.commit()
+            await session.execute(delete(Post).where(Post.id == "core"))
+            await session.commit()
+
+    _, _, before = run(_versions)
+    run(write)
+    _, tombstones, after = run(_versions)
+    # Neither the insert nor the delete went through the hooks: no version, no tombstone
+    assert after == before
+    assert "core" not in tombstones
+
+
+def test_changes_feed(client, run):
+    base = client.get("/posts/changes").json()["version"]
+    kept = _create(client, "kept")
+    gone = _create(client, "gone")
+    client.delete(f"/posts/{gone['id']}")
+
+    feed = client.get("/posts/changes", params={"since": base}).json()
+    assert not feed["reset"] and not feed["has_more"]
+    assert [p["id"] for p in feed["changes"]] == [kept["id"]]
+    assert feed["deleted"] == [gone["id"]]
+
+    # Paging by version never skips a change
+    page = client.get("/posts/changes", params={"since": base, "limit": 1}).json()
+    assert page["has_more"]
+    rest = client.get("/posts/changes", params={"since": page["version"]}).json()
+    seen = [p["id"] for p in page["changes"] + rest["changes"]] + page["deleted"] + rest["deleted"]
+    assert sorted(seen) == sorted([kept["id"], gone["id"]])
+
+    assert client.get("/posts/changes", params={"since": feed["version"]}).json()["changes"] == []
+
+
+def test_etag_revalidates_until_a_post_changes(client, run):
+    post = _create(client, "cached")
+    first = client.get("/posts")
+    etag = first.headers["ETag"]
+    assert etag.startswith('W/"')
+
+    assert client.get("/posts", headers={"If-None-Match": etag}).status_code == 304
+    # Different query, different tag
+    assert client.get("/posts", params={"status": "draft"}).headers["ETag"] != etag
+
+    client.put(f"/posts/{post['id']}", json={"caption": "changed"})
+    refreshed = client.get("/posts", headers={"If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert refreshed.headers["ETag"] != etag
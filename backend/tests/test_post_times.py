@@ -0,0 +1,81 @@
+"""UTC post times: calendar day buckets and the one-time conversion of local-time rows."""
+
+import os
+import time
+from datetime import datetime
+
+import pytest
+from sqlalchemy import delete, insert, select
+
+from database import POST_TIMES_UTC, _upgrade_schema, async_session, engine
+from db_models import Post, PlatformEnum, SyncCounter
+
+
+def _create(client, scheduled_time):
+    response = client.post("/posts", json={"platform": "facebook", "caption": "c", "scheduled_time": scheduled_time})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_offsets_are_stored_and_served_as_utc(client, run):
+    post = _create(client, "2026-10-21T01:00:00+02:00")
+    assert post["scheduled_time"] == "2026-10-20T23:00:00+00:00"
+    assert client.get(f"/posts/{post['id']}").json()["scheduled_time"] == "2026-10-20T23:00:00+00:00"
+
+
+@pytest.mark.parametrize("tz_offset, day", [(0, "2026-10-21"), (-300, "2026-10-20"), (120, "2026-10-21")])
+def test_calendar_buckets_days_in_the_viewer_timezone(client, run, tz_offset, day):
+    _create(client, "2026-10-21T03:00:00Z")
+    response = client.get("/posts/calendar", params={
+        "from": "2026-10-19T00:00:00Z", "to": "2026-10-23T00:00:00Z", "tz_offset": tz_offset,
+    })
+    assert response.status_code == 200, response.text
+    assert [d["date"] for d in response.json()["days"]] == [day]
+
+
+@pytest.fixture
+def new_york():
+    previous = os.environ.get("TZ")
+    os.environ["TZ"] = "America/New_York"
+    time.tzset()
+    yield
+    if previous is None:
+        del os.environ["TZ"]
+    else:
+        os.environ["TZ"] = previous
+    time.tzset()
+
+
+def test_local_post_times_are_converted_once(client, run, new_york):
+    async def legacy_rows():
+        async with engine.begin() as conn:
+            await conn.execute(delete(SyncCounter).where(SyncCounter.name == POST_TIMES_UTC))
+            await conn.execute(insert(Post), [
+                {"id": "winter", "platform": PlatformEnum.facebook, "caption": "c", "version": 1,
+                 "scheduled_time": datetime(2026, 1, 15, 9), "published_time": datetime(2026, 1, 15, 9, 1)},
+                {"id": "summer", "platform": PlatformEnum.facebook, "caption": "c", "version": 1,
+                 "scheduled_time": datetime(2026, 7, 15, 9), "published_time": None},
+                {"id": "draft", "platform": PlatformEnum.facebook, "caption": "c", "version": 1,
+                 "scheduled_time": None, "published_time": None},
+            ])
+
+    async def upgrade():
+        async with engine.begin() as conn:
+            await conn.run_sync(_upgrade_schema)
+
+    async def times():
+        async with async_session() as session:
+            rows = await session.execute(select(Post.id, Post.scheduled_time, Post.published_time, Post.version))
+            return {row.id: tuple(row[1:]) for row in rows}
+
+    run(legacy_rows)
+    run(upgrade)
+    converted = run(times)
+    assert converted == {
+        "winter": (datetime(2026, 1, 15, 14), datetime(2026, 1, 15, 14, 1), 1),  # EST, UTC-5
+        "summer": (datetime(2026, 7, 15, 13), None, 1),  # EDT, UTC-4
+        "draft": (None, None, 1),
+    }
+
+    run(upgrade)
+    assert run(times) == converted
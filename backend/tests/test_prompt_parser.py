@@ -0,0 +1,53 @@
+from datetime import datetime
+
+import pytest
+
+from prompt_parser import FAST_PATH_THRESHOLD, fast_parse
+
+NOW = datetime(2026, 10, 19, 8, 0)  # A Monday
+
+
+@pytest.mark.parametrize("prompt", [
+    # Two day words: the topic's "sunday" vs the schedule's "tomorrow"
+    "tips for sunday brunch on instagram tomorrow at 10am",
+    "Post on instagram about monday motivation, publish friday at 9am",
+    # Day word that belongs to the topic
+    "tips for sunday brunch on instagram at 10am",
+    # Hour without am/pm
+    "post about coffee on instagram at 7",
+    # Two clock times: one is part of the topic, or each platform has its own
+    "post about the 5pm webinar on Facebook tomorrow at 9am",
+    "post about our sale on instagram tomorrow at 9am and on facebook at 10am",
+    # Times already past would publish immediately
+    "post about our sale on instagram today at 6am",
+    "post about our sale on instagram on 2020-01-01 at 9am",
+])
+def test_ambiguous_prompts_fall_back_to_llm(prompt):
+    assert fast_parse(prompt, NOW)["confidence"] < FAST_PATH_THRESHOLD
+
+
+def test_platform_inside_topic_is_not_a_target():
+    parsed = fast_parse("Write a post about IG growth tips on Facebook", NOW)
+    assert parsed["platforms"] == ["Facebook"]
+    assert parsed["topic"] == "IG growth tips"
+
+
+def test_chained_platforms():
+    parsed = fast_parse("Share our new menu on instagram, facebook and linkedin on friday at 6pm", NOW)
+    assert parsed["platforms"] == ["Instagram", "Facebook", "LinkedIn"]
+    assert parsed["schedule_time"] == "2026-10-23T18:00:00"
+    assert parsed["confidence"] >= FAST_PATH_THRESHOLD
+
+
+@pytest.mark.parametrize("prompt, platforms, schedule_time, topic", [
+    ("post about our sale on Instagram and Facebook tomorrow 9am",
+     ["Instagram", "Facebook"], "2026-10-20T09:00:00", "our sale"),
+    ("post about our summer sale to FB at 18:00",
+     ["Facebook"], "2026-10-19T18:00:00", "our summer sale"),
+])
+def test_unambiguous_prompts_take_fast_path(prompt, platforms, schedule_time, topic):
+    parsed = fast_parse(prompt, NOW)
+    assert parsed["confidence"] >= FAST_PATH_THRESHOLD
+    assert parsed["platforms"] == platforms
+    assert parsed["schedule_time"] == schedule_time
+    assert parsed["topic"] == topic
@@ -0,0 +1,342 @@
+"""
+Lightweight span tracing for HTTP endpoints, LangGraph nodes, upstream calls and DB sessions.
+
+Every span carries the same attribute keys (platform, node, upstream, status) so traces
+from different layers can be compared. Finished traces are summarised per endpoint in
+memory and can optionally be exported:
+
+    TRACE_EXPORTER=json   -> JSON lines appended to TRACE_JSON_PATH (default: traces.jsonl)
+    TRACE_EXPORTER=otlp   -> OTLP/HTTP JSON posted to OTEL_EXPORTER_OTLP_ENDPOINT
+                             (default: http://localhost:4318)
+"""
+
+import os
+import json
+import time
+import queue
+import logging
+import secrets
+import threading
+import functools
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "autopost-backend")
+MAX_PENDING_TRACES = 5000
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+@dataclass
+class Span:
+    name: str
+    kind: str  # "http", "node", "upstream", "db", "job"
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_ns: int
+    end_ns: Optional[int] = None
+    attributes: dict = field(default_factory=dict)
+
+    def set(self, **attributes):
+        """Attach attributes (None values are dropped)."""
+        self.attributes.update({k: v for k, v in attributes.items() if v is not None})
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns or time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    @property
+    def failed(self) -> bool:
+        status = self.attributes.get("status")
+        if isinstance(status, int):
+            return status >= 400
+        return status == "error"
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+        }
+
+
+# ---------- Exporters ----------
+
+class JsonFileExporter:
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: list[Span]):
+        with open(self.path, "a", encoding="utf-8") as f:
+            for s in spans:
+                f.write(json.dumps(s.to_dict(), default=str) + "\n")
+
+
+class OtlpHttpExporter:
+    """Posts spans to an OTLP/HTTP collector using the JSON encoding (no SDK needed)."""
+
+    def __init__(self, endpoint: str):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+
+    @staticmethod
+    def _attr(key, value) -> dict:
+        if isinstance(value, bool):
+            return {"key": key, "value": {"boolValue": value}}
+        if isinstance(value, int):
+            return {"key": key, "value": {"intValue": str(value)}}
+        if isinstance(value, float):
+            return {"key": key, "value": {"doubleValue": value}}
+        return {"key": key, "value": {"stringValue": str(value)}}
+
+    def export(self, spans: list[Span]):
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [self._attr("service.name", SERVICE_NAME)]},
+                "scopeSpans": [{
+                    "scope": {"name": "autopost.tracing"},
+                    "spans": [{
+                        "traceId": s.trace_id,
+                        "spanId": s.span_id,
+                        "parentSpanId": s.parent_id or "",
+                        "name": s.name,
+                        "kind": 2 if s.kind == "http" else 3 if s.kind == "upstream" else 1,
+                        "startTimeUnixNano": str(s.start_ns),
+                        "endTimeUnixNano": str(s.end_ns),
+                        "attributes": [self._attr("span.kind", s.kind)]
+                                      + [self._attr(k, v) for k, v in s.attributes.items()],
+                        "status": {"code": 2 if s.failed else 1},
+                    } for s in spans],
+                }],
+            }],
+        }
+        requests.post(self.url, json=payload, timeout=5)
+
+
+class _BackgroundExport:
+    """Ships finished spans from a daemon thread so exporting never blocks the event loop."""
+
+    def __init__(self, exporter, flush_interval: float = 2.0, max_batch: int = 512):
+        self.exporter = exporter
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._queue: queue.Queue = queue.Queue(maxsize=10_000)
+        threading.Thread(target=self._run, name="trace-exporter", daemon=True).start()
+
+    def submit(self, spans: list[Span]):
+        for s in spans:
+            try:
+                self._queue.put_nowait(s)
+            except queue.Full:
+                return  # Drop rather than slow down requests
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self.exporter.export(batch)
+            except Exception as e:
+                logger.warning(f"Tracing: Export of {len(batch)} spans failed: {e}")
+
+
+def _exporter_from_env() -> Optional[_BackgroundExport]:
+    kind = os.getenv("TRACE_EXPORTER", "").lower()
+    if kind == "json":
+        path = os.getenv("TRACE_JSON_PATH", os.path.join(os.path.dirname(__file__), "traces.jsonl"))
+        return _BackgroundExport(JsonFileExporter(path))
+    if kind == "otlp":
+        return _BackgroundExport(OtlpHttpExporter(os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318")))
+    return None
+
+
+# ---------- Tracer ----------
+
+class Tracer:
+    """Creates spans, groups them into traces and keeps a per-endpoint latency summary."""
+
+    def __init__(self, exporter: Optional[_BackgroundExport] = None, recent: int = 200):
+        self._lock = threading.Lock()
+        self._pending: dict[str, list[Span]] = {}
+        self._finished_roots: dict[str, str] = {}  # trace_id -> endpoint, for late children
+        self._summary: dict[str, dict] = {}
+        self._recent: deque = deque(maxlen=recent)
+        self._listeners: list[Callable[[Span], None]] = []
+        self.exporter = exporter
+
+    def add_listener(self, fn: Callable[[Span], None]):
+        """Call `fn(span)` for every finished span."""
+        self._listeners.append(fn)
+
+    def start_span(self, name: str, kind: str, activate: bool = True, **attributes):
+        """Open a span under the current one. Returns (span, token); pass both to end_span."""
+        parent = _current_span.get()
+        s = Span(
+            name=name,
+            kind=kind,
+            trace_id=parent.trace_id if parent else secrets.token_hex(16),
+            span_id=secrets.token_hex(8),
+            parent_id=parent.span_id if parent else None,
+            start_ns=time.time_ns(),
+        )
+        s.set(**attributes)
+        token = _current_span.set(s) if activate else None
+        return s, token
+
+    def end_span(self, s: Span, token=None):
+        s.end_ns = time.time_ns()
+        s.attributes.setdefault("status", "ok")
+        if token is not None:
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                _current_span.set(None)  # Ended from a different context
+
+        for fn in self._listeners:
+            try:
+                fn(s)
+            except Exception as e:
+                logger.debug(f"Tracing: Span listener failed: {e}")
+
+        with self._lock:
+            late_endpoint = self._finished_roots.get(s.trace_id)
+            if s.parent_id is not None and late_endpoint is not None:
+                # Outlived its root (e.g. a DB session closed after the response was sent)
+                self._add_breakdown(self._summary[late_endpoint], s)
+                finished = [s]
+            else:
+                trace = self._pending.setdefault(s.trace_id, [])
+                trace.append(s)
+                if s.parent_id is not None:
+                    if len(self._pending) > MAX_PENDING_TRACES:
+                        self._pending.pop(next(iter(self._pending)))
+                    return
+                finished = self._pending.pop(s.trace_id)
+                self._summarise(s, finished)
+                self._recent.append([x.to_dict() for x in finished])
+                self._finished_roots[s.trace_id] = s.attributes.get("endpoint", s.name)
+                if len(self._finished_roots) > MAX_PENDING_TRACES:
+                    self._finished_roots.pop(next(iter(self._finished_roots)))
+        if self.exporter:
+            self.exporter.submit(finished)
+
+    @contextmanager
+    def span(self, name: str, kind: str, activate: bool = True, **attributes):
+        s, token = self.start_span(name, kind, activate=activate, **attributes)
+        try:
+            yield s
+        except BaseException:
+            s.set(status="error")
+            raise
+        finally:
+            self.end_span(s, token)
+
+    def _summarise(self, root: Span, spans: list[Span]):
+        endpoint = root.attributes.get("endpoint", root.name)
+        entry = self._summary.setdefault(endpoint, {
+            "count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0, "breakdown": {},
+        })
+        entry["count"] += 1
+        entry["errors"] += int(root.failed)
+        entry["total_ms"] += root.duration_ms
+        entry["max_ms"] = max(entry["max_ms"], root.duration_ms)
+        for s in spans:
+            if s is not root:
+                self._add_breakdown(entry, s)
+
+    @staticmethod
+    def _add_breakdown(entry: dict, s: Span):
+        label = s.attributes.get("node") or s.attributes.get("upstream") or s.name
+        part = entry["breakdown"].setdefault(f"{s.kind}:{label}", {"count": 0, "errors": 0, "total_ms": 0.0})
+        part["count"] += 1
+        part["errors"] += int(s.failed)
+        part["total_ms"] += s.duration_ms
+
+    def summary(self) -> dict:
+        """Per-endpoint totals with a breakdown by node / upstream / db span."""
+        with self._lock:
+            out = {}
+            for endpoint, e in self._summary.items():
+                out[endpoint] = {
+                    "count": e["count"],
+                    "errors": e["errors"],
+                    "avg_ms": round(e["total_ms"] / e["count"], 2),
+                    "max_ms": round(e["max_ms"], 2),
+                    "breakdown": {
+                        k: {
+                            "count": p["count"],
+                            "errors": p["errors"],
+                            "avg_ms": round(p["total_ms"] / p["count"], 2),
+                            "total_ms": round(p["total_ms"], 2),
+                        }
+                        for k, p in sorted(e["breakdown"].items(), key=lambda kv: -kv[1]["total_ms"])
+                    },
+                }
+            return out
+
+    def recent(self, limit: int = 20) -> list:
+        with self._lock:
+            return list(self._recent)[-limit:]
+
+    def reset(self):
+        with self._lock:
+            self._summary.clear()
+            self._recent.clear()
+            self._finished_roots.clear()
+
+
+tracer = Tracer(exporter=_exporter_from_env())
+span = tracer.span
+
+
+# ---------- Helpers ----------
+
+def traced_node(node: str):
+    """Decorator for LangGraph nodes: one span per node run, tagged with the state's platforms."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(state, *args, **kwargs):
+            platforms = state.get("platforms") if isinstance(state, dict) else None
+            with span(f"node.{node}", kind="node", node=node,
+                      platform=",".join(platforms) if platforms else None):
+                return fn(state, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def traced_request(method: str, url: str, upstream: str, platform: Optional[str] = None, **kwargs) -> requests.Response:
+    """`requests.request` wrapped in an upstream span; status is the HTTP status code."""
+    with span(f"{upstream}.{method.lower()}", kind="upstream", upstream=upstream, platform=platform) as s:
+        resp = requests.request(method, url, **kwargs)
+        s.set(status=resp.status_code)
+        return resp
+
+
+async def traced_async_request(client, method: str, url: str, upstream: str, platform: Optional[str] = None, **kwargs):
+    """Same as traced_request, for an `httpx.AsyncClient`."""
+    with span(f"{upstream}.{method.lower()}", kind="upstream", upstream=upstream, platform=platform) as s:
+        resp = await client.request(method, url, **kwargs)
+        s.set(status=resp.status_code)
+        return resp
@@ -1,6 +1,7 @@
 import React, { useEffect } from 'react';
 import { Routes, Route, NavLink, useLocation } from 'react-router-dom';
 import { useWorkflowStore } from './store';
+import { subscribeToEvents } from './events';
 import PromptStep from './components/PromptStep';
 import CaptionReview from './components/CaptionReview';
 import ImageReview from './components/ImageReview';
@@ -72,6 +73,12 @@ const WorkflowPage: React.FC = () => {
 
     useEffect(() => {
         fetchState();
+        // Later state changes arrive as pushed events instead of re-polling /workflow/state
+        return subscribeToEvents((event) => {
+            if (event.type === 'workflow.state') {
+                useWorkflowStore.setState(event.data.state);
+            }
+        });
     }, []);
 
     const renderStep = () => {
@@ -1,11 +1,22 @@
-import React, { useState } from 'react';
+import React, { useEffect, useState } from 'react';
 import { useWorkflowStore } from '../store';
-import { Calendar, ArrowRight, Loader2 } from 'lucide-react';
+import { useAnalyticsStore } from '../stores/analyticsStore';
+import { Calendar, ArrowRight, Loader2, Sparkles } from 'lucide-react';
 
 const ScheduleStep: React.FC = () => {
-    const { schedule, isLoading, error, schedule_time } = useWorkflowStore();
+    const { schedule, isLoading, error, schedule_time, platforms } = useWorkflowStore();
+    const { bestTimes, fetchBestTimes } = useAnalyticsStore();
     const [date, setDate] = useState(schedule_time || "");
 
+    useEffect(() => {
+        fetchBestTimes();
+    }, [fetchBestTimes]);
+
+    // Only platforms this post goes to, and only slots backed by some history
+    const suggestions = platforms
+        .map(p => [p, bestTimes[p.toLowerCase()]] as const)
+        .filter(([, best]) => best && best.posts > 0);
+
     const handleSubmit = async (e: React.FormEvent) => {
         e.preventDefault();
         if (!date) return;
@@ -42,6 +53,31 @@ const ScheduleStep: React.FC = () => {
                             />
                         </div>
 
+                        {suggestions.length > 0 && (
+                            <div className="space-y-3">
+                                <label className="text-xs font-bold uppercase tracking-[0.3em] text-gray-500 ml-1 flex items-center gap-2">
+                                    <Sparkles size={12} /> Suggested Slots
+                                </label>
+                                {suggestions.map(([platform, best]) => (
+                                    <div key={platform} className="flex flex-wrap items-center gap-2">
+                                        <span className="text-gray-400 text-xs font-bold w-24">{platform}</span>
+                                        {best.slots.map(slot => (
+                                            <button
+                                                key={slot.next}
+                                                type="button"
+                                                onClick={() => setDate(slot.next)}
+                                                title={`~${slot.expected_engagement_rate}% engagement (baseline ${best.baseline_engagement_rate}%), ${slot.posts} posts, confidence ${Math.round(slot.confidence * 100)}%`}
+                                                className={`px-3 py-1.5 rounded-lg border text-xs font-mono transition-colors ${date === slot.next ? 'border-brand/60 bg-brand/10 text-white' : 'border-pixora-border/50 text-gray-400 hover:border-brand/30'}`}
+                                            >
+                                                {slot.weekday.slice(0, 3)} {String(slot.hour).padStart(2, '0')}:00
+                                                <span className="ml-2 text-gray-500">{slot.expected_engagement_rate}%</span>
+                                            </button>
+                                        ))}
+                                    </div>
+                                ))}
+                            </div>
+                        )}
+
                         {error && (
                             <div className="p-4 bg-red-500/10 border border-red-500/20 text-red-400 rounded-xl text-sm animate-pulse">
                                 {error}
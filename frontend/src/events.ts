@@ -0,0 +1,39 @@
+const API_URL = 'http://localhost:8000';
+
+export interface ServerEvent {
+    type: string;
+    data: Record<string, any>;
+    ts: number;
+}
+
+type Listener = (event: ServerEvent) => void;
+
+// One shared EventSource for the whole app; opened on first subscribe, closed on last unsubscribe.
+// EventSource reconnects by itself, so a restarted backend resumes pushing without polling.
+let source: EventSource | null = null;
+const listeners = new Set<Listener>();
+
+const EVENT_TYPES = [
+    'post.created', 'post.updated', 'post.deleted', 'post.published', 'post.failed',
+    'posts.changed', 'workflow.state', 'workflow.platform_published',
+];
+
+export const subscribeToEvents = (listener: Listener): (() => void) => {
+    listeners.add(listener);
+    if (!source) {
+        source = new EventSource(`${API_URL}/events`);
+        EVENT_TYPES.forEach(type => {
+            source!.addEventListener(type, (msg) => {
+                const event: ServerEvent = JSON.parse((msg as MessageEvent).data);
+                listeners.forEach(l => l(event));
+            });
+        });
+    }
+    return () => {
+        listeners.delete(listener);
+        if (listeners.size === 0 && source) {
+            source.close();
+            source = null;
+        }
+    };
+};
@@ -3,6 +3,7 @@ import FullCalendar from '@fullcalendar/react';
 import dayGridPlugin from '@fullcalendar/daygrid';
 import interactionPlugin from '@fullcalendar/interaction';
 import { useCalendarStore, CalendarPost } from '../stores/calendarStore';
+import { subscribeToEvents } from '../events';
 import { Calendar, X, Instagram, Facebook, Clock, CheckCircle, AlertTriangle, FileText } from 'lucide-react';
 
 const statusColors: Record<string, { bg: string; border: string; text: string }> = {
@@ -20,33 +21,42 @@ const statusIcons: Record<string, React.ReactNode> = {
 };
 
 const CalendarPage: React.FC = () => {
-    const { posts, isLoading, error, fetchPosts } = useCalendarStore();
+    const { days, totals, selectedDay, dayPosts, isLoading, error, fetchCalendar, openDay, syncChanges } = useCalendarStore();
     const [selectedPost, setSelectedPost] = useState<CalendarPost | null>(null);
 
-    useEffect(() => {
-        fetchPosts();
-    }, []);
+    // Server pushes post changes (scheduler publishes, edits elsewhere); refresh counts and the open day
+    useEffect(() => subscribeToEvents((event) => {
+        if (event.type.startsWith('post')) syncChanges();
+    }), []);
 
-    // Map posts to FullCalendar events
-    const events = posts
-        .filter(p => p.scheduled_time || p.published_time)
-        .map(p => {
-            const colors = statusColors[p.status] || statusColors.draft;
-            const platformEmoji = p.platform === 'instagram' ? '📸' : '📘';
+    // FullCalendar reports the visible window (including leading/trailing days);
+    // datesSet fires on first render and on every month change.
+    const handleDatesSet = (info: { start: Date; end: Date }) => {
+        fetchCalendar({ from: info.start.toISOString(), to: info.end.toISOString() });
+    };
+
+    // One badge per day and status, from the per-day counts
+    const events = days.flatMap(day =>
+        Object.entries(day.statuses).map(([status, count]) => {
+            const colors = statusColors[status] || statusColors.draft;
             return {
-                id: p.id,
-                title: `${platformEmoji} ${p.caption.substring(0, 35)}${p.caption.length > 35 ? '...' : ''}`,
-                start: p.scheduled_time || p.published_time || p.created_at,
+                id: `${day.date}-${status}`,
+                title: `${count} ${status}`,
+                start: day.date,
+                allDay: true,
                 backgroundColor: colors.bg,
                 borderColor: colors.border,
                 textColor: colors.text,
-                extendedProps: { post: p },
             };
-        });
+        })
+    );
 
     const handleEventClick = (info: any) => {
-        const post = info.event.extendedProps.post as CalendarPost;
-        setSelectedPost(post);
+        openDay(info.event.startStr.slice(0, 10));
+    };
+
+    const handleDateClick = (info: { dateStr: string }) => {
+        openDay(info.dateStr.slice(0, 10));
     };
 
     const formatDate = (isoDate: string | null) => {
@@ -76,7 +86,7 @@ const CalendarPage: React.FC = () => {
                 {/* Post counts */}
                 <div className="flex gap-4">
                     {Object.entries(statusColors).map(([status, colors]) => {
-                        const count = posts.filter(p => p.status === status).length;
+                        const count = totals?.statuses[status] ?? 0;
                         if (count === 0) return null;
                         return (
                             <div key={status} className="flex items-center gap-2 px-3 py-1.5 rounded-xl border bg-pixora-darker-green/30" style={{ borderColor: colors.border + '40' }}>
@@ -100,20 +110,22 @@ const CalendarPage: React.FC = () => {
                     plugins={[dayGridPlugin, interactionPlugin]}
                     initialView="dayGridMonth"
                     events={events}
+                    datesSet={handleDatesSet}
                     editable={false}
                     eventClick={handleEventClick}
+                    dateClick={handleDateClick}
                     headerToolbar={{
                         left: 'prev,next today',
                         center: 'title',
                         right: 'dayGridMonth',
                     }}
                     height="auto"
-                    dayMaxEvents={3}
+                    dayMaxEvents={4}
                 />
             </div>
 
             {/* Empty state */}
-            {!isLoading && posts.length === 0 && (
+            {!isLoading && totals?.total === 0 && (
                 <div className="mt-8 glass-card p-12 text-center border-dashed">
                     <Calendar size={48} className="text-gray-700 mx-auto mb-4" />
                     <h3 className="text-white font-bold text-lg mb-2">No Posts Yet</h3>
@@ -123,6 +135,46 @@ const CalendarPage: React.FC = () => {
                 </div>
             )}
 
+            {/* Day Modal: posts of the opened day, loaded on demand */}
+            {selectedDay && !selectedPost && (
+                <div className="fixed inset-0 z-50 flex items-center justify-center bg-black/60 backdrop-blur-sm" onClick={() => openDay(null)}>
+                    <div className="glass-card p-8 w-full max-w-lg relative animate-in fade-in zoom-in duration-300" onClick={e => e.stopPropagation()}>
+                        <button
+                            onClick={() => openDay(null)}
+                            className="absolute top-4 right-4 text-gray-500 hover:text-white transition-colors"
+                        >
+                            <X size={20} />
+                        </button>
+
+                        <h3 className="text-xl font-bold text-white mb-6">
+                            {new Date(`${selectedDay}T00:00:00`).toLocaleDateString('en-US', { weekday: 'long', month: 'short', day: 'numeric', year: 'numeric' })}
+                        </h3>
+
+                        {dayPosts.length === 0 && (
+                            <p className="text-gray-500 text-sm">No posts on this day.</p>
+                        )}
+
+                        <div className="space-y-3 max-h-96 overflow-y-auto">
+                            {dayPosts.map(p => {
+                                const colors = statusColors[p.status] || statusColors.draft;
+                                return (
+                                    <button
+                                        key={p.id}
+                                        onClick={() => setSelectedPost(p)}
+                                        className="w-full text-left flex items-center gap-3 p-3 rounded-xl border bg-pixora-darker-green/30 hover:bg-pixora-darker-green/60 transition-colors"
+                                        style={{ borderColor: colors.border + '40' }}
+                                    >
+                                        {p.platform === 'instagram' ? <Instagram size={16} className="text-pink-400 shrink-0" /> : <Facebook size={16} className="text-blue-400 shrink-0" />}
+                                        <span className="text-gray-300 text-sm truncate flex-1">{p.caption || 'No caption'}</span>
+                                        <span className="text-[10px] font-bold uppercase tracking-widest shrink-0" style={{ color: colors.text }}>{p.status}</span>
+                                    </button>
+                                );
+                            })}
+                        </div>
+                    </div>
+                </div>
+            )}
+
             {/* Detail Modal (read-only) */}
             {selectedPost && (
                 <div className="fixed inset-0 z-50 flex items-center justify-center bg-black/60 backdrop-blur-sm" onClick={() => setSelectedPost(null)}>
@@ -40,7 +40,7 @@ const customTooltipStyle = {
 
 const DashboardPage: React.FC = () => {
     const {
-        overview, postAnalytics, timeseries, platformInsights,
+        overview, postAnalytics, timeseries, platformInsights, refreshJob,
         isLoading, error,
         fetchOverview, fetchPostAnalytics, fetchTimeseries, refreshData
     } = useAnalyticsStore();
@@ -59,7 +59,7 @@ const DashboardPage: React.FC = () => {
 
     // Prepare chart data
     const chartData = timeseries.map(t => ({
-        date: t.fetched_at ? new Date(t.fetched_at).toLocaleDateString('en-US', { month: 'short', day: 'numeric' }) : '',
+        date: new Date(t.time).toLocaleDateString('en-US', { month: 'short', day: 'numeric' }),
         impressions: t.impressions,
         reach: t.reach,
         engagement: t.engagement,
@@ -96,7 +96,11 @@ const DashboardPage: React.FC = () => {
                     className="pixora-btn-secondary flex items-center gap-2"
                 >
                     {isLoading ? <Loader2 className="animate-spin" size={18} /> : <RefreshCw size={18} />}
-                    <span>REFRESH</span>
+                    <span>
+                        {refreshJob?.status === 'running' && refreshJob.total
+                            ? `${refreshJob.done + refreshJob.failed}/${refreshJob.total}`
+                            : 'REFRESH'}
+                    </span>
                 </button>
             </div>
 
@@ -119,19 +123,19 @@ const DashboardPage: React.FC = () => {
                             <div className="flex justify-between text-xs">
                                 <span className="text-gray-400">Total Likes</span>
                                 <span className="text-white font-mono">
-                                    {postAnalytics.filter(p => p.post?.platform === 'facebook').reduce((acc, p) => acc + (p.likes || 0), 0).toLocaleString()}
+                                    {(overview?.platforms?.facebook?.total_likes ?? 0).toLocaleString()}
                                 </span>
                             </div>
                             <div className="flex justify-between text-xs">
                                 <span className="text-gray-400">Total Comments</span>
                                 <span className="text-white font-mono">
-                                    {postAnalytics.filter(p => p.post?.platform === 'facebook').reduce((acc, p) => acc + (p.comments || 0), 0).toLocaleString()}
+                                    {(overview?.platforms?.facebook?.total_comments ?? 0).toLocaleString()}
                                 </span>
                             </div>
                             <div className="flex justify-between text-xs">
                                 <span className="text-gray-400">Total Engagement</span>
                                 <span className="text-white font-mono">
-                                    {postAnalytics.filter(p => p.post?.platform === 'facebook').reduce((acc, p) => acc + (p.engagement || 0), 0).toLocaleString()}
+                                    {(overview?.platforms?.facebook?.total_engagement ?? 0).toLocaleString()}
                                 </span>
                             </div>
                         </div>
@@ -145,19 +149,19 @@ const DashboardPage: React.FC = () => {
                             <div className="flex justify-between text-xs">
                                 <span className="text-gray-400">Total Likes</span>
                                 <span className="text-white font-mono">
-                                    {postAnalytics.filter(p => p.post?.platform === 'instagram').reduce((acc, p) => acc + (p.likes || 0), 0).toLocaleString()}
+                                    {(overview?.platforms?.instagram?.total_likes ?? 0).toLocaleString()}
                                 </span>
                             </div>
                             <div className="flex justify-between text-xs">
                                 <span className="text-gray-400">Total Comments</span>
                                 <span className="text-white font-mono">
-                                    {postAnalytics.filter(p => p.post?.platform === 'instagram').reduce((acc, p) => acc + (p.comments || 0), 0).toLocaleString()}
+                                    {(overview?.platforms?.instagram?.total_comments ?? 0).toLocaleString()}
                                 </span>
                             </div>
                             <div className="flex justify-between text-xs">
                                 <span className="text-gray-400">Total Engagement</span>
                                 <span className="text-white font-mono">
-                                    {postAnalytics.filter(p => p.post?.platform === 'instagram').reduce((acc, p) => acc + (p.engagement || 0), 0).toLocaleString()}
+                                    {(overview?.platforms?.instagram?.total_engagement ?? 0).toLocaleString()}
                                 </span>
                             </div>
                         </div>
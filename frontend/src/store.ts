@@ -15,6 +15,7 @@ interface WorkflowState {
     current_step: string;
     isLoading: boolean;
     error: string | null;
+    runId: string; // Per-workflow Idempotency-Key prefix so retries/double-clicks don't repost
 
     // Actions
     startWorkflow: (prompt: string) => Promise<void>;
@@ -46,6 +47,7 @@ export const useWorkflowStore = create<WorkflowState>((set) => ({
     current_step: "prompt",
     isLoading: false,
     error: null,
+    runId: crypto.randomUUID(),
     generatingPlatforms: {},
     isGeneratingImage: false,
 
@@ -83,7 +85,7 @@ export const useWorkflowStore = create<WorkflowState>((set) => ({
     },
 
     startWorkflow: async (prompt: string) => {
-        set({ isLoading: true, error: null });
+        set({ isLoading: true, error: null, runId: crypto.randomUUID() });
         try {
             const res = await axios.post(`${API_URL}/workflow/start`, { prompt });
             set({ ...res.data, isLoading: false });
@@ -133,7 +135,10 @@ export const useWorkflowStore = create<WorkflowState>((set) => ({
     schedule: async (time: string) => {
         set({ isLoading: true, error: null });
         try {
-            const res = await axios.post(`${API_URL}/workflow/schedule`, { schedule_time: time });
+            const { runId } = useWorkflowStore.getState();
+            const res = await axios.post(`${API_URL}/workflow/schedule`, { schedule_time: time }, {
+                headers: { 'Idempotency-Key': `${runId}:schedule:${time}` }
+            });
             set({ ...res.data, isLoading: false });
         } catch (err: any) {
             set({ error: err.message, isLoading: false });
@@ -143,7 +148,10 @@ export const useWorkflowStore = create<WorkflowState>((set) => ({
     publish: async () => {
         set({ isLoading: true, error: null });
         try {
-            const res = await axios.post(`${API_URL}/workflow/publish`);
+            const { runId } = useWorkflowStore.getState();
+            const res = await axios.post(`${API_URL}/workflow/publish`, null, {
+                headers: { 'Idempotency-Key': `${runId}:publish` }
+            });
             set({ ...res.data, isLoading: false });
         } catch (err: any) {
             set({ error: err.message, isLoading: false });
@@ -2,12 +2,24 @@ import { create } from 'zustand';
 import axios from 'axios';
 
 const API_URL = 'http://localhost:8000';
+const REFRESH_POLL_MS = 1000;
+
+interface PlatformKPIs {
+    total_reach: number;
+    total_impressions: number;
+    avg_engagement_rate: number;
+    total_posts_tracked: number;
+    total_likes: number;
+    total_comments: number;
+    total_engagement: number;
+}
 
 interface AnalyticsOverview {
     total_reach: number;
     total_impressions: number;
     avg_engagement_rate: number;
     total_posts_tracked: number;
+    platforms: Record<string, PlatformKPIs>;
 }
 
 interface AnalyticsEntry {
@@ -31,23 +43,88 @@ interface AnalyticsEntry {
     };
 }
 
+export interface TimeseriesPoint {
+    time: string; // Bucket start (UTC)
+    reach: number;
+    impressions: number;
+    likes: number;
+    comments: number;
+    engagement: number;
+    posts?: number; // Posts the totals cover, unsampled ones at their last reading (rollup levels only)
+    sampled?: number; // Posts read in the bucket (rollup levels only)
+    // Min/max over the stretch a downsampled point stands for
+    reach_min?: number;
+    reach_max?: number;
+    impressions_min?: number;
+    impressions_max?: number;
+    engagement_min?: number;
+    engagement_max?: number;
+}
+
+export interface TimeseriesQuery {
+    bucket?: 'auto' | 'raw' | 'hour' | 'day';
+    from?: string;
+    to?: string;
+    platform?: string;
+    post_id?: string;
+    points?: number; // Downsample (LTTB) to about this many points
+    metric?: 'reach' | 'impressions' | 'likes' | 'comments' | 'engagement';
+}
+
+export interface RefreshJob {
+    job_id: string;
+    status: 'running' | 'succeeded' | 'failed';
+    total: number | null;
+    done: number;
+    failed: number;
+    remaining: number | null;
+    result: { facebook: Record<string, any>; instagram: Record<string, any> } | null;
+    error: string | null;
+    attached?: boolean;
+}
+
+export interface BestTimeSlot {
+    weekday: string;
+    hour: number; // Viewer's local hour
+    expected_engagement_rate: number;
+    posts: number;
+    confidence: number; // 0..1; low means mostly the platform baseline
+    next: string; // Next local occurrence, YYYY-MM-DDTHH:mm
+}
+
+export interface PlatformBestTimes {
+    baseline_engagement_rate: number;
+    posts: number;
+    slots: BestTimeSlot[];
+}
+
 interface PlatformInsights {
     facebook: Record<string, any>;
     instagram: Record<string, any>;
     message: string;
 }
 
+export interface PostAnalyticsQuery {
+    sort?: 'fetched_at' | 'engagement_rate' | 'reach';
+    order?: 'asc' | 'desc';
+    limit?: number;
+    offset?: number;
+}
+
 interface AnalyticsState {
     overview: AnalyticsOverview | null;
     postAnalytics: AnalyticsEntry[];
-    timeseries: AnalyticsEntry[];
+    timeseries: TimeseriesPoint[];
     platformInsights: PlatformInsights | null;
+    refreshJob: RefreshJob | null; // Progress of the running/last refresh
+    bestTimes: Record<string, PlatformBestTimes>;
     isLoading: boolean;
     error: string | null;
 
     fetchOverview: () => Promise<void>;
-    fetchPostAnalytics: () => Promise<void>;
-    fetchTimeseries: () => Promise<void>;
+    fetchPostAnalytics: (query?: PostAnalyticsQuery) => Promise<void>;
+    fetchTimeseries: (query?: TimeseriesQuery) => Promise<void>;
+    fetchBestTimes: (limit?: number) => Promise<void>;
     refreshData: () => Promise<void>;
     deletePost: (postId: string) => Promise<void>;
 }
@@ -57,6 +134,8 @@ export const useAnalyticsStore = create<AnalyticsState>((set) => ({
     postAnalytics: [],
     timeseries: [],
     platformInsights: null,
+    refreshJob: null,
+    bestTimes: {},
     isLoading: false,
     error: null,
 
@@ -70,31 +149,61 @@ export const useAnalyticsStore = create<AnalyticsState>((set) => ({
         }
     },
 
-    fetchPostAnalytics: async () => {
+    // Joined, sorted and paged server-side in one query
+    fetchPostAnalytics: async (query?: PostAnalyticsQuery) => {
         set({ isLoading: true, error: null });
         try {
-            const res = await axios.get(`${API_URL}/analytics/posts`);
+            const res = await axios.get(`${API_URL}/analytics/posts`, { params: query });
             set({ postAnalytics: res.data, isLoading: false });
         } catch (err: any) {
             set({ error: err.response?.data?.detail || err.message, isLoading: false });
         }
     },
 
-    fetchTimeseries: async () => {
+    // Daily rollups by default, capped to what the chart can show; pass bucket/from/to/platform to zoom in
+    fetchTimeseries: async (query: TimeseriesQuery = { bucket: 'day', points: 500 }) => {
         set({ isLoading: true, error: null });
         try {
-            const res = await axios.get(`${API_URL}/analytics/insights`);
+            const res = await axios.get(`${API_URL}/analytics/insights`, { params: query });
             set({ timeseries: res.data, isLoading: false });
         } catch (err: any) {
             set({ error: err.response?.data?.detail || err.message, isLoading: false });
         }
     },
 
+    // Suggested slots in the viewer's local time; doesn't touch isLoading so forms stay usable
+    fetchBestTimes: async (limit = 3) => {
+        try {
+            const res = await axios.get(`${API_URL}/analytics/best-times`, {
+                params: { tz_offset: -new Date().getTimezoneOffset(), limit },
+            });
+            set({ bestTimes: res.data });
+        } catch (err: any) {
+            set({ error: err.response?.data?.detail || err.message });
+        }
+    },
+
+    // The refresh runs server-side as a background job; poll its progress until it ends.
+    // Clicking again while it runs attaches to the same job.
     refreshData: async () => {
         set({ isLoading: true, error: null });
         try {
-            const res = await axios.post(`${API_URL}/analytics/refresh`);
-            set({ platformInsights: res.data, isLoading: false });
+            let job = (await axios.post<RefreshJob>(`${API_URL}/analytics/refresh`)).data;
+            set({ refreshJob: job });
+            while (job.status === 'running') {
+                await new Promise(resolve => setTimeout(resolve, REFRESH_POLL_MS));
+                job = (await axios.get<RefreshJob>(`${API_URL}/analytics/refresh/${job.job_id}`)).data;
+                set({ refreshJob: job });
+            }
+            if (job.status === 'failed') throw new Error(job.error || 'Refresh failed');
+            set({
+                platformInsights: {
+                    facebook: job.result?.facebook ?? {},
+                    instagram: job.result?.instagram ?? {},
+                    message: `Refreshed ${job.done} posts${job.failed ? `, ${job.failed} failed` : ''}.`,
+                },
+                isLoading: false,
+            });
         } catch (err: any) {
             set({ error: err.response?.data?.detail || err.message, isLoading: false });
         }
@@ -14,14 +14,47 @@ export interface CalendarPost {
     published_time: string | null;
     created_at: string;
     updated_at: string;
+    version: number;
+}
+
+export interface DateRange {
+    from: string; // ISO 8601, inclusive
+    to: string;   // ISO 8601, exclusive
+}
+
+export interface DayCounts {
+    date: string; // YYYY-MM-DD, viewer's local day
+    total: number;
+    platforms: Record<string, number>;
+    statuses: Record<string, number>;
+}
+
+interface CalendarSummary {
+    days: DayCounts[];
+    totals: Omit<DayCounts, 'date'>;
+}
+
+interface ChangeFeed {
+    reset: boolean;
+    version: number;
+    changes: CalendarPost[];
+    deleted: string[];
+    has_more: boolean;
 }
 
 interface CalendarState {
-    posts: CalendarPost[];
+    range: DateRange | null; // Visible calendar window
+    days: DayCounts[];
+    totals: CalendarSummary['totals'] | null;
+    selectedDay: string | null; // YYYY-MM-DD whose posts are loaded
+    dayPosts: CalendarPost[];
+    syncVersion: number | null; // Last version seen; `since` for /posts/changes
     isLoading: boolean;
     error: string | null;
 
-    fetchPosts: (status?: string) => Promise<void>;
+    fetchCalendar: (range?: DateRange) => Promise<void>;
+    openDay: (date: string | null) => Promise<void>;
+    syncChanges: () => Promise<void>;
     createPost: (data: {
         platform: string;
         caption: string;
@@ -38,31 +71,105 @@ interface CalendarState {
     deletePost: (id: string) => Promise<void>;
 }
 
-export const useCalendarStore = create<CalendarState>((set) => ({
-    posts: [],
+// Minutes east of UTC, so the server buckets posts into the viewer's local days
+const tzOffset = () => -new Date().getTimezoneOffset();
+
+const dayRange = (date: string): DateRange => {
+    const start = new Date(`${date}T00:00:00`);
+    const end = new Date(start);
+    end.setDate(end.getDate() + 1);
+    return { from: start.toISOString(), to: end.toISOString() };
+};
+
+// Same rule as the server: a post sits on its scheduled day, else its published day
+const inRange = (post: CalendarPost, range: DateRange) => {
+    const t = post.scheduled_time || post.published_time;
+    if (!t) return false;
+    const ts = new Date(t).getTime();
+    return ts >= new Date(range.from).getTime() && ts < new Date(range.to).getTime();
+};
+
+const errorMessage = (err: any) => err.response?.data?.detail || err.message;
+
+export const useCalendarStore = create<CalendarState>((set, get) => ({
+    range: null,
+    days: [],
+    totals: null,
+    selectedDay: null,
+    dayPosts: [],
+    syncVersion: null,
     isLoading: false,
     error: null,
 
-    fetchPosts: async (status?: string) => {
-        set({ isLoading: true, error: null });
+    // Month view needs only per-day counts (O(days)); GET /posts/calendar revalidates with a 304
+    fetchCalendar: async (range?: DateRange) => {
+        const activeRange = range ?? get().range;
+        if (!activeRange) return;
+        set({ isLoading: true, error: null, range: activeRange });
+        try {
+            const res = await axios.get<CalendarSummary>(`${API_URL}/posts/calendar`, {
+                params: { ...activeRange, tz_offset: tzOffset() },
+            });
+            const version = Number(res.headers['x-sync-version']);
+            set({
+                days: res.data.days,
+                totals: res.data.totals,
+                syncVersion: Number.isNaN(version) ? get().syncVersion : version,
+                isLoading: false,
+            });
+        } catch (err: any) {
+            set({ error: errorMessage(err), isLoading: false });
+        }
+    },
+
+    // Full posts load lazily, one day at a time
+    openDay: async (date) => {
+        if (!date) return set({ selectedDay: null, dayPosts: [] });
+        set({ selectedDay: date, dayPosts: [], error: null });
         try {
-            const params = status ? { status } : {};
-            const res = await axios.get(`${API_URL}/posts`, { params });
-            set({ posts: res.data, isLoading: false });
+            const res = await axios.get<CalendarPost[]>(`${API_URL}/posts`, {
+                params: { ...dayRange(date), date_field: 'calendar' },
+            });
+            if (get().selectedDay === date) set({ dayPosts: res.data });
         } catch (err: any) {
-            set({ error: err.response?.data?.detail || err.message, isLoading: false });
+            set({ error: errorMessage(err) });
+        }
+    },
+
+    // Refresh counts, and pull only what changed for the open day
+    syncChanges: async () => {
+        const { syncVersion, selectedDay } = get();
+        await get().fetchCalendar();
+        if (!selectedDay) return;
+        if (syncVersion === null) return get().openDay(selectedDay);
+
+        const range = dayRange(selectedDay);
+        let since = syncVersion;
+        let posts = get().dayPosts;
+        let hasMore = true;
+        while (hasMore) {
+            const res = await axios.get<ChangeFeed>(`${API_URL}/posts/changes`, { params: { since } });
+            if (res.data.reset) return get().openDay(selectedDay);
+
+            const touched = new Set([...res.data.deleted, ...res.data.changes.map(p => p.id)]);
+            posts = [
+                ...res.data.changes.filter(p => inRange(p, range)),
+                ...posts.filter(p => !touched.has(p.id)),
+            ];
+            since = res.data.version;
+            hasMore = res.data.has_more;
         }
+        posts.sort((a, b) => (b.created_at || '').localeCompare(a.created_at || ''));
+        if (get().selectedDay === selectedDay) set({ dayPosts: posts });
     },
 
     createPost: async (data) => {
         set({ isLoading: true, error: null });
         try {
             await axios.post(`${API_URL}/posts`, data);
-            // Refresh list
-            const res = await axios.get(`${API_URL}/posts`);
-            set({ posts: res.data, isLoading: false });
+            await get().syncChanges();
         } catch (err: any) {
-            set({ error: err.response?.data?.detail || err.message, isLoading: false });
+            set({ error: errorMessage(err), isLoading: false });
         }
     },
 
@@ -70,11 +177,9 @@ export const useCalendarStore = create<CalendarState>((set) => ({
         set({ isLoading: true, error: null });
         try {
             await axios.put(`${API_URL}/posts/${id}`, data);
-            // Refresh list
-            const res = await axios.get(`${API_URL}/posts`);
-            set({ posts: res.data, isLoading: false });
+            await get().syncChanges();
         } catch (err: any) {
-            set({ error: err.response?.data?.detail || err.message, isLoading: false });
+            set({ error: errorMessage(err), isLoading: false });
         }
     },
 
@@ -82,10 +187,9 @@ export const useCalendarStore = create<CalendarState>((set) => ({
         set({ isLoading: true, error: null });
         try {
             await axios.delete(`${API_URL}/posts/${id}`);
-            const res = await axios.get(`${API_URL}/posts`);
-            set({ posts: res.data, isLoading: false });
+            await get().syncChanges();
         } catch (err: any) {
-            set({ error: err.response?.data?.detail || err.message, isLoading: false });
+            set({ error: errorMessage(err), isLoading: false });
         }
     },
 }));